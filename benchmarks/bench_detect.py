@@ -0,0 +1,100 @@
+"""
+语言检测微基准测试
+功能：生成一列模拟的单元格文本（中文、英文、日文、韩文、数字、混合文本），比较以下实现的耗时：
+  - legacy：旧版检测方式（每次调用编译正则，分别用 findall 统计中文和英文字符）
+  - detect_language：逐个单元格调用新的检测函数
+  - detect_languages：整列批量检测（相同文本只检测一次）
+
+用法：
+    python benchmarks/bench_detect.py --cells 1000000 --unique 0.3
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from language_detect import detect_language, detect_languages  # noqa: E402
+
+# 模拟单元格文本的素材
+SAMPLES = [
+    '高强度不锈钢螺丝，适用于户外环境',
+    '产品尺寸：120 x 80 x 45 mm，重量 350 g',
+    'Stainless steel screw for outdoor use',
+    'Rechargeable lithium battery, 3.7V 2000mAh',
+    '型号 ABC-1234 兼容 iPhone 15 Pro',
+    '東京タワーの限定モデル',
+    '무선 블루투스 이어폰',
+    'Беспроводные наушники',
+    '1234567',
+    '2024-05-01',
+    '是',
+    'Yes',
+]
+
+
+def legacy_detect_language(text):
+    """旧版检测方式（仅用于对比）"""
+    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
+    chinese_chars = len(chinese_pattern.findall(text))
+    english_chars = len(re.findall(r'[a-zA-Z0-9]', text))
+    if chinese_chars > 0 and chinese_chars >= english_chars * 0.3:
+        return 'zh'
+    elif english_chars > 0:
+        return 'en'
+    else:
+        return 'unknown'
+
+
+def make_column(cells, unique_ratio, seed=0):
+    """
+    生成模拟的单元格文本列
+
+    参数：
+        cells: 单元格数量
+        unique_ratio: 不重复文本占比（0~1）
+        seed: 随机数种子
+
+    返回：
+        文本列表
+    """
+    rng = random.Random(seed)
+    unique_count = max(1, int(cells * unique_ratio))
+    unique_texts = [f"{rng.choice(SAMPLES)} {index}" if index % 3 else rng.choice(SAMPLES)
+                    for index in range(unique_count)]
+    return [unique_texts[rng.randrange(unique_count)] for _ in range(cells)]
+
+
+def bench(name, func, column, repeat):
+    """运行repeat次，取最短耗时并打印"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(column)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<18} {best:8.3f} 秒  {best / len(column) * 1e6:7.3f} 微秒/单元格  {len(column) / best:12,.0f} 单元格/秒")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="语言检测微基准测试")
+    parser.add_argument('--cells', type=int, default=1000000, help="单元格数量（默认1000000）")
+    parser.add_argument('--unique', type=float, default=0.3, help="不重复文本占比（默认0.3）")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数，取最短耗时（默认3）")
+    args = parser.parse_args(argv)
+
+    column = make_column(args.cells, args.unique)
+    print(f"单元格数：{args.cells:,}，不重复文本占比：{args.unique:g}，重复 {args.repeat} 次取最短耗时")
+    print("-" * 72)
+    bench('legacy', lambda texts: [legacy_detect_language(text) for text in texts], column, args.repeat)
+    bench('detect_language', lambda texts: [detect_language(text) for text in texts], column, args.repeat)
+    bench('detect_languages', detect_languages, column, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
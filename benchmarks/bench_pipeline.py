@@ -0,0 +1,403 @@
+"""
+端到端性能基准测试
+功能：生成模拟工作簿（行数、重复文本比例、文本长度分布、中英文比例可配置），
+      使用本地模拟翻译服务（mock_server.py）运行完整的翻译流程（加载、检测、去重、批量翻译、写回、保存），
+      报告每秒行数、API调用次数、发送字符数、峰值内存、加载/保存耗时和请求延时分位数，结果写入JSON文件
+
+每个规模在单独的子进程中运行（峰值内存互不影响），模拟服务运行在主进程中（不与翻译流程争用GIL）。
+相同的参数和随机数种子生成相同的工作簿和相同的错误、频率限制序列，便于对比不同版本的结果。
+
+用法：
+    python benchmarks/bench_pipeline.py --rows 1000 10000 100000 --duplicates 0.5 --lengths mixed --zh-ratio 0.5
+    python benchmarks/bench_pipeline.py --rows 1000000 --streaming --service youdao --latency 0.1 --throttle-rate 0.01
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import openpyxl  # noqa: E402
+
+from mock_server import start_mock_server  # noqa: E402
+
+# 模拟文本的词汇
+ZH_WORDS = [
+    '高强度', '不锈钢', '螺丝', '适用于', '户外', '环境', '产品', '尺寸', '重量', '包装', '防水', '耐高温',
+    '可充电', '锂电池', '无线', '蓝牙', '耳机', '支架', '铝合金', '表面', '处理', '安装', '说明', '注意',
+    '使用', '之前', '请', '仔细', '阅读', '保修', '颜色', '黑色', '白色', '材质', '塑料', '橡胶', '密封圈',
+    '标准', '规格', '配件', '电源', '适配器', '接口', '充电', '时间', '续航', '显示屏', '按键', '外壳',
+]
+EN_WORDS = [
+    'high', 'strength', 'stainless', 'steel', 'screw', 'for', 'outdoor', 'use', 'product', 'size', 'weight',
+    'package', 'waterproof', 'heat', 'resistant', 'rechargeable', 'lithium', 'battery', 'wireless', 'bluetooth',
+    'headphones', 'bracket', 'aluminum', 'alloy', 'surface', 'finish', 'install', 'manual', 'please', 'read',
+    'carefully', 'before', 'warranty', 'color', 'black', 'white', 'material', 'plastic', 'rubber', 'seal',
+    'standard', 'accessory', 'power', 'adapter', 'port', 'charging', 'time', 'display', 'button', 'housing',
+]
+
+# 文本长度分布：名称 -> [(权重, 最短字符数, 最长字符数), ...]
+LENGTH_DISTRIBUTIONS = {
+    'short': [(1.0, 4, 20)],
+    'medium': [(1.0, 20, 120)],
+    'long': [(1.0, 300, 3000)],
+    'mixed': [(0.70, 4, 20), (0.25, 20, 120), (0.05, 300, 3000)],
+}
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+
+
+def make_text(rng, zh, length):
+    """
+    生成一条模拟文本（长文本中包含句末标点，可以按句子拆分）
+
+    参数：
+        rng: random.Random实例
+        zh: True生成中文，False生成英文
+        length: 目标字符数
+
+    返回：
+        文本
+    """
+    words = []
+    size = 0
+    sentence_words = 0
+    while size < length:
+        word = rng.choice(ZH_WORDS if zh else EN_WORDS)
+        sentence_words += 1
+        if sentence_words >= 12 and size + len(word) < length:
+            word += '。' if zh else '.'
+            sentence_words = 0
+        words.append(word)
+        size += len(word) + (0 if zh else 1)
+    text = ''.join(words) if zh else ' '.join(words).capitalize()
+    return text[:max(length, 1)]
+
+
+def make_column(rows, duplicate_ratio, lengths, zh_ratio, seed):
+    """
+    生成模拟的源列文本
+
+    参数：
+        rows: 行数
+        duplicate_ratio: 重复文本比例（0表示每行都不同，0.9表示只有10%的不重复文本）
+        lengths: 文本长度分布名称（见LENGTH_DISTRIBUTIONS）
+        zh_ratio: 中文文本比例（其余为英文）
+        seed: 随机数种子
+
+    返回：
+        (文本列表, 不重复文本数)
+    """
+    rng = random.Random(seed)
+    distribution = LENGTH_DISTRIBUTIONS[lengths]
+    weights = [weight for weight, _, _ in distribution]
+    unique_count = max(1, round(rows * (1 - duplicate_ratio)))
+
+    unique_texts = []
+    seen = set()
+    attempts = 0
+    while len(unique_texts) < unique_count and attempts < unique_count * 20:
+        attempts += 1
+        _, shortest, longest = rng.choices(distribution, weights)[0]
+        text = make_text(rng, rng.random() < zh_ratio, rng.randint(shortest, longest))
+        if text not in seen:
+            seen.add(text)
+            unique_texts.append(text)
+
+    # 每个不重复文本至少出现一次，其余行随机重复
+    column = unique_texts + [rng.choice(unique_texts) for _ in range(rows - len(unique_texts))]
+    rng.shuffle(column)
+    return column[:rows], len(unique_texts)
+
+
+def write_workbook(path, column):
+    """
+    以只写模式保存模拟工作簿：第1行为标题，A列为原文，B列为空（译文）
+
+    参数：
+        path: 文件路径
+        column: 源列文本
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(['source', 'target'])
+    for text in column:
+        sheet.append([text])
+    workbook.save(path)
+
+
+def percentile(values, fraction):
+    """计算分位数（最近秩法），values需已排序"""
+    if not values:
+        return None
+    index = max(0, math.ceil(fraction * len(values)) - 1)
+    return values[index]
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case):
+    """
+    子进程中运行一次完整的翻译流程
+
+    参数：
+        case: 参数字典（见main中的case）
+
+    返回：
+        结果字典
+    """
+    import translate_excel as te
+
+    te.use_mock_server(case['server_url'])
+    te.CONCURRENCY = case['concurrency']
+    if case['retry_delay'] is not None:
+        te.RETRY_DELAY = case['retry_delay']
+    if case['retry_pass_delay'] is not None:
+        te.RETRY_PASS_DELAY = case['retry_pass_delay']
+    if case['streaming_chunk_rows']:
+        te.STREAMING_CHUNK_ROWS = case['streaming_chunk_rows']
+    service = case['service']
+    if not case['rate_limits']:
+        te.configure_rate_limit(service, None, None)
+
+    # 记录每个HTTP请求的耗时（包括排队等待连接，不包括限速等待）
+    latencies = []
+    http_post = te.http_post
+
+    def timed_http_post(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return http_post(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    te.http_post = timed_http_post
+
+    job = te.make_translation_job(None, 'A', 'B')
+    load_seconds = save_seconds = None
+    save_count = 0
+    workbook = None
+    started = time.perf_counter()
+    if not case['streaming']:
+        workbook = openpyxl.load_workbook(case['file'])
+        load_seconds = time.perf_counter() - started
+        save = workbook.save
+
+        def timed_save(*args, **kwargs):
+            nonlocal save_seconds, save_count
+            save_count += 1
+            save_started = time.perf_counter()
+            try:
+                return save(*args, **kwargs)
+            finally:
+                save_seconds = (save_seconds or 0.0) + time.perf_counter() - save_started
+
+        workbook.save = timed_save
+    stats = te.run_translation_jobs(case['file'], [job], service, start_row=2, streaming=case['streaming'],
+                                    workbook=workbook)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    limiter = te.get_rate_limiter(service)
+    connection_stats = te.get_connection_stats()
+    te.close_http_sessions()
+    return {
+        'elapsed_seconds': elapsed,
+        'load_seconds': load_seconds,
+        'save_seconds': save_seconds,  # 包括中途的检查点保存
+        'save_count': save_count,
+        'translate_seconds': elapsed - (load_seconds or 0.0) - (save_seconds or 0.0),
+        'peak_rss_mb': peak_rss_mb(),
+        'stats': stats,
+        'rate_limit_wait_seconds': limiter.wait_time,
+        'throttle_signals': limiter.throttle_count,
+        'http': connection_stats,
+        'metrics': te.get_metrics().to_dict(),  # 各阶段耗时、等待时间、重试和频率限制次数
+        'latency_ms': {
+            'count': len(latencies),
+            'mean': sum(latencies) / len(latencies) * 1000 if latencies else None,
+            'p50': percentile(latencies, 0.50) * 1000 if latencies else None,
+            'p90': percentile(latencies, 0.90) * 1000 if latencies else None,
+            'p99': percentile(latencies, 0.99) * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None,
+        },
+    }
+
+
+def run_case_in_subprocess(case, workdir):
+    """
+    在单独的子进程中运行run_case（翻译流程的输出写入日志文件）
+
+    参数：
+        case: 参数字典
+        workdir: 工作目录（保存参数、结果和日志文件）
+
+    返回：
+        结果字典
+    """
+    name = f"case_{case['rows']}"
+    case_file = os.path.join(workdir, name + '.json')
+    result_file = os.path.join(workdir, name + '.result.json')
+    log_file = os.path.join(workdir, name + '.log')
+    with open(case_file, 'w', encoding='utf-8') as f:
+        json.dump(case, f, ensure_ascii=False)
+    with open(log_file, 'w', encoding='utf-8') as log:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-case', case_file, result_file],
+                                   stdout=log, stderr=subprocess.STDOUT, cwd=workdir)
+    if completed.returncode != 0:
+        with open(log_file, encoding='utf-8') as f:
+            tail = f.read()[-2000:]
+        raise RuntimeError(f"{case['rows']} 行的测试失败（退出码 {completed.returncode}）：\n{tail}")
+    with open(result_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_summary(results):
+    """打印结果汇总表"""
+    print(f"{'rows':>10} {'unique':>10} {'rows/s':>10} {'requests':>9} {'chars':>12} {'throttled':>9} "
+          f"{'load_s':>7} {'save_s':>7} {'p50_ms':>7} {'p99_ms':>7} {'rss_mb':>7}")
+    print('-' * 101)
+
+    def number(value, fmt):
+        return format(value, fmt) if value is not None else '-'
+
+    for result in results:
+        api = result['api']
+        print(f"{result['rows']:>10,} {result['unique_texts']:>10,} {result['rows_per_second']:>10,.0f} "
+              f"{api['requests']:>9,} {api['chars']:>12,} {api['throttled']:>9,} "
+              f"{number(result['load_seconds'], '.2f'):>7} {number(result['save_seconds'], '.2f'):>7} "
+              f"{number(result['latency_ms']['p50'], '.1f'):>7} {number(result['latency_ms']['p99'], '.1f'):>7} "
+              f"{number(result['peak_rss_mb'], '.0f'):>7}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="端到端性能基准测试（使用本地模拟翻译服务）")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help=f"工作簿行数，可指定多个（默认{' '.join(map(str, DEFAULT_ROWS))}）")
+    parser.add_argument('--duplicates', type=float, default=0.5, help="重复文本比例（0~1，默认0.5）")
+    parser.add_argument('--lengths', choices=sorted(LENGTH_DISTRIBUTIONS), default='mixed',
+                        help="文本长度分布（默认mixed：70%%短文本、25%%中等、5%%长文本）")
+    parser.add_argument('--zh-ratio', type=float, default=0.5, help="中文文本比例（0~1，默认0.5）")
+    parser.add_argument('--seed', type=int, default=0, help="随机数种子（默认0）")
+    parser.add_argument('--service', choices=['deepl', 'youdao'], default='deepl', help="翻译服务（默认deepl）")
+    parser.add_argument('--streaming', action='store_true', help="使用流式模式")
+    parser.add_argument('--streaming-chunk-rows', type=int, help="流式模式每块的行数")
+    parser.add_argument('--concurrency', type=int, default=4, help="同时进行中的翻译请求数（默认4）")
+    parser.add_argument('--rate-limits', action='store_true', help="保留 RATE_LIMITS 中的频率限制（默认不限速）")
+    parser.add_argument('--retry-delay', type=float, help="覆盖 RETRY_DELAY")
+    parser.add_argument('--retry-pass-delay', type=float, help="覆盖 RETRY_PASS_DELAY")
+    parser.add_argument('--latency', type=float, default=0.05, help="模拟服务的响应延时，单位秒（默认0.05）")
+    parser.add_argument('--jitter', type=float, default=0.02, help="响应延时的随机波动，单位秒（默认0.02）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟服务返回HTTP 500的概率")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="模拟服务随机返回频率限制错误的概率")
+    parser.add_argument('--max-rps', type=float, help="模拟服务每个接口每秒最多处理的请求数")
+    parser.add_argument('--output', help="结果JSON文件路径（默认 benchmarks/results/pipeline_<时间>.json）")
+    parser.add_argument('--workdir', help="保存模拟工作簿和日志的目录（默认使用临时目录，结束后删除）")
+    parser.add_argument('--run-case', nargs=2, metavar=('参数文件', '结果文件'), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.run_case:
+        # 子进程：运行一次翻译流程并写入结果
+        case_file, result_file = args.run_case
+        with open(case_file, encoding='utf-8') as f:
+            case = json.load(f)
+        result = run_case(case)
+        with open(result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        return
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_pipeline_')
+    os.makedirs(workdir, exist_ok=True)
+    server = start_mock_server(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                               throttle_rate=args.throttle_rate, max_rps=args.max_rps, seed=args.seed)
+    settings = {key: value for key, value in vars(args).items() if key not in ('run_case', 'output', 'workdir')}
+    print(f"模拟翻译服务：{server.url}，工作目录：{workdir}")
+    print(f"设置：{json.dumps(settings, ensure_ascii=False)}")
+
+    results = []
+    try:
+        for rows in args.rows:
+            excel_file = os.path.join(workdir, f"bench_{rows}.xlsx")
+            generate_started = time.perf_counter()
+            column, unique_texts = make_column(rows, args.duplicates, args.lengths, args.zh_ratio, args.seed)
+            write_workbook(excel_file, column)
+            total_chars = sum(len(text) for text in column)
+            del column
+            print(f"\n▶ {rows:,} 行（不重复文本 {unique_texts:,} 条，共 {total_chars:,} 字符），"
+                  f"生成耗时 {time.perf_counter() - generate_started:.1f} 秒，正在运行...")
+
+            server.reset_stats()
+            case = {
+                'rows': rows, 'file': excel_file, 'server_url': server.url, 'service': args.service,
+                'streaming': args.streaming, 'streaming_chunk_rows': args.streaming_chunk_rows,
+                'concurrency': args.concurrency, 'rate_limits': args.rate_limits,
+                'retry_delay': args.retry_delay, 'retry_pass_delay': args.retry_pass_delay,
+            }
+            result = run_case_in_subprocess(case, workdir)
+            server_stats = server.snapshot()
+            server_stats.pop('settings')
+            api = {'requests': 0, 'ok': 0, 'throttled': 0, 'error': 0, 'rejected': 0, 'texts': 0, 'chars': 0}
+            for endpoint_stats in server_stats.values():
+                for key in api:
+                    api[key] += endpoint_stats.get(key, 0)
+            result.update({
+                'rows': rows,
+                'unique_texts': unique_texts,
+                'source_chars': total_chars,
+                'rows_per_second': rows / result['elapsed_seconds'] if result['elapsed_seconds'] else None,
+                'api': api,
+                'api_by_endpoint': server_stats,
+            })
+            results.append(result)
+            print(f"  完成：{result['elapsed_seconds']:.2f} 秒，{result['rows_per_second']:,.0f} 行/秒，"
+                  f"API请求 {api['requests']:,} 次，发送 {api['chars']:,} 字符")
+    finally:
+        server.shutdown()
+        server.server_close()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'benchmark': 'pipeline',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': settings,
+        'results': results,
+    }
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print()
+    print_summary(results)
+    print(f"\n结果已写入：{output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+语言检测模块
+功能：按字符所属的文字（汉字、假名、谚文、拉丁字母、西里尔字母、数字）统计单元格文本，判断语言
+说明：字符分类表在导入时一次性建好，检测时用 str.translate 单次扫描把每个字符映射为类别符号，
+      再用 str.count 统计各类别数量，不再对每个单元格编译和执行多个正则表达式
+"""
+
+# 检测结果
+LANG_ZH = 'zh'  # 中文
+LANG_EN = 'en'  # 英文（所有拉丁字母文本）
+LANG_JA = 'ja'  # 日文（含假名）
+LANG_KO = 'ko'  # 韩文（含谚文）
+LANG_RU = 'ru'  # 俄文（西里尔字母）
+LANG_NONE = 'none'  # 无需翻译（只有数字、标点、空白等，没有任何文字）
+LANG_UNKNOWN = 'unknown'  # 有文字但无法判断（如阿拉伯文、泰文、表情符号）
+
+# 语言名称（用于显示翻译方向，也是翻译任务中可以使用的语言代码）
+# 检测只能识别前五种语言，其余语言可以作为目标语言，或在翻译任务中明确指定为源语言
+LANGUAGE_NAMES = {
+    LANG_ZH: '中文',
+    LANG_EN: '英文',
+    LANG_JA: '日文',
+    LANG_KO: '韩文',
+    LANG_RU: '俄文',
+    'fr': '法文',
+    'de': '德文',
+    'es': '西班牙文',
+    'pt': '葡萄牙文',
+    'it': '意大利文',
+    'nl': '荷兰文',
+    'pl': '波兰文',
+    'tr': '土耳其文',
+    'uk': '乌克兰文',
+    'id': '印尼文',
+    'ar': '阿拉伯文',
+    'vi': '越南文',
+    'th': '泰文',
+}
+
+# 汉字占比阈值：汉字数 >= 拉丁字母和数字数 × 该值时判定为中文（混合文本中少量英文型号不影响判断）
+CJK_RATIO = 0.3
+
+# 字符类别符号（都是ASCII小写字母，映射后的字符串中不会与未分类的非ASCII字符混淆）
+_HAN = 'h'
+_KANA = 'j'
+_HANGUL = 'k'
+_LATIN = 'l'
+_CYRILLIC = 'c'
+_DIGIT = 'd'
+
+
+def _build_translate_table():
+    """
+    建立字符分类表：码位 -> 类别符号；ASCII中的空白和标点映射为None（删除）
+
+    返回：
+        供 str.translate 使用的字典
+    """
+    table = {}
+
+    def add_range(start, end, symbol):
+        for code in range(start, end + 1):
+            table[code] = symbol
+
+    # ASCII：先全部删除，再标记字母和数字
+    add_range(0x00, 0x7F, None)
+    add_range(ord('a'), ord('z'), _LATIN)
+    add_range(ord('A'), ord('Z'), _LATIN)
+    add_range(ord('0'), ord('9'), _DIGIT)
+
+    # 带重音符号的拉丁字母（法语、德语、越南语等）
+    add_range(0x00C0, 0x024F, _LATIN)
+    table[0x00D7] = None  # ×
+    table[0x00F7] = None  # ÷
+    add_range(0x1E00, 0x1EFF, _LATIN)
+
+    # 西里尔字母
+    add_range(0x0400, 0x04FF, _CYRILLIC)
+
+    # 汉字：CJK统一汉字、扩展A区、兼容汉字
+    add_range(0x4E00, 0x9FFF, _HAN)
+    add_range(0x3400, 0x4DBF, _HAN)
+    add_range(0xF900, 0xFAFF, _HAN)
+
+    # 日文假名：平假名、片假名、片假名音标扩展、半角片假名
+    add_range(0x3040, 0x309F, _KANA)
+    add_range(0x30A0, 0x30FF, _KANA)
+    add_range(0x31F0, 0x31FF, _KANA)
+    add_range(0xFF66, 0xFF9F, _KANA)
+    table[0x30FC] = _KANA  # 长音符号ー
+
+    # 韩文谚文：音节、字母、兼容字母
+    add_range(0xAC00, 0xD7AF, _HANGUL)
+    add_range(0x1100, 0x11FF, _HANGUL)
+    add_range(0x3130, 0x318F, _HANGUL)
+
+    # 全角字母和数字
+    add_range(0xFF21, 0xFF3A, _LATIN)
+    add_range(0xFF41, 0xFF5A, _LATIN)
+    add_range(0xFF10, 0xFF19, _DIGIT)
+
+    # 标点和符号（删除）：通用标点、CJK标点、全角标点、货币、数学符号、箭头等
+    add_range(0x00A0, 0x00BF, None)
+    add_range(0x2000, 0x2BFF, None)
+    add_range(0x3000, 0x303F, None)
+    add_range(0xFE30, 0xFE4F, None)
+    add_range(0xFF00, 0xFF0F, None)
+    add_range(0xFF1A, 0xFF20, None)
+    add_range(0xFF3B, 0xFF40, None)
+    add_range(0xFF5B, 0xFF65, None)
+    add_range(0xFFE0, 0xFFEF, None)
+    table[0x30FB] = None  # 中点・
+    return table
+
+
+_TRANSLATE_TABLE = _build_translate_table()
+
+
+def classify(han, kana, hangul, latin, cyrillic, digit, other):
+    """
+    根据各类字符数量判断语言
+
+    参数：
+        han, kana, hangul, latin, cyrillic, digit, other:
+            汉字、假名、谚文、拉丁字母、西里尔字母、数字、其他文字（未分类的非ASCII字符）的数量
+
+    返回：
+        语言代码（LANG_*）
+    """
+    latin_and_digits = latin + digit
+    if kana and kana + han >= latin_and_digits * CJK_RATIO:
+        return LANG_JA  # 有假名即为日文（日文同时使用汉字和假名）
+    if hangul and hangul >= latin_and_digits * CJK_RATIO:
+        return LANG_KO
+    if han and han >= latin_and_digits * CJK_RATIO:
+        return LANG_ZH
+    if latin:
+        return LANG_EN
+    if cyrillic:
+        return LANG_RU
+    if han:
+        return LANG_ZH
+    if other:
+        return LANG_UNKNOWN
+    return LANG_NONE
+
+
+def detect_language(text):
+    """
+    检测单个文本的语言
+
+    参数：
+        text: 要检测的文本
+
+    返回：
+        'zh'、'en'、'ja'、'ko'、'ru'，'none' 表示无需翻译（只有数字或符号），'unknown' 表示无法判断
+    """
+    mapped = text.translate(_TRANSLATE_TABLE)
+    han = mapped.count(_HAN)
+    kana = mapped.count(_KANA)
+    hangul = mapped.count(_HANGUL)
+    latin = mapped.count(_LATIN)
+    cyrillic = mapped.count(_CYRILLIC)
+    digit = mapped.count(_DIGIT)
+    other = len(mapped) - han - kana - hangul - latin - cyrillic - digit
+    return classify(han, kana, hangul, latin, cyrillic, digit, other)
+
+
+def detect_languages(texts):
+    """
+    批量检测一整列文本的语言（相同文本只检测一次）
+
+    参数：
+        texts: 文本列表
+
+    返回：
+        与texts一一对应的语言代码列表
+    """
+    results = {}
+    detected = []
+    for text in texts:
+        lang = results.get(text)
+        if lang is None:
+            lang = results[text] = detect_language(text)
+        detected.append(lang)
+    return detected
@@ -0,0 +1,286 @@
+"""
+运行指标收集模块
+功能：记录各阶段耗时（加载、语言检测、缓存查询、翻译、保存等）、计数器（请求数、重试、频率限制、计费字符数、
+      等待时间）和直方图（每个翻译服务的请求延时），运行结束后输出JSON汇总或Prometheus textfile格式，
+      便于判断一次运行慢在哪里，并为定时任务绘制趋势图
+说明：所有方法都是线程安全的；批量模式下每个工作进程各自收集，主进程用 merge 合并
+"""
+
+import contextlib  # 用于实现计时上下文管理器
+import json  # 用于输出JSON汇总
+import os  # 用于原子地替换输出文件
+import threading  # 用于保护指标数据
+import time  # 用于计时
+
+# 指标名称前缀（Prometheus格式中使用）
+METRIC_PREFIX = 'translate_excel_'
+
+# 请求延时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标说明（Prometheus格式的HELP行）
+METRIC_HELP = {
+    'stage_seconds': '各阶段累计耗时（秒）',
+    'stage_calls': '各阶段执行次数',
+    'sleep_seconds': '等待时间（秒）：rate_limit为限速等待，retry为退避重试等待，retry_pass为重试队列冷却',
+    'http_requests': 'HTTP请求数（按翻译服务和状态码）',
+    'http_request_seconds': 'HTTP请求延时（秒）',
+    'retries': '退避重试次数（按翻译服务和原因）',
+    'throttle_events': '频率限制信号次数（按翻译服务和错误代码）',
+    'chars_sent': '发送给翻译服务的字符数（包括重试）',
+    'chars_billed': '翻译成功的字符数（计费字符数）',
+    'texts_translated': '翻译成功的文本（段）数',
+    'texts_failed': '翻译失败的文本（段）数',
+    'cache_hits': '翻译缓存命中的文本数',
+    'memory_hits': '套用相似文本译文（翻译记忆）的文本数',
+    'rows': '处理的行数（按结果）',
+    'key_chars': '各账号翻译成功的字符数',
+    'key_disabled': '因密钥无效或配额用完而停用的账号数',
+    'failovers': '改用其他翻译服务的请求批次数',
+    'pipeline_seconds': '流式流水线各阶段的时间（秒）：busy为处理，idle为等待上游，blocked为等待下游（队列已满）',
+    'pipeline_items': '流式流水线各阶段处理的数据块数',
+    'pipeline_queue_depth': '流式流水线各阶段取数据时输入队列中排队的块数',
+}
+
+
+def _label_key(labels):
+    """把标签字典转换为可作为字典键的有序元组（值为None的标签省略）"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class Metrics:
+    """
+    指标收集器：计数器（可累加任意数值，阶段耗时也是计数器）和直方图，每个指标可以带标签
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}  # 名称 -> {标签元组: 数值}
+        self.histograms = {}  # 名称 -> {标签元组: {'buckets': [...], 'count': n, 'sum': s, 'max': m}}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        """
+        计数器累加
+
+        参数：
+            name: 指标名称
+            value: 累加值（次数、字符数、秒数等）
+            labels: 标签（如 service='deepl'）
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        记录一个观测值到直方图
+
+        参数：
+            name: 指标名称
+            value: 观测值（如请求耗时秒数）
+            buckets: 桶上限列表（同一指标应使用相同的桶）
+            labels: 标签
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {'le': list(buckets), 'buckets': [0] * len(buckets),
+                                           'count': 0, 'sum': 0.0, 'max': 0.0}
+            for index, upper in enumerate(histogram['le']):
+                if value <= upper:
+                    histogram['buckets'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    def record_stage(self, name, started, **labels):
+        """
+        记录一个阶段的耗时（用于不方便使用with语句的顺序代码）
+
+        参数：
+            name: 阶段名称
+            started: 阶段开始时的 time.perf_counter()
+            labels: 其他标签
+
+        返回：
+            当前的 time.perf_counter()（可作为下一阶段的开始时间）
+        """
+        now = time.perf_counter()
+        self.inc('stage_seconds', now - started, stage=name, **labels)
+        self.inc('stage_calls', stage=name, **labels)
+        return now
+
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        """
+        阶段计时：with metrics.stage('load'): ...，耗时累加到 stage_seconds{stage=name}
+
+        参数：
+            name: 阶段名称
+            labels: 其他标签
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, started, **labels)
+
+    def get(self, name, **labels):
+        """
+        读取计数器的值（没有指定标签时返回所有标签的合计）
+
+        参数：
+            name: 指标名称
+            labels: 标签（只需给出要筛选的部分）
+
+        返回：
+            数值
+        """
+        wanted = set(_label_key(labels))
+        with self._lock:
+            series = self.counters.get(name, {})
+            return sum(value for key, value in series.items() if wanted <= set(key))
+
+    def reset(self):
+        """清空所有指标"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def to_dict(self):
+        """
+        导出所有指标（JSON可序列化）
+
+        返回：
+            字典：started、elapsed_seconds、counters（名称 -> [{labels, value}]）、
+            histograms（名称 -> [{labels, le, buckets, count, sum, max, mean}]）
+        """
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                for name, series in sorted(self.counters.items())
+            }
+            histograms = {
+                name: [dict(histogram, labels=dict(key), buckets=list(histogram['buckets']),
+                            mean=histogram['sum'] / histogram['count'] if histogram['count'] else None)
+                       for key, histogram in sorted(series.items())]
+                for name, series in sorted(self.histograms.items())
+            }
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_seconds': time.time() - self.started,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def merge(self, snapshot):
+        """
+        合并另一个收集器导出的指标（批量模式下合并各工作进程的结果）
+
+        参数：
+            snapshot: to_dict() 的返回值
+        """
+        with self._lock:
+            for name, items in snapshot.get('counters', {}).items():
+                series = self.counters.setdefault(name, {})
+                for item in items:
+                    key = _label_key(item['labels'])
+                    series[key] = series.get(key, 0) + item['value']
+            for name, items in snapshot.get('histograms', {}).items():
+                series = self.histograms.setdefault(name, {})
+                for item in items:
+                    key = _label_key(item['labels'])
+                    histogram = series.get(key)
+                    if histogram is None:
+                        histogram = series[key] = {'le': list(item['le']), 'buckets': [0] * len(item['le']),
+                                                   'count': 0, 'sum': 0.0, 'max': 0.0}
+                    histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], item['buckets'])]
+                    histogram['count'] += item['count']
+                    histogram['sum'] += item['sum']
+                    histogram['max'] = max(histogram['max'], item['max'])
+
+    def to_prometheus(self):
+        """
+        导出为Prometheus文本格式（用于node_exporter的textfile收集器）
+
+        返回：
+            文本
+        """
+        snapshot = self.to_dict()
+        lines = []
+
+        def format_labels(labels, extra=None):
+            items = list(labels.items()) + list((extra or {}).items())
+            if not items:
+                return ''
+            escaped = []
+            for name, value in items:
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                escaped.append(f'{name}="{value}"')
+            return '{' + ','.join(escaped) + '}'
+
+        for name, items in snapshot['counters'].items():
+            metric = METRIC_PREFIX + name + '_total'
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            for item in items:
+                lines.append(f"{metric}{format_labels(item['labels'])} {item['value']:g}")
+        for name, items in snapshot['histograms'].items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for item in items:
+                for upper, count in zip(item['le'], item['buckets']):
+                    lines.append(f"{metric}_bucket{format_labels(item['labels'], {'le': f'{upper:g}'})} {count}")
+                lines.append(f"{metric}_bucket{format_labels(item['labels'], {'le': '+Inf'})} {item['count']}")
+                lines.append(f"{metric}_sum{format_labels(item['labels'])} {item['sum']:g}")
+                lines.append(f"{metric}_count{format_labels(item['labels'])} {item['count']}")
+        metric = METRIC_PREFIX + 'last_run_timestamp_seconds'
+        lines.append(f"# HELP {metric} 最近一次运行的结束时间")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {time.time():.0f}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        """
+        把指标写入JSON文件（先写临时文件再替换，避免读取到写了一半的文件）
+
+        参数：
+            path: 文件路径
+        """
+        _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path):
+        """
+        把指标写入Prometheus textfile（文件名应以.prom结尾）
+
+        参数：
+            path: 文件路径
+        """
+        _write_atomic(path, self.to_prometheus())
+
+
+def _write_atomic(path, text):
+    """先写入同目录下的临时文件，再替换目标文件"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """
+    获取全局指标收集器
+
+    返回：
+        Metrics实例
+    """
+    return _metrics
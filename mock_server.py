@@ -0,0 +1,458 @@
+"""
+本地模拟翻译服务
+功能：在本机启动一个同时模拟有道翻译（/api、/v2/api）和DeepL（/v2/translate、/v2/usage）接口的HTTP服务，
+      可配置响应延时、错误率、频率限制（有道411、HTTP 429）和每个密钥的字符配额（有道401、DeepL 456），
+      按与真实接口相同的规则校验有道签名（签名错误时返回202），
+      不需要真实的API密钥，用于离线测试并发、批量、重试、限速和多账号切换等改动对吞吐量的影响，不消耗付费额度
+用法：python mock_server.py --port 8800 --latency 0.05 --throttle-rate 0.02 --max-rps 20
+      python translate_excel.py --mock-server http://127.0.0.1:8800 ...
+"""
+
+import argparse  # 用于解析命令行参数
+import hashlib  # 用于校验有道翻译的SHA256签名
+import json  # 用于生成JSON响应
+import random  # 用于模拟随机延时、错误和频率限制
+import threading  # 用于在后台线程中运行服务和保护统计数据
+import time  # 用于模拟延时和按秒统计请求数
+from collections import deque  # 用于记录最近一秒内的请求时间
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # 用于实现多线程HTTP服务
+from urllib.parse import parse_qsl  # 用于解析表单参数
+
+# 默认设置（命令行参数可修改）
+DEFAULT_PORT = 8800
+DEFAULT_SETTINGS = {
+    'latency': 0.05,  # 每个请求的基础响应延时（秒）
+    'jitter': 0.02,  # 延时的随机波动范围（秒）
+    'error_rate': 0.0,  # 返回HTTP 500的概率
+    'throttle_rate': 0.0,  # 随机返回频率限制错误的概率
+    'max_rps': None,  # 每个接口、每个密钥每秒最多处理的请求数，超出时返回频率限制错误（None表示不限制）
+    'retry_after': 1,  # DeepL返回429时的Retry-After（秒，None表示不返回该响应头）
+    'quota_chars': None,  # 每个密钥可翻译的字符数，用完后返回配额错误（有道401、DeepL 456；None表示不限制）
+    'app_secret': 'mock',  # 校验有道签名使用的应用密钥，签名不一致时返回202（None表示不校验签名）
+}
+
+# 与真实接口一致的单次请求限制
+DEEPL_MAX_TEXTS = 50
+YOUDAO_MAX_BATCH_CHARS = 5000
+YOUDAO_THROTTLE_CODES = ['411']  # 202是签名校验失败，不作为频率限制返回
+
+
+def fake_translate(text, to_lang):
+    """
+    生成模拟译文：在原文前加上目标语言标记（保留原文中的占位符，译文可以对应回原文）
+
+    参数：
+        text: 原文
+        to_lang: 目标语言（API格式）
+
+    返回：
+        模拟译文
+    """
+    return f"<{to_lang}> {text}"
+
+
+def youdao_sign(app_key, text, salt, curtime, app_secret):
+    """
+    按有道翻译API v3的规则计算签名：sha256(应用ID + input + salt + curtime + 应用密钥)，
+    文本超过20个字符时input为 前10个字符 + 文本长度 + 后10个字符（独立实现，用于发现客户端签名的错误）
+
+    参数：
+        app_key: 应用ID
+        text: 参与签名的原文（批量接口为所有q按顺序拼接后的字符串）
+        salt: 随机数
+        curtime: 时间戳
+        app_secret: 应用密钥
+
+    返回：
+        十六进制签名字符串
+    """
+    sign_input = text[:10] + str(len(text)) + text[-10:] if len(text) > 20 else text
+    return hashlib.sha256((app_key + sign_input + salt + curtime + app_secret).encode('utf-8')).hexdigest()
+
+
+class MockTranslationServer(ThreadingHTTPServer):
+    """
+    模拟翻译服务：保存配置和请求统计，由MockRequestHandler处理每个请求
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, settings=None, seed=None):
+        """
+        参数：
+            address: (主机, 端口)，端口为0时自动分配
+            settings: 设置（见DEFAULT_SETTINGS，未指定的项使用默认值）
+            seed: 随机数种子（用于复现错误和频率限制的出现顺序）
+        """
+        super().__init__(address, MockRequestHandler)
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = {}  # (接口, 密钥) -> 最近一秒内的请求时间
+        self.usage = {}  # (服务, 密钥) -> 已翻译的字符数
+        self.stats = {}  # 接口 -> 统计数据
+
+    @property
+    def url(self):
+        """服务的基础地址"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self, probability):
+        """按概率返回True（线程安全）"""
+        if not probability:
+            return False
+        with self._lock:
+            return self.random.random() < probability
+
+    def record(self, api, texts=0, chars=0, outcome='ok'):
+        """
+        记录一个请求
+
+        参数：
+            api: 接口名称（'youdao'、'youdao_batch'、'deepl'）
+            texts: 文本数
+            chars: 字符数
+            outcome: 'ok'、'throttled'、'error'、'rejected'（参数或签名错误）或 'quota'（配额已用完）
+        """
+        with self._lock:
+            stats = self.stats.setdefault(api, {'requests': 0, 'texts': 0, 'chars': 0, 'ok': 0, 'throttled': 0,
+                                                'error': 0, 'rejected': 0, 'quota': 0})
+            stats['requests'] += 1
+            stats[outcome] += 1
+            if outcome == 'ok':
+                stats['texts'] += texts
+                stats['chars'] += chars
+
+    def over_rate_limit(self, api, key=None):
+        """
+        检查同一接口、同一密钥最近一秒的请求数是否超过max_rps（超过时本次请求不计入）
+
+        参数：
+            api: 接口名称
+            key: API密钥（与真实服务一样，每个账号单独限速）
+
+        返回：
+            True表示应返回频率限制错误
+        """
+        max_rps = self.settings['max_rps']
+        if not max_rps:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            recent = self._recent.setdefault((api, key), deque())
+            while recent and now - recent[0] >= 1.0:
+                recent.popleft()
+            if len(recent) >= max_rps:
+                return True
+            recent.append(now)
+            return False
+
+    def should_throttle(self, api, key=None):
+        """本次请求是否返回频率限制错误（超过每秒请求数，或按throttle_rate随机出现）"""
+        return self.over_rate_limit(api, key) or self.roll(self.settings['throttle_rate'])
+
+    def use_quota(self, service, key, chars):
+        """
+        从密钥的字符配额中扣除本次请求的字符数
+
+        参数：
+            service: 'youdao' 或 'deepl'（两个服务的配额分别计算）
+            key: API密钥
+            chars: 本次请求的字符数
+
+        返回：
+            True表示配额足够（已扣除），False表示配额不足（不扣除）
+        """
+        quota = self.settings['quota_chars']
+        with self._lock:
+            used = self.usage.get((service, key), 0)
+            if quota is not None and used + chars > quota:
+                return False
+            self.usage[(service, key)] = used + chars
+            return True
+
+    def simulate_latency(self):
+        """按配置的延时和随机波动等待"""
+        latency = self.settings['latency'] or 0.0
+        jitter = self.settings['jitter'] or 0.0
+        if jitter:
+            with self._lock:
+                latency += self.random.uniform(-jitter, jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def snapshot(self):
+        """
+        获取统计数据的副本
+
+        返回：
+            字典：接口 -> 统计数据，以及 settings（当前设置）
+        """
+        with self._lock:
+            stats = {api: dict(values) for api, values in self.stats.items()}
+        stats['settings'] = dict(self.settings)
+        return stats
+
+    def reset_stats(self):
+        """清空统计数据"""
+        with self._lock:
+            self.stats.clear()
+            self._recent.clear()
+            self.usage.clear()
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """
+    处理模拟翻译请求：POST /api（有道单条）、/v2/api（有道批量）、/v2/translate、/v2/usage（DeepL），
+    GET /stats（统计数据）
+    """
+
+    protocol_version = 'HTTP/1.1'  # 支持长连接，与真实服务一样可以复用连接
+
+    def log_message(self, format, *args):
+        # 不逐条打印请求日志
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        """
+        发送JSON响应
+
+        参数：
+            status: HTTP状态码
+            payload: 响应内容（字典）
+            headers: 额外的响应头
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_form(self):
+        """
+        读取表单参数
+
+        返回：
+            (键, 值)列表（保留重复的q、text参数）
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        return parse_qsl(body, keep_blank_values=True)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self.send_json(200, self.server.snapshot())
+        else:
+            self.send_json(404, {'message': 'Not found'})
+
+    def do_POST(self):
+        form = self.read_form()
+        path = self.path.split('?')[0].rstrip('/')
+        self.server.simulate_latency()
+        if path == '/api':
+            self.handle_youdao(form, batch=False)
+        elif path == '/v2/api':
+            self.handle_youdao(form, batch=True)
+        elif path == '/v2/translate':
+            self.handle_deepl(form)
+        elif path == '/v2/usage':
+            self.handle_deepl_usage(form)
+        else:
+            self.send_json(404, {'message': 'Not found'})
+
+    def handle_youdao(self, form, batch):
+        """
+        模拟有道翻译接口：频率限制和参数错误通过errorCode返回（HTTP状态码为200）
+
+        参数：
+            form: 表单参数
+            batch: 是否为批量翻译接口
+        """
+        api = 'youdao_batch' if batch else 'youdao'
+        params = dict(form)
+        texts = [value for key, value in form if key == 'q']
+        chars = sum(len(text) for text in texts)
+        server = self.server
+
+        if not texts or not params.get('appKey') or not params.get('sign') or not params.get('to'):
+            server.record(api, outcome='rejected')
+            self.send_json(200, {'errorCode': '101'})
+            return
+        app_secret = server.settings['app_secret']
+        if app_secret is not None and params['sign'] != youdao_sign(
+                params['appKey'], ''.join(texts), params.get('salt', ''), params.get('curtime', ''), app_secret):
+            server.record(api, outcome='rejected')
+            self.send_json(200, {'errorCode': '202'})  # 签名检验失败
+            return
+        if (batch and chars > YOUDAO_MAX_BATCH_CHARS) or (not batch and len(texts[0]) > YOUDAO_MAX_BATCH_CHARS):
+            server.record(api, outcome='rejected')
+            self.send_json(200, {'errorCode': '411'})  # 文本过长
+            return
+        if server.roll(server.settings['error_rate']):
+            server.record(api, outcome='error')
+            self.send_json(500, {'errorCode': '303'})
+            return
+        if server.should_throttle(api, params['appKey']):
+            server.record(api, outcome='throttled')
+            with server._lock:
+                error_code = server.random.choice(YOUDAO_THROTTLE_CODES)
+            self.send_json(200, {'errorCode': error_code})
+            return
+        if not server.use_quota('youdao', params['appKey'], chars):
+            server.record(api, outcome='quota')
+            self.send_json(200, {'errorCode': '401'})  # 账户余额不足
+            return
+
+        server.record(api, len(texts), chars)
+        to_lang = params['to']
+        if batch:
+            results = [{'query': text, 'translation': fake_translate(text, to_lang), 'errorCode': '0',
+                        'type': f"{params.get('from', 'auto')}2{to_lang}"} for text in texts]
+            self.send_json(200, {'errorCode': '0', 'errorIndex': [], 'translateResults': results})
+        else:
+            self.send_json(200, {'errorCode': '0', 'query': texts[0], 'translation': [fake_translate(texts[0], to_lang)]})
+
+    def handle_deepl(self, form):
+        """
+        模拟DeepL接口：密钥缺失返回403，频率限制返回429（带Retry-After）
+
+        参数：
+            form: 表单参数
+        """
+        api = 'deepl'
+        params = dict(form)
+        texts = [value for key, value in form if key == 'text']
+        chars = sum(len(text) for text in texts)
+        server = self.server
+
+        if not params.get('auth_key'):
+            server.record(api, outcome='rejected')
+            self.send_json(403, {'message': 'Wrong endpoint or missing authentication key'})
+            return
+        if not texts or not params.get('target_lang'):
+            server.record(api, outcome='rejected')
+            self.send_json(400, {'message': "Parameter 'text' or 'target_lang' not specified."})
+            return
+        if len(texts) > DEEPL_MAX_TEXTS:
+            server.record(api, outcome='rejected')
+            self.send_json(413, {'message': f"Too many texts (max {DEEPL_MAX_TEXTS})"})
+            return
+        if server.roll(server.settings['error_rate']):
+            server.record(api, outcome='error')
+            self.send_json(500, {'message': 'Internal server error'})
+            return
+        if server.should_throttle(api, params['auth_key']):
+            server.record(api, outcome='throttled')
+            retry_after = server.settings['retry_after']
+            headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+            self.send_json(429, {'message': 'Too many requests'}, headers)
+            return
+        if not server.use_quota('deepl', params['auth_key'], chars):
+            server.record(api, outcome='quota')
+            self.send_json(456, {'message': 'Quota exceeded. The character limit has been reached.'})
+            return
+
+        server.record(api, len(texts), chars)
+        target_lang = params['target_lang']
+        source_lang = params.get('source_lang', 'ZH' if target_lang == 'EN' else 'EN')
+        self.send_json(200, {'translations': [{'detected_source_language': source_lang,
+                                               'text': fake_translate(text, target_lang)} for text in texts]})
+
+
+    def handle_deepl_usage(self, form):
+        """
+        模拟DeepL用量查询接口：返回密钥已翻译的字符数和字符配额
+
+        参数：
+            form: 表单参数
+        """
+        server = self.server
+        key = dict(form).get('auth_key')
+        if not key:
+            self.send_json(403, {'message': 'Wrong endpoint or missing authentication key'})
+            return
+        with server._lock:
+            used = server.usage.get(('deepl', key), 0)
+        quota = server.settings['quota_chars']
+        self.send_json(200, {'character_count': used, 'character_limit': quota if quota is not None else 10 ** 12})
+
+
+def start_mock_server(host='127.0.0.1', port=0, seed=None, **settings):
+    """
+    在后台线程中启动模拟翻译服务
+
+    参数：
+        host: 监听地址
+        port: 端口（0表示自动分配）
+        seed: 随机数种子
+        settings: 其他设置（见DEFAULT_SETTINGS）
+
+    返回：
+        MockTranslationServer实例（使用 server.url 获取地址，server.shutdown() 停止）
+    """
+    server = MockTranslationServer((host, port), settings, seed)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+
+    参数：
+        argv: 命令行参数列表（默认使用sys.argv）
+
+    返回：
+        解析后的参数对象
+    """
+    parser = argparse.ArgumentParser(description="模拟有道翻译和DeepL接口的本地HTTP服务")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址（默认127.0.0.1）")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"端口（默认{DEFAULT_PORT}）")
+    parser.add_argument('--latency', type=float, default=DEFAULT_SETTINGS['latency'],
+                        help=f"每个请求的响应延时，单位秒（默认{DEFAULT_SETTINGS['latency']:g}）")
+    parser.add_argument('--jitter', type=float, default=DEFAULT_SETTINGS['jitter'],
+                        help=f"延时的随机波动范围，单位秒（默认{DEFAULT_SETTINGS['jitter']:g}）")
+    parser.add_argument('--error-rate', type=float, default=DEFAULT_SETTINGS['error_rate'],
+                        help="返回HTTP 500的概率（0~1）")
+    parser.add_argument('--throttle-rate', type=float, default=DEFAULT_SETTINGS['throttle_rate'],
+                        help="随机返回频率限制错误（有道411、DeepL 429）的概率（0~1）")
+    parser.add_argument('--max-rps', type=float, help="每个接口、每个密钥每秒最多处理的请求数，超出时返回频率限制错误")
+    parser.add_argument('--retry-after', type=float, default=DEFAULT_SETTINGS['retry_after'],
+                        help="DeepL返回429时的Retry-After秒数（负数表示不返回该响应头）")
+    parser.add_argument('--quota-chars', type=int,
+                        help="每个密钥可翻译的字符数，用完后返回配额错误（有道401、DeepL 456）")
+    parser.add_argument('--app-secret', default=DEFAULT_SETTINGS['app_secret'],
+                        help=f"校验有道签名使用的应用密钥（默认{DEFAULT_SETTINGS['app_secret']}，"
+                             "与 --mock-server 未配置密钥时的占位值相同；空字符串表示不校验签名）")
+    parser.add_argument('--seed', type=int, help="随机数种子")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = MockTranslationServer((args.host, args.port), {
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'throttle_rate': args.throttle_rate,
+        'max_rps': args.max_rps,
+        'retry_after': args.retry_after if args.retry_after >= 0 else None,
+        'quota_chars': args.quota_chars,
+        'app_secret': args.app_secret or None,
+    }, args.seed)
+    print(f"✓ 模拟翻译服务已启动：{server.url}")
+    print(f"  有道翻译：{server.url}/api、{server.url}/v2/api；DeepL：{server.url}/v2/translate、/v2/usage；统计：{server.url}/stats")
+    print(f"  使用方法：python translate_excel.py --mock-server {server.url} ...")
+    print("  按 Ctrl-C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n统计：")
+        print(json.dumps(server.snapshot(), ensure_ascii=False, indent=2))
+    finally:
+        server.server_close()
@@ -0,0 +1,195 @@
+"""
+分阶段流水线模块
+功能：把处理过程拆成依次相连的若干阶段（如读取、分类去重、翻译、写入），每个阶段在单独的线程中运行，
+      相邻阶段之间用有界队列连接：下游处理不过来时上游放入数据会阻塞（背压），内存中最多只有队列容量的数据；
+      统计每个阶段的处理时间、等待上游的空闲时间、等待下游的阻塞时间和输入队列深度，便于判断哪个阶段限制了吞吐量
+说明：每个阶段按顺序逐项处理，输出顺序与输入相同；任何阶段出错（包括主线程被中断）时所有阶段都会停止，
+      run 重新抛出该错误
+"""
+
+import queue  # 用于连接相邻阶段的有界队列
+import threading  # 用于运行各阶段的线程
+import time  # 用于计时
+
+from metrics import get_metrics
+
+# 等待队列时检查其他阶段是否已停止的间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 队列深度直方图的桶上限
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+# 表示上游的数据已全部送出
+_END = object()
+
+
+class PipelineStopped(Exception):
+    """流水线已停止（其他阶段出错或被中断），当前阶段应尽快退出"""
+
+
+class PipelineStage:
+    """
+    流水线中的一个阶段及其统计数据
+    """
+
+    def __init__(self, name, function, in_main_thread=False):
+        """
+        参数：
+            name: 阶段名称（也是指标的stage标签）
+            function: 处理函数（见 Pipeline.add_stage）
+            in_main_thread: 是否在调用 run 的线程中执行
+        """
+        self.name = name
+        self.function = function
+        self.in_main_thread = in_main_thread
+        self.items = 0  # 已处理的数据项数
+        self.busy = 0.0  # 处理数据的时间（秒）
+        self.idle = 0.0  # 等待上游数据的时间（秒）
+        self.blocked = 0.0  # 下游队列已满、等待放入的时间（秒）
+        self.input = None  # 输入队列（第一个阶段没有）
+        self.output = None  # 输出队列（最后一个阶段没有）
+
+
+class Pipeline:
+    """
+    由有界队列连接的多阶段流水线
+    """
+
+    def __init__(self, queue_size=2):
+        """
+        参数：
+            queue_size: 相邻阶段之间的队列容量（数据项数）
+        """
+        self.queue_size = max(1, queue_size)
+        self.stages = []
+        self.elapsed = 0.0  # 整个流水线的运行时间（秒）
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, function, in_main_thread=False):
+        """
+        添加一个阶段（按数据流动的顺序添加）
+
+        参数：
+            name: 阶段名称
+            function: 第一个阶段为无参数函数，返回可迭代对象（逐项送往下一阶段）；
+                      其余阶段为 function(数据项)，返回值送往下一阶段（最后一个阶段的返回值忽略）
+            in_main_thread: 是否在调用 run 的线程中执行（只有主线程能收到 Ctrl+C，最多一个阶段）
+
+        返回：
+            PipelineStage
+        """
+        stage = PipelineStage(name, function, in_main_thread)
+        self.stages.append(stage)
+        return stage
+
+    def _fail(self, error):
+        """记录第一个错误并通知所有阶段停止"""
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
+
+    def _put(self, stage, item):
+        """把数据项放入下游队列；队列已满时等待（阻塞时间计入该阶段）"""
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    stage.output.put(item, timeout=POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    if self._stop.is_set():
+                        raise PipelineStopped()
+        finally:
+            stage.blocked += time.perf_counter() - started
+
+    def _get(self, stage):
+        """从上游队列取出数据项；队列为空时等待（空闲时间计入该阶段），同时记录队列深度"""
+        get_metrics().observe('pipeline_queue_depth', stage.input.qsize(), buckets=DEPTH_BUCKETS, stage=stage.name)
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    return stage.input.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        raise PipelineStopped()
+        finally:
+            stage.idle += time.perf_counter() - started
+
+    def _run_stage(self, stage):
+        """执行一个阶段，直到上游的数据全部处理完毕"""
+        if stage.input is None:
+            items = iter(stage.function())
+            while True:
+                started = time.perf_counter()
+                result = next(items, _END)
+                stage.busy += time.perf_counter() - started
+                if result is _END:
+                    break
+                stage.items += 1
+                self._put(stage, result)
+        else:
+            while True:
+                item = self._get(stage)
+                if item is _END:
+                    break
+                started = time.perf_counter()
+                result = stage.function(item)
+                stage.busy += time.perf_counter() - started
+                stage.items += 1
+                if stage.output is not None:
+                    self._put(stage, result)
+        if stage.output is not None:
+            self._put(stage, _END)
+
+    def _run_thread(self, stage):
+        """在线程中执行一个阶段，出错时通知其他阶段停止"""
+        try:
+            self._run_stage(stage)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self):
+        """
+        运行流水线直到所有数据处理完毕；任何阶段出错时停止所有阶段并重新抛出第一个错误
+        """
+        for upstream, downstream in zip(self.stages, self.stages[1:]):
+            upstream.output = downstream.input = queue.Queue(self.queue_size)
+        threads = [threading.Thread(target=self._run_thread, args=(stage,), name=f"pipeline-{stage.name}", daemon=True)
+                   for stage in self.stages if not stage.in_main_thread]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            for stage in self.stages:
+                if stage.in_main_thread:
+                    try:
+                        self._run_stage(stage)
+                    except PipelineStopped:
+                        pass
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            # 主线程中的阶段出错或被中断：通知其他阶段停止，等它们在当前数据项处理完后退出
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.record_metrics()
+        if self._errors:
+            raise self._errors[0]
+
+    def record_metrics(self):
+        """把各阶段的处理、空闲和阻塞时间记入运行指标（pipeline_seconds{stage, state}）"""
+        metrics = get_metrics()
+        for stage in self.stages:
+            metrics.inc('pipeline_seconds', stage.busy, stage=stage.name, state='busy')
+            metrics.inc('pipeline_seconds', stage.idle, stage=stage.name, state='idle')
+            metrics.inc('pipeline_seconds', stage.blocked, stage=stage.name, state='blocked')
+            metrics.inc('pipeline_items', stage.items, stage=stage.name)
@@ -0,0 +1,255 @@
+"""
+翻译进度显示模块
+功能：以固定频率刷新一行进度（已完成行数、行/秒、预计剩余时间、失败行数），代替逐行输出译文；
+      输出重定向到文件时改为每隔一段时间输出一行，避免日志文件过大；
+      失败的行按原因汇总，运行结束时统一显示，不与进度混在一起
+说明：状态行只在终端中原地刷新；其他信息应通过 write 输出，先清除状态行，下次刷新时再重新显示
+"""
+
+import collections  # 用于保存最近的进度采样（计算近期速度）
+import sys  # 用于输出到标准输出
+import threading  # 用于保护输出（重试等待的提示来自工作线程）
+import time  # 用于计时
+import unicodedata  # 用于计算中文等全角字符在终端中的显示宽度
+
+# 计算速度时参考的最近时长（秒）：使用近期速度估算剩余时间，不受恢复、跳过的行影响
+RATE_WINDOW_SECONDS = 30.0
+
+
+def format_duration(seconds):
+    """
+    把秒数格式化为便于阅读的时长
+
+    参数：
+        seconds: 秒数
+
+    返回：
+        如'42秒'、'3分05秒'或'2小时07分'
+    """
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds // 3600}小时{seconds % 3600 // 60:02d}分"
+
+
+def display_width(text):
+    """
+    计算文本在终端中的显示宽度（中文等全角字符占两列）
+
+    参数：
+        text: 文本
+
+    返回：
+        列数
+    """
+    return sum(2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1 for char in text)
+
+
+class ProgressReporter:
+    """
+    单行进度显示：update 可以在每行处理后调用，只有距上次输出超过刷新间隔时才真正输出，开销很小
+    """
+
+    def __init__(self, total=None, stream=None, interval=0.5, log_interval=30.0, enabled=True, max_samples=5):
+        """
+        参数：
+            total: 总行数（未知时为None，不显示百分比和剩余时间）
+            stream: 输出流（默认使用输出时的 sys.stdout，便于被重定向）
+            interval: 终端中状态行的刷新间隔（秒）
+            log_interval: 输出不是终端（重定向到文件）时，每隔多少秒输出一行进度
+            enabled: 是否显示进度（为False时只收集失败原因）
+            max_samples: 每个失败原因最多保留的行号个数
+        """
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.log_interval = log_interval
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.done = 0
+        self.failed = 0
+        self.failures = {}  # 失败原因 -> {'count': 行数, 'rows': [行号, ...]}
+        self.started = time.monotonic()
+        self._samples = collections.deque([(self.started, 0)])  # 最近的 (时间, 已完成行数)
+        self._last_output = 0.0
+        self._line_width = 0  # 当前显示的状态行宽度（为0表示没有状态行）
+        self._finished = False
+        self._lock = threading.RLock()
+
+    def _stream(self):
+        return self.stream or sys.stdout
+
+    def _is_terminal(self):
+        isatty = getattr(self._stream(), 'isatty', None)
+        return bool(isatty and isatty())
+
+    def rate(self):
+        """
+        计算近期的处理速度
+
+        返回：
+            每秒处理的行数（还没有进度时为0）
+        """
+        now = time.monotonic()
+        first_time, first_done = self._samples[0]
+        elapsed = now - first_time
+        return (self.done - first_done) / elapsed if elapsed > 0 else 0.0
+
+    def format_status(self):
+        """
+        生成状态行文本
+
+        返回：
+            如'进度：1200/5000 行（24.0%），35.2 行/秒，预计剩余 1分48秒，失败 3 行'
+        """
+        rate = self.rate()
+        if self.total:
+            parts = [f"进度：{self.done}/{self.total} 行（{min(self.done / self.total, 1.0) * 100:.1f}%）"]
+        else:
+            parts = [f"进度：{self.done} 行"]
+        parts.append(f"{rate:.1f} 行/秒")
+        if self.total and rate > 0 and self.done < self.total:
+            parts.append(f"预计剩余 {format_duration((self.total - self.done) / rate)}")
+        parts.append(f"失败 {self.failed} 行")
+        parts.append(f"已用 {format_duration(time.monotonic() - self.started)}")
+        return '，'.join(parts)
+
+    def update(self, done, failed=0, force=False):
+        """
+        更新进度；距上次输出未超过刷新间隔时只记录数值
+
+        参数：
+            done: 已处理的行数（包括成功、失败和跳过的行）
+            failed: 失败的行数
+            force: 是否立即输出
+        """
+        self.done = done
+        self.failed = failed
+        if not self.enabled or self._finished and not force:
+            return
+        now = time.monotonic()
+        terminal = self._is_terminal()
+        if not force and now - self._last_output < (self.interval if terminal else self.log_interval):
+            return
+        with self._lock:
+            self._samples.append((now, done))
+            while len(self._samples) > 2 and now - self._samples[1][0] >= RATE_WINDOW_SECONDS:
+                self._samples.popleft()
+            self._last_output = now
+            status = self.format_status()
+            stream = self._stream()
+            if terminal:
+                # 原地刷新：回到行首并用空格覆盖上次较长的内容
+                width = display_width(status)
+                stream.write('\r' + status + ' ' * max(0, self._line_width - width))
+                self._line_width = width
+            else:
+                stream.write(status + '\n')
+            stream.flush()
+
+    def clear(self):
+        """清除终端中的状态行（之后输出的内容不会与状态行混在一起）"""
+        with self._lock:
+            if self._line_width:
+                stream = self._stream()
+                stream.write('\r' + ' ' * self._line_width + '\r')
+                stream.flush()
+                self._line_width = 0
+
+    def write(self, message):
+        """
+        输出一条信息：先清除状态行，下次更新进度时再重新显示状态行
+
+        参数：
+            message: 信息文本
+        """
+        with self._lock:
+            self.clear()
+            print(message, file=self._stream())
+
+    def add_failure(self, rows, reason):
+        """
+        记录失败的行
+
+        参数：
+            rows: 行号列表（批量模式中也可以是"文件:行号"形式的字符串）
+            reason: 失败原因
+        """
+        with self._lock:
+            entry = self.failures.setdefault(reason, {'count': 0, 'rows': []})
+            entry['count'] += len(rows)
+            entry['rows'].extend(rows[:self.max_samples - len(entry['rows'])])
+
+    def merge_failures(self, failures, source=None):
+        """
+        合并另一个进度显示收集的失败原因（批量模式下合并各文件的结果）
+
+        参数：
+            failures: 另一个实例的 failures
+            source: 来源名称（如文件名），会加在行号前面
+        """
+        for reason, entry in failures.items():
+            rows = [f"{source}:{row}" if source else row for row in entry['rows']]
+            self.add_failure(rows, reason)
+            self.failures[reason]['count'] += entry['count'] - len(rows)
+
+    def finish(self):
+        """结束进度显示：输出最终的状态行并换行（重复调用时不再输出）"""
+        if not self.enabled or self._finished:
+            return
+        with self._lock:
+            self._finished = True
+            self.update(self.done, self.failed, force=True)
+            if self._line_width:
+                self._stream().write('\n')
+                self._stream().flush()
+                self._line_width = 0
+
+    def print_failures(self, limit=20):
+        """
+        按原因汇总打印失败的行（行数多的原因在前）
+
+        参数：
+            limit: 最多显示的原因个数
+        """
+        if not self.failures:
+            return
+        total = sum(entry['count'] for entry in self.failures.values())
+        print(f"\n✗ 失败汇总：共 {total} 行，{len(self.failures)} 种原因")
+        ranked = sorted(self.failures.items(), key=lambda item: item[1]['count'], reverse=True)
+        for reason, entry in ranked[:limit]:
+            shown = '、'.join(str(row) for row in entry['rows'])
+            more = f"等 {entry['count']} 行" if entry['count'] > len(entry['rows']) else ""
+            print(f"  {reason}：{entry['count']} 行（第 {shown} 行{more}）")
+        if len(ranked) > limit:
+            print(f"  ……其他 {len(ranked) - limit} 种原因共 {sum(entry['count'] for _, entry in ranked[limit:])} 行")
+
+
+_progress = ProgressReporter(enabled=False)
+
+
+def get_progress():
+    """
+    获取当前的进度显示
+
+    返回：
+        ProgressReporter实例（没有正在进行的翻译时为不显示进度的默认实例）
+    """
+    return _progress
+
+
+def set_progress(reporter):
+    """
+    设置当前的进度显示（每次运行开始时创建新的实例）
+
+    参数：
+        reporter: ProgressReporter实例
+
+    返回：
+        reporter
+    """
+    global _progress
+    _progress = reporter
+    return reporter
@@ -0,0 +1,39 @@
+"""
+测试配置：把项目目录加入模块搜索路径（各模块是项目根目录下的独立文件，不是包），并提供共用的测试夹具
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translate_excel as te  # noqa: E402
+from mock_server import start_mock_server  # noqa: E402
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """
+    启动本地模拟翻译服务，把有道和DeepL的接口地址都指向它；
+    使用占位密钥、不使用翻译缓存、取消频率限制，测试结束后恢复原来的配置
+    """
+    server = start_mock_server(latency=0, jitter=0)
+    base_url = server.url.rstrip('/')
+    monkeypatch.setattr(te, 'YOUDAO_API_URL', base_url + '/api')
+    monkeypatch.setattr(te, 'YOUDAO_BATCH_API_URL', base_url + '/v2/api')
+    monkeypatch.setattr(te, 'DEEPL_API_URL', base_url + '/v2/translate')
+    monkeypatch.setattr(te, 'YOUDAO_APP_KEY', 'mock')
+    monkeypatch.setattr(te, 'YOUDAO_APP_SECRET', 'mock')
+    monkeypatch.setattr(te, 'DEEPL_API_KEY', 'mock')
+    monkeypatch.setattr(te, 'CACHE_ENABLED', False)
+    monkeypatch.setattr(te, 'LOG_LEVEL', 'quiet')
+    monkeypatch.setattr(te, '_rate_limiters', {})
+    monkeypatch.setattr(te, '_credential_pools', {})
+    monkeypatch.setattr(te, '_routers', {})
+    for service in ('youdao', 'deepl'):
+        monkeypatch.setitem(te.RATE_LIMITS, service, {'requests_per_second': None, 'chars_per_second': None})
+    yield server
+    server.shutdown()
+    server.server_close()
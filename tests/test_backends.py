@@ -0,0 +1,153 @@
+"""
+翻译服务后端的测试：有道签名，以及通过本地模拟翻译服务（mock_server.py）往返的单条和批量接口
+"""
+
+import hashlib
+
+import pytest
+
+import translate_excel as te
+from mock_server import start_mock_server
+
+
+def test_youdao_sign_input_truncates_after_20_chars():
+    assert te.get_youdao_sign_input('a' * 20) == 'a' * 20
+    text = '0123456789' + 'x' * 11 + 'abcdefghij'
+    assert te.get_youdao_sign_input(text) == '0123456789' + '31' + 'abcdefghij'
+    assert te.get_youdao_sign_input('短文本') == '短文本'
+
+
+def test_build_youdao_sign():
+    text = '这是一段超过二十个字符的中文文本，用于检查签名的截取规则'
+    expected_input = text[:10] + str(len(text)) + text[-10:]
+    expected = hashlib.sha256(('key' + expected_input + '42' + '1700000000' + 'secret').encode('utf-8')).hexdigest()
+    assert te.build_youdao_sign(text, '42', '1700000000', 'key', 'secret') == expected
+
+
+def test_build_youdao_sign_for_batch_uses_joined_texts():
+    texts = ['第一条文本', 'second text', '第三条']
+    joined = ''.join(texts)
+    assert te.build_youdao_sign(joined, '1', '2', 'k', 's') == te.build_youdao_sign(
+        '第一条文本second text第三条', '1', '2', 'k', 's')
+    assert te.build_youdao_sign(joined, '1', '2', 'k', 's') != te.build_youdao_sign(
+        ''.join(reversed(texts)), '1', '2', 'k', 's')
+
+
+def youdao_credential(app_key='mock', app_secret='mock'):
+    return te.ApiCredential('youdao', 0, {'app_key': app_key, 'app_secret': app_secret})
+
+
+def deepl_credential():
+    return te.ApiCredential('deepl', 0, {'auth_key': 'mock'})
+
+
+def test_youdao_batch_round_trip(mock_server):
+    texts = ['你好', '订单[0]已发货', 'こんにちは']
+    credential = youdao_credential()
+    results = te.translate_batch_youdao(texts, 'auto', 'en', credential)
+    assert [result.text for result in results] == [f'<en> {text}' for text in texts]
+    assert credential.used_chars == sum(len(text) for text in texts)
+    assert credential.request_count == 1
+
+
+def test_youdao_long_texts_are_signed_like_the_api(mock_server):
+    # 拼接后超过20个字符：模拟服务按截取规则校验签名
+    texts = ['这是一段超过二十个字符的中文文本，用于检查签名', 'second text with more than twenty characters']
+    results = te.translate_batch_youdao(texts, 'auto', 'en', youdao_credential())
+    assert [result.text for result in results] == [f'<en> {text}' for text in texts]
+    result = te.translate_text_youdao(texts[1], 'en', 'zh-CHS', youdao_credential())
+    assert result.text == f'<zh-CHS> {texts[1]}'
+
+
+def test_youdao_wrong_sign_is_rejected(mock_server, monkeypatch):
+    result, = te.translate_batch_youdao(['你好'], 'auto', 'en', youdao_credential(app_secret='wrong'), max_retries=0)
+    assert result.text is None
+    # 签名时没有截取长文本（旧的规则）
+    monkeypatch.setattr(te, 'get_youdao_sign_input', lambda text: text)
+    texts = ['这是一段超过二十个字符的中文文本，用于检查签名']
+    result, = te.translate_batch_youdao(texts, 'auto', 'en', youdao_credential(), max_retries=0)
+    assert result.text is None
+    assert mock_server.snapshot()['youdao_batch']['rejected'] == 2
+
+
+def test_deepl_batch_round_trip(mock_server):
+    texts = ['Hello', 'Order [0] shipped', 'Good morning']
+    credential = deepl_credential()
+    results = te.translate_batch_deepl(texts, 'auto', 'ZH', credential)
+    assert [result.text for result in results] == [f'<ZH> {text}' for text in texts]
+    assert credential.used_chars == sum(len(text) for text in texts)
+
+
+def test_youdao_single_round_trip(mock_server, monkeypatch):
+    monkeypatch.setattr(te, 'YOUDAO_BATCH_MODE', False)
+    results = te.get_backend('youdao').translate_batch(['你好', '世界'], 'zh', 'en', youdao_credential())
+    assert [result.text for result in results] == ['<en> 你好', '<en> 世界']
+
+
+def test_youdao_single_permanent_errors_are_not_retryable(mock_server, monkeypatch):
+    monkeypatch.setattr(te, 'YOUDAO_BATCH_MODE', False)
+    backend = te.get_backend('youdao')
+    # 文本过长：不发送请求
+    result, = backend.translate_batch(['长' * 2500], 'zh', 'en', youdao_credential())
+    assert result.text is None and not result.retryable
+    # 缺少appKey（有道错误代码101）
+    result, = backend.translate_batch(['你好'], 'zh', 'en', youdao_credential(app_key=''))
+    assert result.text is None and not result.retryable
+
+
+def test_youdao_single_quota_error_disables_key(monkeypatch):
+    server = start_mock_server(latency=0, jitter=0, quota_chars=1)
+    try:
+        monkeypatch.setattr(te, 'YOUDAO_API_URL', server.url.rstrip('/') + '/api')
+        monkeypatch.setattr(te, 'YOUDAO_BATCH_MODE', False)
+        monkeypatch.setattr(te, '_rate_limiters', {})
+        monkeypatch.setitem(te.RATE_LIMITS, 'youdao', {'requests_per_second': None, 'chars_per_second': None})
+        credential = youdao_credential()
+        result, = te.get_backend('youdao').translate_batch(['你好'], 'zh', 'en', credential)
+        assert result.text is None and not result.retryable
+        assert credential.disabled_reason is not None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeResponse:
+    """只有状态码和JSON内容的响应（用于模拟模拟翻译服务不会返回的异常响应）"""
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+
+@pytest.mark.parametrize('payload', [
+    {'translations': [{'text': '只有一条'}]},
+    {'translations': []},
+    {'unexpected': True},
+])
+def test_deepl_malformed_response_is_not_counted_as_success(monkeypatch, payload):
+    monkeypatch.setattr(te, 'http_post', lambda service, url, data: FakeResponse(payload))
+    monkeypatch.setattr(te, '_rate_limiters', {})
+    monkeypatch.setitem(te.RATE_LIMITS, 'deepl', {'requests_per_second': None, 'chars_per_second': None})
+    credential = deepl_credential()
+    credential.throttle_streak = 2
+    results = te.translate_batch_deepl(['Hello', 'World'], 'auto', 'ZH', credential)
+    assert all(result.text is None for result in results)
+    assert credential.used_chars == 0
+    assert credential.request_count == 0
+    assert credential.throttle_streak == 2
+
+
+def test_youdao_batch_counts_only_translated_chars(monkeypatch):
+    payload = {'errorCode': '0', 'errorIndex': [1],
+               'translateResults': [{'query': '你好', 'translation': 'Hello', 'errorCode': '0'}]}
+    monkeypatch.setattr(te, 'http_post', lambda service, url, data: FakeResponse(payload))
+    monkeypatch.setattr(te, '_rate_limiters', {})
+    monkeypatch.setitem(te.RATE_LIMITS, 'youdao', {'requests_per_second': None, 'chars_per_second': None})
+    credential = youdao_credential()
+    results = te.translate_batch_youdao(['你好', '世界和平'], 'auto', 'en', credential)
+    assert [result.text for result in results] == ['Hello', None]
+    assert credential.used_chars == 2
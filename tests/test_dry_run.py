@@ -0,0 +1,48 @@
+"""
+预估模式的测试：查询翻译缓存和翻译记忆时不修改缓存，占位符替换开启时不查询翻译记忆
+"""
+
+import translate_excel as te
+
+
+def test_dry_run_does_not_touch_cache_counters(tmp_path, monkeypatch):
+    cache = te.TranslationCache(str(tmp_path / 'cache.sqlite3'))
+    try:
+        cache.set_many('deepl', 'zh', 'en', [('订单1024已发货', 'Order 1024 shipped'), ('你好', 'Hello')])
+        last_used = cache._conn.execute("SELECT source_text, last_used FROM translations").fetchall()
+        monkeypatch.setattr(te, 'CACHE_ENABLED', True)
+        monkeypatch.setattr(te, '_translation_cache', cache)
+        monkeypatch.setattr(te, 'MASK_UNTRANSLATABLE', False)
+
+        estimator = te.DryRunEstimator('deepl')
+        estimator.add_texts(['你好', '订单1025已发货', '新的文本'])
+
+        assert estimator.cache_hits == 1
+        assert estimator.memory_hits == 1
+        assert (cache.hits, cache.misses, cache.memory_hits) == (0, 0, 0)
+        assert cache._conn.execute("SELECT source_text, last_used FROM translations").fetchall() == last_used
+    finally:
+        cache.close()
+
+
+def test_memory_is_skipped_when_masking_is_on(tmp_path, monkeypatch):
+    cache = te.TranslationCache(str(tmp_path / 'cache.sqlite3'))
+    try:
+        cache.set_many('deepl', 'zh', 'en', [('订单[0]已发货', 'Order [0] shipped')])
+        monkeypatch.setattr(te, 'CACHE_ENABLED', True)
+        monkeypatch.setattr(te, '_translation_cache', cache)
+        monkeypatch.setattr(te, 'MASK_UNTRANSLATABLE', True)
+
+        def fail(*args):
+            raise AssertionError("占位符替换开启时不应查询翻译记忆")
+        monkeypatch.setattr(cache, 'find_similar', fail)
+
+        estimator = te.DryRunEstimator('deepl')
+        estimator.add_texts(['订单1024已发货', '订单1025已发货', '订单１０２６已发货'])
+
+        # 编号替换为占位符后三条文本相同，直接命中翻译缓存
+        assert estimator.cache_hits == 1
+        assert estimator.memory_hits == 0
+        assert estimator.texts_to_translate == 0
+    finally:
+        cache.close()
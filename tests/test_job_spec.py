@@ -0,0 +1,26 @@
+"""
+命令行翻译任务（--job）解析的测试
+"""
+
+import pytest
+
+import translate_excel as te
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('A:B', [te.TranslationJob(None, 1, 2, 'auto')]),
+    ('A:B:ja', [te.TranslationJob(None, 1, 2, 'ja')]),
+    ('S:A:B:ja', [te.TranslationJob('S', 1, 2, 'ja')]),
+    ('A:B:zh-ja', [te.TranslationJob(None, 1, 2, 'zh-ja')]),
+    ('S:A:B', [te.TranslationJob('S', 1, 2, 'auto')]),
+    ('S:A:B:auto', [te.TranslationJob('S', 1, 2, 'auto')]),
+    ('S:A:B=en,C=ja', [te.TranslationJob('S', 1, 2, 'en'), te.TranslationJob('S', 1, 3, 'ja')]),
+])
+def test_parse_job_spec(spec, expected):
+    assert te.parse_job_spec(spec) == expected
+
+
+@pytest.mark.parametrize('spec', ['A', 'S:A:B:C:ja', 'A:B:xx-yy', 'A:B:zh-zh'])
+def test_parse_job_spec_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        te.parse_job_spec(spec)
@@ -0,0 +1,28 @@
+"""
+language_detect 的测试
+"""
+
+import pytest
+
+from language_detect import detect_language, detect_languages
+
+
+@pytest.mark.parametrize('text, lang', [
+    ('你好世界', 'zh'),
+    ('型号A-1024的螺丝', 'zh'),
+    ('Hello world', 'en'),
+    ('こんにちは', 'ja'),
+    ('東京タワー', 'ja'),
+    ('안녕하세요', 'ko'),
+    ('Привет', 'ru'),
+    ('12,345.00 / 2024-05-01', 'none'),
+    ('[0]，[1]', 'none'),
+    ('مرحبا', 'unknown'),
+])
+def test_detect_language(text, lang):
+    assert detect_language(text) == lang
+
+
+def test_detect_languages_matches_single_detection():
+    texts = ['你好', 'Hello', '你好', 'こんにちは', '', '123', 'Hello']
+    assert detect_languages(texts) == [detect_language(text) for text in texts]
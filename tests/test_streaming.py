@@ -0,0 +1,35 @@
+"""
+流式翻译的测试：通过本地模拟翻译服务翻译一个工作簿，检查译文和统计数据
+"""
+
+import openpyxl
+
+import translate_excel as te
+
+
+def test_streaming_stats_are_complete(mock_server, tmp_path):
+    input_file = str(tmp_path / 'input.xlsx')
+    output_file = str(tmp_path / 'output.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['原文', '译文', '日文'])
+    rows = 600
+    for index in range(rows):
+        # 重复文本、只有编号不同的文本和不需要翻译的编号交替出现
+        sheet.append([['句子{}'.format(index % 37), '订单A-{}已发货'.format(index), 'SKU-{}'.format(index)][index % 3]])
+    workbook.save(input_file)
+
+    jobs = te.parse_job_spec('Sheet:A:B') + te.parse_job_spec('Sheet:A:C=ja')
+    stats = te.new_run_stats()
+    te.translate_workbook_streaming(input_file, output_file, jobs, 2, 'deepl', stats, chunk_rows=20)
+
+    # 每行的每个目标恰好计入一项结果（两个线程同时修改统计字典时会丢失计数）
+    assert sum(stats[result] for result in te.ROW_RESULTS) == rows * len(jobs)
+    assert stats['fail'] == 0
+    assert stats['untranslated'] == rows // 3 * len(jobs)
+    assert stats['masked'] == rows * 2 // 3  # 每行的片段只替换一次，与目标个数无关
+
+    output = openpyxl.load_workbook(output_file).active
+    assert output.cell(2, 2).value == '<EN> 句子0'
+    assert output.cell(3, 3).value == '<JA> 订单A-1已发货'
+    assert output.cell(4, 2).value == 'SKU-2'
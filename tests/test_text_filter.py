@@ -0,0 +1,52 @@
+"""
+text_filter 的测试：片段识别、占位符替换与还原
+"""
+
+import pytest
+
+from text_filter import mask_tokens, placeholders_intact, restore_tokens, renumber_placeholders
+
+
+@pytest.mark.parametrize('text, masked, tokens', [
+    # 网址和邮箱不吞掉紧挨着的中文
+    ('请访问https://example.com了解更多', '请访问[0]了解更多', ['https://example.com']),
+    ('联系我abc@x.com', '联系我[0]', ['abc@x.com']),
+    ('邮件abc@x.com或电话', '邮件[0]或电话', ['abc@x.com']),
+    ('官网www.example.com，欢迎访问', '官网[0]，欢迎访问', ['www.example.com']),
+    # 网址末尾的标点不属于网址
+    ('See https://a.com/x?y=1.', 'See [0].', ['https://a.com/x?y=1']),
+    ('(see https://a.com/p)', '(see [0])', ['https://a.com/p']),
+    # 不含文字的日期替换，含年月日的日期交给翻译服务
+    ('更新于2024-03-05', '更新于[0]', ['2024-03-05']),
+    ('更新于2024/3/5', '更新于[0]', ['2024/3/5']),
+    ('价格2024年3月5日更新', '价格2024年3月5日更新', []),
+    ('5日内发货', '5日内发货', []),
+    # 编号、时间、数字
+    ('型号A-1024的螺丝', '型号[0]的螺丝', ['A-1024']),
+    ('10:30开会', '[0]开会', ['10:30']),
+    ('售价1,299.50元，折扣15%', '售价[0]元，折扣[1]', ['1,299.50', '15%']),
+    # 原文已含类似占位符的内容时不替换
+    ('见[1]和A-1024', '见[1]和A-1024', []),
+])
+def test_mask_tokens(text, masked, tokens):
+    assert mask_tokens(text) == (masked, tokens)
+
+
+def test_restore_round_trip():
+    masked, tokens = mask_tokens('订单A-1024于2024-03-05发货')
+    assert restore_tokens(masked, tokens) == '订单A-1024于2024-03-05发货'
+    # 翻译服务把方括号换成全角时也能还原
+    assert restore_tokens('Order 【0】 shipped on ［1］', tokens) == 'Order A-1024 shipped on 2024-03-05'
+
+
+def test_placeholders_intact():
+    assert placeholders_intact('no placeholders', 0)
+    assert placeholders_intact('[1] and [0]', 2)
+    assert not placeholders_intact('only [0]', 2)
+    assert not placeholders_intact('[0] [0] [1]', 2)
+
+
+def test_renumber_placeholders():
+    text, tokens = renumber_placeholders('第二句[2]和[3]。', ['a1', 'b2', 'c3', 'd4'])
+    assert text == '第二句[0]和[1]。'
+    assert tokens == ['c3', 'd4']
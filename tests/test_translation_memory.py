@@ -0,0 +1,75 @@
+"""
+translation_memory 的测试：记忆键和译文套用
+"""
+
+import sqlite3
+
+import pytest
+
+from translation_memory import memory_key, adapt_translation
+
+
+@pytest.mark.parametrize('first, second', [
+    ('a part', 'apart'),
+    ('no one', 'noone'),
+    ("I'll", 'Ill'),
+    ('re-cover', 'recover'),
+    ('Is it here.', 'Is it here!'),
+    ('Is it here.', 'Is it here?'),
+    ('订单已发货。', '订单已发货'),
+    ('Open', 'open'),
+])
+def test_different_texts_have_different_keys(first, second):
+    assert memory_key(first)[0] != memory_key(second)[0]
+    assert adapt_translation('translation', first, second) is None
+
+
+@pytest.mark.parametrize('first, second', [
+    ('订单1024已发货', '订单1025已发货'),
+    ('Order  A-1024 shipped ', 'Order A-2048 shipped'),
+    ('价格：15%', '价格：20%'),  # 全角冒号经NFKC统一为半角
+    ('见[0]', '见［0］'),
+])
+def test_same_keys(first, second):
+    assert memory_key(first)[0] == memory_key(second)[0]
+
+
+def test_memory_key_tokens():
+    key, tokens = memory_key('型号A-1024，售价1,299元')
+    assert tokens == ['A-1024', '1,299']
+    assert 'A-1024' not in key
+
+
+def test_adapt_translation_replaces_tokens():
+    assert adapt_translation('Order 1024 has shipped', '订单1024已发货', '订单1025已发货') == 'Order 1025 has shipped'
+    # 相同片段原样返回
+    assert adapt_translation('Order 1024 has shipped', '订单1024已发货', '订单1024已发货') == 'Order 1024 has shipped'
+
+
+def test_adapt_translation_gives_up_when_tokens_do_not_match():
+    # 片段在译文中找不到
+    assert adapt_translation('Order one thousand shipped', '订单1024已发货', '订单1025已发货') is None
+    # 片段在译文中出现的次数与原文不同
+    assert adapt_translation('Order 1024 (1024) shipped', '订单1024已发货', '订单1025已发货') is None
+    # 同一片段在新文本中对应不同的片段
+    assert adapt_translation('1024 to 1024', '从1024到1024', '从1025到1026') is None
+
+
+def test_cache_recomputes_outdated_memory_keys(tmp_path):
+    from translate_excel import TranslationCache
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = TranslationCache(path)
+    cache.set('deepl', 'EN', 'ZH', 'a part', '一部分')
+    cache.close()
+    # 模拟按旧方法（忽略空白和标点）计算的记忆键
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE translations SET memory_key = 'apart'")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    cache = TranslationCache(path)
+    try:
+        assert cache.get_similar('deepl', 'EN', 'ZH', ['apart']) == {}
+        assert cache.get_similar('deepl', 'EN', 'ZH', ['a  part']) == {'a  part': '一部分'}
+    finally:
+        cache.close()
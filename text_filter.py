@@ -0,0 +1,118 @@
+"""
+不需要翻译的内容过滤与占位符保护
+功能：识别网址、邮箱、日期、时间、编号（如 A-1024、SKU-88/XL）、数字等不需要翻译的片段；
+      整个单元格只由这些片段和标点组成时无需调用翻译API；混合文本中把这些片段替换为占位符 [0]、[1]…
+      再发送，译文返回后按编号还原，既节省字符数，也避免编号被翻译或改写
+"""
+
+import re
+
+# 不需要翻译的片段（按顺序匹配，前面的优先）；用前后断言代替\b，因为中文字符也算作\w
+# 网址和邮箱只由ASCII字符组成，不会把紧挨着的中文吞进去；网址末尾的句号、逗号等标点不算网址的一部分
+# "2024年5月1日"这类日期含有需要翻译的文字，不替换（数字后紧跟年、月、日时也不替换），交给翻译服务处理
+TOKEN_PATTERN = re.compile(
+    r"""
+    https?://[A-Za-z0-9\-._~:/?\#@!$&*+,;=%]+(?<![.,;:!?])               # 网址
+    | www\.[A-Za-z0-9\-._~:/?\#@!$&*+,;=%]+(?<![.,;:!?])
+    | [A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+                # 邮箱
+    | (?<![A-Za-z0-9])\d{4}[-/.]\d{1,2}[-/.]\d{1,2}(?![0-9])              # 日期：2024-05-01、2024/5/1
+    | (?<![A-Za-z0-9])\d{1,2}[/.]\d{1,2}[/.]\d{2,4}(?![0-9])           # 日期：05/01/2024
+    | (?<![A-Za-z0-9])\d{1,2}:\d{2}(?::\d{2})?(?![0-9])                # 时间：10:30、10:30:15
+    | (?<![A-Za-z0-9])                                                  # 编号：含数字和字母，可用 - _ . / 连接
+      (?=(?:[A-Za-z0-9]|[-_./](?=[A-Za-z0-9]))*?[0-9])
+      (?=(?:[A-Za-z0-9]|[-_./](?=[A-Za-z0-9]))*?[A-Za-z])
+      [A-Za-z0-9]+(?:[-_./][A-Za-z0-9]+)*
+      (?![A-Za-z0-9])
+    | (?<![A-Za-z0-9])\d+(?:[-/]\d+)+(?![A-Za-z0-9])                   # 数字组：电话号码、范围
+    | (?<![A-Za-z0-9.])\d+(?:,\d{3})*(?:\.\d+)?%?(?![A-Za-z0-9年月日])   # 数字、金额、百分比
+    """,
+    re.VERBOSE,
+)
+
+# 占位符（翻译服务有时把方括号换成全角，还原时一并识别）
+PLACEHOLDER_FORMAT = '[{}]'
+PLACEHOLDER_PATTERN = re.compile(r'[\[【［]\s*(\d+)\s*[\]】］]')
+
+
+def mask_tokens(text):
+    """
+    把文本中不需要翻译的片段替换为占位符
+
+    参数：
+        text: 原文
+
+    返回：
+        (替换后的文本, 被替换的片段列表)；原文本身含有类似占位符的内容时不替换，返回(原文, [])
+    """
+    if PLACEHOLDER_PATTERN.search(text):
+        return text, []
+    tokens = []
+
+    def replace(match):
+        tokens.append(match.group())
+        return PLACEHOLDER_FORMAT.format(len(tokens) - 1)
+
+    masked = TOKEN_PATTERN.sub(replace, text)
+    return masked, tokens
+
+
+def placeholders_intact(translation, token_count):
+    """
+    检查译文是否完整保留了所有占位符
+
+    参数：
+        translation: 译文
+        token_count: 原文中的占位符个数
+
+    返回：
+        True表示每个占位符都恰好出现一次；原文没有占位符时总是True
+    """
+    if not token_count:
+        return True
+    found = sorted(int(number) for number in PLACEHOLDER_PATTERN.findall(translation))
+    return found == list(range(token_count))
+
+
+def restore_tokens(translation, tokens):
+    """
+    把译文中的占位符还原为原来的片段
+
+    参数：
+        translation: 译文
+        tokens: mask_tokens 返回的片段列表
+
+    返回：
+        还原后的译文
+    """
+    if not tokens:
+        return translation
+
+    def replace(match):
+        index = int(match.group(1))
+        return tokens[index] if index < len(tokens) else match.group()
+
+    return PLACEHOLDER_PATTERN.sub(replace, translation)
+
+
+def renumber_placeholders(text, tokens):
+    """
+    从已替换占位符的长文本中取出一段后，把这一段中的占位符重新从0编号
+
+    这样不同单元格中相同句子（只是编号、数字不同）替换后的文本完全一致，可以共用去重和缓存的结果。
+
+    参数：
+        text: 一段已替换占位符的文本
+        tokens: 整个单元格的片段列表
+
+    返回：
+        (重新编号后的文本, 这一段的片段列表)
+    """
+    if not tokens:
+        return text, []
+    segment_tokens = []
+
+    def replace(match):
+        segment_tokens.append(tokens[int(match.group(1))])
+        return PLACEHOLDER_FORMAT.format(len(segment_tokens) - 1)
+
+    return PLACEHOLDER_PATTERN.sub(replace, text), segment_tokens
@@ -6,60 +6,173 @@ Excel中英互译脚本
 
 import openpyxl  # 用于读写Excel文件
 import requests  # 用于发送HTTP请求调用API
+from requests.adapters import HTTPAdapter  # 用于配置HTTP连接池大小
 import hashlib  # 用于生成MD5或SHA256签名
 import time  # 用于生成时间戳
 import random  # 用于生成随机数（salt）
 import re  # 用于正则表达式，判断是否为中文
 import string  # 用于列号字母转数字
+import sqlite3  # 用于持久化翻译缓存
+import threading  # 用于保护缓存数据库连接
+import unicodedata  # 用于规范化缓存键中的文本
+import argparse  # 用于解析命令行参数
+import os  # 用于处理输出文件路径
+import json  # 用于读写翻译进度记录和任务配置文件
+import sys  # 用于非交互模式的退出码
+import io  # 用于收集批量模式中每个文件的输出
+import glob  # 用于批量模式按通配符查找工作簿
+import contextlib  # 用于重定向批量模式工作进程的输出
+import multiprocessing  # 用于批量模式多进程共享频率限制
+import email.utils  # 用于解析HTTP日期格式的Retry-After响应头
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed  # 用于并发发送翻译请求和批量处理文件
+from collections import namedtuple  # 用于定义批量翻译的单条结果
+from urllib.parse import quote_plus  # 用于估算表单编码后的请求体大小
+# 语言检测
+from language_detect import detect_languages, LANGUAGE_NAMES, LANG_EN, LANG_ZH, LANG_NONE, LANG_UNKNOWN
+# 不需要翻译的内容过滤与占位符保护
+from text_filter import mask_tokens, renumber_placeholders, placeholders_intact, restore_tokens
+# 翻译记忆：复用只有编号、数字等片段不同的文本的译文
+from translation_memory import memory_key, adapt_translation, MEMORY_KEY_VERSION
+# 运行指标（各阶段耗时、请求延时、重试和频率限制次数等）
+from metrics import get_metrics
+# 单行进度显示和失败汇总
+from progress import ProgressReporter, format_duration, get_progress, set_progress
+# 流式模式的分阶段流水线（读取、分类去重、翻译、写入由有界队列连接）
+from pipeline import Pipeline
 
 # ==================== 配置区域 ====================
 # 有道翻译API配置
 YOUDAO_APP_KEY = ''  # 替换为你的有道AppKey
 YOUDAO_APP_SECRET = ''  # 替换为你的有道AppSecret
 YOUDAO_API_URL = 'https://openapi.youdao.com/api'
+YOUDAO_BATCH_API_URL = 'https://openapi.youdao.com/v2/api'  # 有道批量翻译API地址
 
 # DeepL翻译API配置
 DEEPL_API_KEY = ''  # 替换为你的DeepL API密钥
 DEEPL_API_URL = 'https://api-free.deepl.com/v2/translate'  # DeepL免费版API地址
 # 如果使用DeepL Pro（付费版），使用：'https://api.deepl.com/v2/translate'
 
+# 多账号密钥池与跨服务切换
+# 除上面的单个密钥外，还可以在这里（或任务配置文件的 credentials 中）添加更多账号，同一服务的请求分摊到各个账号，
+# 每个账号按 RATE_LIMITS 单独限速；quota_chars 为该账号剩余的字符配额（可选，DeepL会在开始时自动查询）
+YOUDAO_CREDENTIALS = []  # 如 [{'app_key': '...', 'app_secret': '...', 'quota_chars': 1000000}]
+DEEPL_CREDENTIALS = []  # 如 [{'auth_key': '...'}]
+FAILOVER_SERVICES = []  # 所选服务的所有账号都被限流或配额用完时改用的翻译服务，如 ['deepl']（命令行参数 --failover）
+KEY_THROTTLE_THRESHOLD = 3  # 一个账号连续收到多少次频率限制信号后暂停使用（优先使用其他账号）
+KEY_COOLDOWN_SECONDS = 60.0  # 账号暂停使用的时长（秒）
+KEY_FAILOVER_RETRIES = 1  # 还有其他可用账号时，同一账号遇到频率限制后的重试次数（之后改用其他账号）
+
 # Excel文件路径
 EXCEL_FILE = '中英互译测试.xlsx'  # 可以修改为你需要翻译的Excel文件名
 
-# 翻译延时设置（秒）
-TRANSLATE_DELAY = 1.0  # 每次翻译之间的延时（秒），固定1秒
-RETRY_DELAY = 1.0  # 遇到频率限制错误时的重试延时（秒），固定1秒
-MAX_RETRIES = 3  # 遇到频率限制错误时的最大重试次数
+# 并发和频率限制设置
+CONCURRENCY = 4  # 同时进行中的翻译请求数（命令行参数 --concurrency 可修改）
+# 每个翻译服务的频率限制（所有并发请求共享）：每秒请求数、每秒字符数；设为None表示不限制
+RATE_LIMITS = {
+    'youdao': {'requests_per_second': 1.0, 'chars_per_second': 5000},
+    'deepl': {'requests_per_second': 2.0, 'chars_per_second': 50000},
+}
+
+# HTTP连接设置（每个翻译服务使用一个保持连接的会话，复用TCP/TLS连接）
+HTTP_CONNECT_TIMEOUT = 5.0  # 建立连接的超时时间（秒）
+HTTP_READ_TIMEOUT = 30.0  # 等待响应的超时时间（秒）
+HTTP_POOL_MAXSIZE = None  # 每个服务地址最多保持的连接数（None表示与并发请求数相同）
+
+# 自适应退避和速率控制设置
+RETRY_DELAY = 1.0  # 遇到频率限制错误时的初始重试延时（秒），之后每次重试翻倍并加入随机抖动
+RETRY_MAX_DELAY = 60.0  # 单次重试延时的上限（秒），服务端返回的Retry-After同样受此限制
+MAX_RETRIES = 5  # 遇到频率限制错误时单个请求的最大重试次数
+RETRY_PASSES = 2  # 重试队列的轮数：整轮翻译结束后，因频率限制或网络问题失败的文本再统一重试
+RETRY_PASS_DELAY = 10.0  # 每轮重试队列开始前的冷却时间（秒）
+RATE_DECREASE_FACTOR = 0.5  # 收到频率限制信号时，全局请求速率乘以该系数（乘性减）
+RATE_INCREASE_STEP = 0.05  # 每次请求成功后，全局每秒请求数增加该值，直到恢复配置值（加性增）
+RATE_MIN_REQUESTS_PER_SECOND = 0.1  # 自适应降速的下限（每秒请求数）
+ADAPTIVE_FALLBACK_RATE = 10.0  # 未配置每秒请求数（不限速）的服务被限流时，从该速率开始自适应控制
+
+# 批量翻译设置
+MAX_TEXT_LENGTH = 2000  # 单次翻译的最大文本长度（字符）
+MASK_UNTRANSLATABLE = True  # 是否把编号、网址、日期、数字等替换为占位符（整格都是这些内容时不调用API）
+OTHER_LANGUAGE_TARGET = 'zh'  # 检测到日文、韩文、俄文时翻译成的目标语言
+SEGMENT_LONG_TEXT = True  # 超过长度限制的单元格是否按句子拆分后翻译（False时跳过并写入错误提示）
+DEEPL_MAX_TEXTS_PER_REQUEST = 50  # DeepL单次请求最多可携带50个text参数
+DEEPL_MAX_REQUEST_BYTES = 128 * 1024  # DeepL单次请求体总大小上限（128KiB）
+YOUDAO_BATCH_MODE = True  # 是否使用有道批量翻译接口（False时逐条调用普通翻译接口）
+YOUDAO_MAX_TEXTS_PER_REQUEST = 50  # 有道批量翻译单次请求最多携带的q参数个数
+YOUDAO_MAX_REQUEST_CHARS = 5000  # 有道批量翻译单次请求所有q的总字符数上限
+
+# 批量模式设置（处理整个目录的工作簿，多个进程共享频率限制和翻译缓存）
+BATCH_WORKERS = None  # 工作进程数（None表示使用CPU核数）
+
+# 流式模式设置（超大工作簿：只读读取、只写输出到新文件，内存占用与总行数无关）
+STREAMING_CHUNK_ROWS = 5000  # 每次读取并翻译的行数
+PIPELINE_QUEUE_SIZE = 1  # 相邻阶段之间最多排队的块数（内存中最多约有 3×该值+4 块）
+
+# 进度记录与检查点设置（程序中断后可使用 --resume 继续）
+CHECKPOINT_ROWS = 500  # 每翻译多少行保存一次工作簿
+CHECKPOINT_SECONDS = 300  # 每隔多少秒保存一次工作簿
+
+# 翻译缓存设置（本地SQLite文件，重复运行时相同文本不再调用API）
+CACHE_ENABLED = True  # 是否启用翻译缓存（命令行参数 --no-cache 可临时禁用）
+CACHE_FILE = 'translation_cache.sqlite3'  # 缓存文件路径
+CACHE_MAX_ENTRIES = 500000  # 缓存最多保留的条目数，超出时淘汰最久未使用的条目
+CACHE_MAX_AGE_DAYS = 180  # 缓存条目的最长保留天数，超过后淘汰
+TRANSLATION_MEMORY = True  # 是否复用只有编号、数字等片段不同的文本的译文（命令行参数 --no-memory 可临时禁用；
+                           # 只在 MASK_UNTRANSLATABLE = False 时生效，见 memory_enabled）
+MEMORY_CANDIDATES = 3  # 同一记忆键最多尝试套用的已有译文条数
+
+# 运行指标设置（各阶段耗时、请求延时、重试和频率限制次数、等待时间等）
+METRICS_JSON_FILE = None  # 运行结束后写入JSON汇总的文件路径（命令行参数 --metrics-json）
+METRICS_PROMETHEUS_FILE = None  # 运行结束后写入Prometheus textfile的路径，应以.prom结尾（命令行参数 --metrics-prom）
+
+# 预估模式设置（命令行参数 --dry-run：只扫描源列，估算请求数、计费字符数和耗时，不调用翻译API）
+DRY_RUN_REQUEST_SECONDS = 0.5  # 估算耗时时假设的单个请求平均耗时（秒）
+
+# 输出设置
+# 'quiet'：不显示进度和过程信息，只显示结果汇总；'normal'：显示单行进度；'verbose'：另外逐行显示原文、译文和重试等详情
+LOG_LEVEL = 'normal'  # 命令行参数 --quiet / --verbose 可修改
+PROGRESS_INTERVAL = 0.5  # 终端中进度行的刷新间隔（秒）
+PROGRESS_LOG_INTERVAL = 30.0  # 输出重定向到文件时，每隔多少秒输出一行进度
+FAILURE_SUMMARY_LIMIT = 20  # 运行结束时最多显示的失败原因个数
 # ================================================
 
 
-def detect_language(text):
+# 批量翻译中单条文本的结果：text为译文（失败时为None），error为失败原因（成功时为None），
+# retryable表示失败是否由频率限制或网络问题等暂时性原因导致（可放入重试队列稍后再试），
+# service为实际完成翻译的服务（切换到其他服务时与所选服务不同，用于写入缓存）
+TranslationResult = namedtuple('TranslationResult', ['text', 'error', 'retryable', 'service'], defaults=[False, None])
+
+# 翻译任务：把指定工作表的源列翻译到目标列（列为编号），direction为翻译方向（见 parse_direction）；
+# 同一源列可以有多个任务（翻译成多种语言，写入不同的目标列），运行时每行只读取和检测一次
+TranslationJob = namedtuple('TranslationJob', ['sheet', 'source_column', 'target_column', 'direction'],
+                            defaults=['auto'])
+
+# 由翻译服务识别源语言（只指定了目标语言、且检测不出原文语言时使用）
+LANG_AUTO = 'auto'
+
+# 有道翻译中表示账号本身有问题的错误代码（appKey无效、签名校验失败、账号无效、余额不足）：该账号在本次运行中不再使用
+YOUDAO_ACCOUNT_ERROR_CODES = ['108', '109', '111', '401']
+
+
+def log_info(message):
     """
-    自动检测文本是中文还是英文
+    输出过程信息（quiet模式下不显示），不会与进度行混在一起
     
     参数：
-        text: 要检测的文本
-    
-    返回：
-        'zh' 表示中文，'en' 表示英文，'unknown' 表示无法判断
+        message: 信息文本
     """
-    # 使用正则表达式匹配中文字符（Unicode范围：\u4e00-\u9fff）
-    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-    
-    # 统计文本中的中文字符数量
-    chinese_chars = len(chinese_pattern.findall(text))
-    
-    # 统计文本中英文字母和数字的数量
-    english_chars = len(re.findall(r'[a-zA-Z0-9]', text))
+    if LOG_LEVEL != 'quiet':
+        get_progress().write(message)
+
+
+def log_detail(message):
+    """
+    输出逐行详情（原文、译文、重试等，只在verbose模式下显示）
     
-    # 如果中文字符数量 > 0，且中文字符数量 > 英文字符数量的一半，判定为中文
-    # 这样可以避免一些混合文本被误判
-    if chinese_chars > 0 and chinese_chars >= english_chars * 0.3:
-        return 'zh'  # 中文
-    elif english_chars > 0:
-        return 'en'  # 英文
-    else:
-        return 'unknown'  # 无法判断（可能是数字或其他字符）
+    参数：
+        message: 信息文本
+    """
+    if LOG_LEVEL == 'verbose':
+        get_progress().write(message)
 
 
 def get_error_message(error_code):
@@ -96,183 +209,752 @@ def get_error_message(error_code):
     return error_codes.get(str(error_code), f'未知错误（错误代码：{error_code}）')
 
 
-def translate_text_youdao(text, from_lang='zh-CHS', to_lang='en', retry_count=0):
+class TokenBucket:
+    """
+    线程安全的令牌桶，用于限制单位时间内的请求数或字符数
+    
+    令牌按固定速率补充，最多积累到capacity；请求的令牌不足时先预支，
+    调用方按欠下的令牌数等待相应时间，这样单次请求量超过桶容量时也能正常限速。
+    """
+    
+    def __init__(self, rate, capacity=None):
+        """
+        参数：
+            rate: 每秒补充的令牌数（None或0表示不限制）
+            capacity: 桶容量（默认与rate相同，至少为1）
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate or 0, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, amount=1):
+        """
+        获取令牌，令牌不足时阻塞等待
+        
+        参数：
+            amount: 需要的令牌数
+        
+        返回：
+            实际等待的秒数
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def set_rate(self, rate):
+        """
+        修改令牌补充速率（已积累的令牌按旧速率结算）
+        
+        参数：
+            rate: 新的每秒补充令牌数（None表示不限制）
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+            self.capacity = max(rate or 0, 1)
+            self._tokens = min(self._tokens, self.capacity)
+
+
+class SharedTokenBucket:
+    """
+    多进程共享的令牌桶（接口与TokenBucket相同）
+    
+    速率、令牌数等状态保存在共享内存中，由进程锁保护；
+    批量模式下所有工作进程使用同一组令牌桶，合起来不会超过翻译服务的频率限制。
+    """
+    
+    def __init__(self, rate):
+        """
+        参数：
+            rate: 每秒补充的令牌数（None或0表示不限制）
+        """
+        capacity = max(rate or 0, 1)
+        # 共享状态：[速率（0表示不限制）, 桶容量, 当前令牌数, 上次结算时间]
+        self._state = multiprocessing.Array('d', [rate or 0.0, capacity, capacity, time.monotonic()], lock=False)
+        self._lock = multiprocessing.Lock()
+    
+    @property
+    def rate(self):
+        return self._state[0] or None
+    
+    @property
+    def capacity(self):
+        return self._state[1]
+    
+    def _refill(self, now):
+        """按当前速率结算令牌（调用方需持有锁）"""
+        rate, capacity, tokens, updated = self._state
+        if rate:
+            self._state[2] = min(capacity, tokens + (now - updated) * rate)
+        self._state[3] = now
+    
+    def acquire(self, amount=1):
+        """
+        获取令牌，令牌不足时阻塞等待
+        
+        参数：
+            amount: 需要的令牌数
+        
+        返回：
+            实际等待的秒数
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._state[2] -= amount
+            tokens = self._state[2]
+            wait = -tokens / self._state[0] if tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def set_rate(self, rate):
+        """
+        修改令牌补充速率（已积累的令牌按旧速率结算）
+        
+        参数：
+            rate: 新的每秒补充令牌数（None表示不限制）
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._state[0] = rate or 0.0
+            self._state[1] = max(rate or 0, 1)
+            self._state[2] = min(self._state[2], self._state[1])
+
+
+class RateLimiter:
+    """
+    翻译服务的频率限制器：同时按每秒请求数和每秒字符数限速，所有并发请求共享同一个实例
+    """
+    
+    def __init__(self, requests_per_second=None, chars_per_second=None, requests_bucket=None, chars_bucket=None,
+                 service=None):
+        """
+        参数：
+            requests_per_second: 每秒最多请求数（None表示不限制）
+            chars_per_second: 每秒最多发送的字符数（None表示不限制）
+            requests_bucket: 可选的请求数令牌桶（批量模式传入多进程共享的SharedTokenBucket）
+            chars_bucket: 可选的字符数令牌桶
+            service: 翻译服务名称（用作运行指标的标签）
+        """
+        self.service = service
+        self.max_requests_per_second = requests_per_second  # 配置的速率，自适应控制不会超过该值
+        self.requests = requests_bucket or TokenBucket(requests_per_second)
+        self.chars = chars_bucket or TokenBucket(chars_per_second)
+        self.wait_time = 0.0  # 累计限速等待时间（秒）
+        self.throttle_count = 0  # 收到频率限制信号的次数
+        self._lock = threading.Lock()
+    
+    def acquire(self, chars=0):
+        """
+        发送一个请求前调用，必要时阻塞等待
+        
+        参数：
+            chars: 本次请求发送的字符数
+        """
+        waited = self.requests.acquire(1)
+        if chars:
+            waited += self.chars.acquire(chars)
+        with self._lock:
+            self.wait_time += waited
+        metrics = get_metrics()
+        metrics.inc('chars_sent', chars, service=self.service)
+        if waited:
+            metrics.inc('sleep_seconds', waited, kind='rate_limit', service=self.service)
+    
+    @property
+    def current_rate(self):
+        """
+        当前生效的每秒请求数（None表示不限制）
+        """
+        return self.requests.rate
+    
+    def on_throttle(self, code=None):
+        """
+        收到频率限制信号（如有道202/411/412、HTTP 429）时调用：全局请求速率乘性下降
+        
+        参数：
+            code: 错误代码或HTTP状态码（用作运行指标的标签）
+        """
+        get_metrics().inc('throttle_events', service=self.service, code=code)
+        with self._lock:
+            self.throttle_count += 1
+            rate = self.requests.rate or ADAPTIVE_FALLBACK_RATE
+            self.requests.set_rate(max(RATE_MIN_REQUESTS_PER_SECOND, rate * RATE_DECREASE_FACTOR))
+    
+    def on_success(self):
+        """
+        请求成功时调用：全局请求速率加性恢复，直到回到配置值
+        """
+        with self._lock:
+            rate = self.requests.rate
+            if rate is None:
+                return
+            rate += RATE_INCREASE_STEP
+            max_rate = self.max_requests_per_second
+            if max_rate is None:
+                # 原本不限速的服务恢复到起始速率后，取消限速
+                self.requests.set_rate(None if rate >= ADAPTIVE_FALLBACK_RATE else rate)
+            elif rate < max_rate:
+                self.requests.set_rate(rate)
+            elif self.requests.rate != max_rate:
+                self.requests.set_rate(max_rate)
+
+
+_rate_limiters = {}  # (翻译服务, 账号序号) -> RateLimiter
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(service, key_index=0):
+    """
+    获取翻译服务某个账号共享的频率限制器（首次使用时按RATE_LIMITS创建；每个账号单独限速）
+    
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+        key_index: 账号在密钥池中的序号（默认第一个账号）
+    
+    返回：
+        RateLimiter实例
+    """
+    with _rate_limiters_lock:
+        if (service, key_index) not in _rate_limiters:
+            limits = get_backend(service).rate_limits
+            _rate_limiters[(service, key_index)] = RateLimiter(limits.get('requests_per_second'),
+                                                               limits.get('chars_per_second'), service=service)
+        return _rate_limiters[(service, key_index)]
+
+
+def configure_rate_limit(service, requests_per_second=None, chars_per_second=None):
+    """
+    修改翻译服务的频率限制（替换该服务所有账号已有的限制器）
+    
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+        requests_per_second: 每秒最多请求数（None表示不限制）
+        chars_per_second: 每秒最多发送的字符数（None表示不限制）
+    """
+    with _rate_limiters_lock:
+        RATE_LIMITS[service] = {'requests_per_second': requests_per_second, 'chars_per_second': chars_per_second}
+        for key in [key for key in _rate_limiters if key[0] == service]:
+            del _rate_limiters[key]
+
+
+_http_sessions = {}  # 翻译服务 -> requests.Session
+_http_sessions_lock = threading.Lock()
+
+
+def get_http_session(service):
+    """
+    获取翻译服务共享的HTTP会话（首次使用时创建），同一服务的所有请求复用连接池中的长连接
+    
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+    
+    返回：
+        requests.Session实例
+    """
+    with _http_sessions_lock:
+        if service not in _http_sessions:
+            pool_size = HTTP_POOL_MAXSIZE or max(1, CONCURRENCY)
+            # 不在适配器层面重试，重试由调用方的自适应退避统一处理
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_sessions[service] = session
+        return _http_sessions[service]
+
+
+def http_post(service, url, data):
+    """
+    通过翻译服务共享的HTTP会话发送POST请求（使用配置的连接/读取超时）
+    
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+        url: 请求地址
+        data: 表单参数（字典或(键, 值)列表）
+    
+    返回：
+        requests的响应对象
+    """
+    metrics = get_metrics()
+    started = time.perf_counter()
+    status = 'error'  # 超时或连接失败等没有响应的请求
+    try:
+        response = get_http_session(service).post(url, data=data, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        status = response.status_code
+        return response
+    finally:
+        metrics.observe('http_request_seconds', time.perf_counter() - started, service=service)
+        metrics.inc('http_requests', service=service, status=status)
+
+
+def get_connection_stats():
+    """
+    统计所有HTTP会话的连接使用情况
+    
+    返回：
+        字典：requests（请求数）、connections（新建连接数）、reused（复用连接的请求数）
+    """
+    stats = {'requests': 0, 'connections': 0, 'reused': 0}
+    with _http_sessions_lock:
+        sessions = list(_http_sessions.values())
+    for session in sessions:
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats['requests'] += pool.num_requests
+                stats['connections'] += pool.num_connections
+    stats['reused'] = max(0, stats['requests'] - stats['connections'])
+    return stats
+
+
+def close_http_sessions():
+    """
+    关闭所有HTTP会话及其连接池
+    """
+    with _http_sessions_lock:
+        for session in _http_sessions.values():
+            session.close()
+        _http_sessions.clear()
+
+
+def parse_retry_after(response):
+    """
+    解析响应头中的Retry-After（支持秒数和HTTP日期两种格式）
+    
+    参数：
+        response: requests的响应对象
+    
+    返回：
+        需要等待的秒数；没有该响应头或无法解析时返回None
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_backoff_delay(retry_count, retry_after=None):
+    """
+    计算重试前的等待时间：优先使用服务端的Retry-After，否则按指数退避并加入随机抖动
+    
+    参数：
+        retry_count: 已重试的次数（从0开始）
+        retry_after: 服务端要求等待的秒数（没有时为None）
+    
+    返回：
+        等待秒数
+    """
+    if retry_after is not None:
+        return min(retry_after, RETRY_MAX_DELAY)
+    delay = min(RETRY_MAX_DELAY, RETRY_DELAY * (2 ** retry_count))
+    # 随机抖动：在[delay/2, delay]之间取值，避免多个并发请求在同一时刻重试
+    return random.uniform(delay / 2, delay)
+
+
+def wait_before_retry(reason, retry_count, retry_after=None, service=None, code=None):
+    """
+    输出重试提示（verbose模式下显示）并等待
+    
+    参数：
+        reason: 需要重试的原因
+        retry_count: 已重试的次数（从0开始）
+        retry_after: 服务端要求等待的秒数（没有时为None）
+        service: 翻译服务（用作运行指标的标签）
+        code: 错误代码或HTTP状态码（用作运行指标的标签）
+    """
+    delay = compute_backoff_delay(retry_count, retry_after)
+    log_detail(f"  ⏳ {reason}，等待 {delay:.1f} 秒后自动重试（第 {retry_count + 1}/{MAX_RETRIES} 次）...")
+    metrics = get_metrics()
+    metrics.inc('retries', service=service, code=code)
+    metrics.inc('sleep_seconds', delay, kind='retry', service=service)
+    time.sleep(delay)
+
+
+def get_youdao_sign_input(text):
+    """
+    计算有道翻译API v3签名中使用的input字段
+    
+    参数：
+        text: 参与签名的原文（批量翻译时为所有q按顺序拼接后的字符串）
+    
+    返回：
+        input字段：文本长度超过20字符时为 前10个字符 + 文本长度 + 后10个字符，否则为原文
+    """
+    if len(text) > 20:
+        return text[:10] + str(len(text)) + text[-10:]
+    return text
+
+
+def build_youdao_sign(text, salt, curtime, app_key=None, app_secret=None):
+    """
+    生成有道翻译API v3签名
+    
+    参数：
+        text: 参与签名的原文（批量翻译时为所有q按顺序拼接后的字符串）
+        salt: 随机数
+        curtime: 时间戳（秒级）
+        app_key: 应用ID（默认使用 YOUDAO_APP_KEY）
+        app_secret: 应用密钥（默认使用 YOUDAO_APP_SECRET）
+    
+    返回：
+        SHA256签名（十六进制字符串）
+    """
+    app_key = YOUDAO_APP_KEY if app_key is None else app_key
+    app_secret = YOUDAO_APP_SECRET if app_secret is None else app_secret
+    # 拼接签名字符串：appKey + input + salt + 时间戳 + appSecret
+    sign_str = app_key + get_youdao_sign_input(text) + salt + curtime + app_secret
+    
+    # 使用SHA256算法对签名字符串进行加密，得到签名
+    return hashlib.sha256(sign_str.encode('utf-8')).hexdigest()
+
+
+def translate_text_youdao(text, from_lang='zh-CHS', to_lang='en', credential=None, max_retries=None):
     """
-    调用有道翻译API翻译文本（带重试机制）
+    调用有道翻译API翻译文本（带自适应退避重试）
     
     参数：
         text: 要翻译的文本
         from_lang: 源语言，默认是中文（有道格式：zh-CHS, en）
         to_lang: 目标语言，默认是英文（有道格式：zh-CHS, en）
-        retry_count: 当前重试次数（内部使用）
+        credential: 使用的账号（ApiCredential，默认为密钥池中的第一个账号）
+        max_retries: 遇到频率限制时的最大重试次数（默认 MAX_RETRIES）
     
     返回：
-        翻译后的文本，如果失败返回None
+        TranslationResult（失败时 retryable 表示稍后重试或改用其他账号是否可能成功）
     """
+    credential = credential or get_default_credential('youdao')
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
     try:
         # 检查文本长度（有道翻译API实际限制，文本过长会导致411错误）
         text_length = len(text)
         if text_length > 5000:
-            print(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过5000字符限制，请缩短文本")
-            return None
+            log_detail(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过5000字符限制，请缩短文本")
+            return TranslationResult(None, f"文本过长：{text_length} 字符，超过5000字符限制")
         elif text_length > 2000:
             # 文本过长，会直接返回错误，不发送请求
-            print(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过建议长度2000字符")
-            print(f"     💡 建议：请将文本缩短至2000字符以内，或分段处理")
-            return None
+            log_detail(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过建议长度2000字符")
+            log_detail("     💡 建议：请将文本缩短至2000字符以内，或分段处理")
+            return TranslationResult(None, f"文本过长：{text_length} 字符，超过建议长度2000字符")
         
         # 检查文本是否为空
         if not text or not text.strip():
-            print("❌ 文本为空，跳过翻译")
-            return None
-        
-        # 生成随机数作为salt（盐值），用于加密签名
-        salt = str(random.randint(1, 65536))
+            log_detail("❌ 文本为空，跳过翻译")
+            return TranslationResult(None, "文本为空")
         
-        # 获取当前时间戳（秒级）
-        curtime = str(int(time.time()))
-        
-        # 计算签名：如果文本长度超过200字符，需要截取前10个字符和最后10个字符参与签名
-        # 这是有道翻译API v3的要求，避免签名字符串过长
-        input_text = text
-        if len(input_text) > 200:
-            input_text = input_text[:10] + str(len(text)) + input_text[-10:]
-        
-        # 拼接签名字符串：appKey + 原文（或截取后的） + salt + 时间戳 + appSecret
-        sign_str = YOUDAO_APP_KEY + input_text + salt + curtime + YOUDAO_APP_SECRET
-        
-        # 使用SHA256算法对签名字符串进行加密，得到签名
-        sign = hashlib.sha256(sign_str.encode('utf-8')).hexdigest()
-        
-        # 准备API请求的参数
-        data = {
-            'q': text,  # 要翻译的文本（完整文本）
-            'from': from_lang,  # 源语言
-            'to': to_lang,  # 目标语言
-            'appKey': YOUDAO_APP_KEY,  # 应用ID
-            'salt': salt,  # 随机数
-            'sign': sign,  # 签名
-            'signType': 'v3',  # 签名类型，v3表示使用SHA256
-            'curtime': curtime  # 时间戳
-        }
-        
-        # 发送POST请求到有道翻译API（推荐使用POST，避免URL长度限制）
-        # 有道翻译API v3支持POST请求，使用POST可以避免URL长度限制问题
-        response = requests.post(YOUDAO_API_URL, data=data, timeout=10)
-        
-        # 检查HTTP状态码
-        if response.status_code != 200:
-            print(f"❌ HTTP请求失败，状态码：{response.status_code}")
-            return None
-        
-        # 将返回的JSON格式数据转换为Python字典
-        result = response.json()
-        
-        # 检查返回结果中是否有错误代码
-        error_code = result.get('errorCode')
-        if error_code != '0' and error_code != 0:
-            # 如果有错误，打印详细的错误信息
-            error_msg = result.get('msg', '')
-            friendly_msg = get_error_message(error_code)
-            print(f"  ❌ 翻译失败：{friendly_msg}")
-            if error_msg:
-                print(f"     详细错误：{error_msg}")
+        limiter = credential.limiter
+        for retry_count in range(max_retries + 1):
+            # 共享频率限制，必要时等待（在生成签名之前等待，避免时间戳过期）
+            limiter.acquire(len(text))
             
-            # 对于411错误，检查是否因为文本过长
-            if str(error_code) == '411':
-                text_length = len(text)
-                print(f"     当前文本长度：{text_length} 字符")
-                # 如果文本超过2000字符，判定为文本过长错误
-                if text_length > 2000:
-                    print(f"     ❌ 文本过长错误：文本长度 {text_length} 字符，超过2000字符限制")
-                    print(f"     💡 建议：请将文本缩短至2000字符以内，或分段处理")
-                    return None  # 文本过长时，不重试，直接返回
-                else:
-                    # 文本长度正常，可能是频率限制，使用固定1秒延时重试
-                    if retry_count < MAX_RETRIES:
-                        print(f"     ⏳ 可能是频率限制，等待 {RETRY_DELAY} 秒后自动重试（第 {retry_count + 1}/{MAX_RETRIES} 次）...")
-                        time.sleep(RETRY_DELAY)  # 固定1秒延时
-                        return translate_text_youdao(text, from_lang, to_lang, retry_count + 1)
-                    else:
-                        print(f"     ❌ 已达到最大重试次数（{MAX_RETRIES}次）")
-                        print(f"     💡 建议：等待几分钟后重新运行程序")
+            # 生成随机数作为salt（盐值），用于加密签名
+            salt = str(random.randint(1, 65536))
+            
+            # 获取当前时间戳（秒级）
+            curtime = str(int(time.time()))
+            
+            # 计算签名（v3签名，使用SHA256）
+            sign = build_youdao_sign(text, salt, curtime, credential.secrets['app_key'],
+                                     credential.secrets['app_secret'])
+            
+            # 准备API请求的参数
+            data = {
+                'q': text,  # 要翻译的文本（完整文本）
+                'from': from_lang,  # 源语言
+                'to': to_lang,  # 目标语言
+                'appKey': credential.secrets['app_key'],  # 应用ID
+                'salt': salt,  # 随机数
+                'sign': sign,  # 签名
+                'signType': 'v3',  # 签名类型，v3表示使用SHA256
+                'curtime': curtime  # 时间戳
+            }
             
-            # 对于其他频率限制错误（202、412），先检查文本长度
-            elif str(error_code) in ['202', '412']:
-                text_length = len(text)
-                print(f"     当前文本长度：{text_length} 字符")
+            # 发送POST请求到有道翻译API（推荐使用POST，避免URL长度限制）
+            # 有道翻译API v3支持POST请求，使用POST可以避免URL长度限制问题
+            response = http_post('youdao', YOUDAO_API_URL, data)
+            
+            # HTTP 429：服务端要求降低请求频率
+            if response.status_code == 429:
+                credential.on_throttle(429)
+                if retry_count < max_retries:
+                    wait_before_retry("HTTP 429 请求频率超限", retry_count, parse_retry_after(response),
+                                      service='youdao', code=429)
+                    continue
+                log_detail(f"  ❌ HTTP 429 请求频率超限，已达到最大重试次数（{max_retries}次）")
+                return TranslationResult(None, f"HTTP 429 请求频率超限，已达到最大重试次数（{max_retries}次）", True)
+            
+            # 检查HTTP状态码
+            if response.status_code != 200:
+                log_detail(f"❌ HTTP请求失败，状态码：{response.status_code}")
+                return TranslationResult(None, f"HTTP请求失败，状态码：{response.status_code}",
+                                         response.status_code >= 500)
+            
+            # 将返回的JSON格式数据转换为Python字典
+            result = response.json()
+            
+            # 检查返回结果中是否有错误代码
+            error_code = result.get('errorCode')
+            if error_code != '0' and error_code != 0:
+                # 如果有错误，打印详细的错误信息
+                error_msg = result.get('msg', '')
+                friendly_msg = get_error_message(error_code)
+                log_detail(f"  ❌ 翻译失败：{friendly_msg}")
+                if error_msg:
+                    log_detail(f"     详细错误：{error_msg}")
+                if str(error_code) in YOUDAO_ACCOUNT_ERROR_CODES:
+                    credential.on_exhausted(friendly_msg)  # 密钥无效或余额不足：本次运行不再使用该账号
                 
-                # 如果文本很长（>2000字符），可能是文本过长导致的错误，不重试
-                if text_length > 2000:
-                    print(f"     ❌ 文本过长错误：虽然返回{error_code}错误，但文本长度 {text_length} 字符超过2000字符限制")
-                    print(f"     💡 建议：请将文本缩短至2000字符以内，或分段处理")
-                    return None  # 文本过长时，不重试，直接返回
+                # 对于频率限制错误（202、411、412），先检查文本长度
+                if str(error_code) in ['202', '411', '412']:
+                    log_detail(f"     当前文本长度：{text_length} 字符")
+                    
+                    # 如果文本很长（>2000字符），可能是文本过长导致的错误，不重试
+                    if text_length > 2000:
+                        log_detail(f"     ❌ 文本过长错误：虽然返回{error_code}错误，但文本长度 {text_length} 字符超过2000字符限制")
+                        log_detail("     💡 建议：请将文本缩短至2000字符以内，或分段处理")
+                        # 文本过长时，不重试，直接返回
+                        return TranslationResult(None, f"{friendly_msg}（文本长度 {text_length} 字符）")
+                    
+                    # 文本长度正常，降低全局请求速率，并按指数退避等待后重试
+                    credential.on_throttle(error_code)
+                    if retry_count < max_retries:
+                        wait_before_retry(f"频率限制错误（错误代码：{error_code}）", retry_count, parse_retry_after(response),
+                                          service='youdao', code=error_code)
+                        continue
+                    log_detail(f"     ❌ 已达到最大重试次数（{max_retries}次）")
+                    log_detail("     💡 建议：等待几分钟后重新运行程序")
+                    return TranslationResult(None, f"{friendly_msg}，已达到最大重试次数（{max_retries}次）", True)
                 
-                # 文本长度正常，进行频率限制重试（固定1秒延时）
-                if retry_count < MAX_RETRIES:
-                    print(f"     ⏳ 频率限制错误，等待 {RETRY_DELAY} 秒后自动重试（第 {retry_count + 1}/{MAX_RETRIES} 次）...")
-                    time.sleep(RETRY_DELAY)  # 固定1秒延时
-                    # 递归重试
-                    return translate_text_youdao(text, from_lang, to_lang, retry_count + 1)
-                else:
-                    print(f"     ❌ 已达到最大重试次数（{MAX_RETRIES}次）")
-                    print(f"     💡 建议：等待几分钟后重新运行程序")
-            
-            return None
-        
-        # 提取翻译结果（返回的是一个列表，取第一个元素）
-        if 'translation' in result and len(result['translation']) > 0:
-            return result['translation'][0]
-        else:
-            print(f"  ❌ 翻译结果格式异常：{result}")
-            return None
+                # 密钥无效、余额不足、参数错误等：重试也不会成功
+                return TranslationResult(None, friendly_msg)
             
+            # 提取翻译结果（返回的是一个列表，取第一个元素）；格式正确时才计入账号用量并让限制器恢复速率
+            if 'translation' in result and len(result['translation']) > 0:
+                credential.on_success(len(text))
+                return TranslationResult(result['translation'][0], None)
+            else:
+                log_detail(f"  ❌ 翻译结果格式异常：{result}")
+                return TranslationResult(None, f"翻译结果格式异常：{result}")
+        return TranslationResult(None, f"已达到最大重试次数（{max_retries}次）", True)
+    
     except requests.exceptions.Timeout:
-        print(f"  ❌ 翻译请求超时，请检查网络连接")
-        return None
+        log_detail("  ❌ 翻译请求超时，请检查网络连接")
+        return TranslationResult(None, "翻译请求超时，请检查网络连接", True)
     except requests.exceptions.RequestException as e:
-        print(f"  ❌ 网络请求异常：{str(e)}")
-        return None
+        log_detail(f"  ❌ 网络请求异常：{str(e)}")
+        return TranslationResult(None, f"网络请求异常：{str(e)}", True)
     except Exception as e:
         # 如果出现其他异常（比如JSON解析错误），打印错误信息
-        print(f"  ❌ 翻译过程中出现异常：{str(e)}")
-        return None
+        log_detail(f"  ❌ 翻译过程中出现异常：{str(e)}")
+        return TranslationResult(None, f"翻译过程中出现异常：{str(e)}")
+
 
+def translate_batch_youdao(texts, from_lang='zh-CHS', to_lang='en', credential=None, max_retries=None):
+    """
+    调用有道批量翻译API，一次请求翻译多个文本（带自适应退避重试）
+
+    参数：
+        texts: 要翻译的文本列表（调用方需保证数量和总长度不超过单次请求限制）
+        from_lang: 源语言（有道格式：zh-CHS, en）
+        to_lang: 目标语言（有道格式：zh-CHS, en）
+        credential: 使用的账号（ApiCredential，默认为密钥池中的第一个账号）
+        max_retries: 遇到频率限制时的最大重试次数（默认 MAX_RETRIES）
+
+    返回：
+        与texts一一对应的TranslationResult列表
+    """
+    def fail_all(error, retryable=False):
+        return [TranslationResult(None, error, retryable) for _ in texts]
+
+    credential = credential or get_default_credential('youdao')
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    try:
+        # 批量翻译的签名：所有q按请求中的顺序拼接后，再按单条文本的规则计算input
+        joined_text = ''.join(texts)
+        limiter = credential.limiter
+        for retry_count in range(max_retries + 1):
+            limiter.acquire(len(joined_text))  # 共享频率限制，在生成签名之前等待
+            salt = str(random.randint(1, 65536))
+            curtime = str(int(time.time()))
+            sign = build_youdao_sign(joined_text, salt, curtime, credential.secrets['app_key'],
+                                     credential.secrets['app_secret'])
+
+            # 准备API请求的参数：批量接口通过重复传入q参数携带多个文本
+            data = [('q', text) for text in texts]
+            data.extend([
+                ('from', from_lang),
+                ('to', to_lang),
+                ('appKey', credential.secrets['app_key']),
+                ('salt', salt),
+                ('sign', sign),
+                ('signType', 'v3'),
+                ('curtime', curtime),
+            ])
+
+            # 发送POST请求到有道批量翻译API
+            response = http_post('youdao', YOUDAO_BATCH_API_URL, data)
+
+            # HTTP 429：服务端要求降低请求频率
+            if response.status_code == 429:
+                credential.on_throttle(429)
+                if retry_count < max_retries:
+                    wait_before_retry("批量翻译遇到HTTP 429", retry_count, parse_retry_after(response),
+                                      service='youdao', code=429)
+                    continue
+                return fail_all(f"HTTP 429 请求频率超限，已达到最大重试次数（{max_retries}次）", retryable=True)
+
+            # 检查HTTP状态码
+            if response.status_code != 200:
+                return fail_all(f"HTTP请求失败，状态码：{response.status_code}", retryable=response.status_code >= 500)
+
+            # 将返回的JSON格式数据转换为Python字典
+            result = response.json()
+
+            # 检查整批请求的错误代码（频率限制等错误对整批生效）
+            error_code = str(result.get('errorCode'))
+            if error_code != '0':
+                friendly_msg = get_error_message(error_code)
+
+                # 202/411/412：按批次处理频率限制，降低全局请求速率，整批退避后重试
+                if error_code in ['202', '411', '412']:
+                    total_length = len(joined_text)
+                    # 411错误且批次总长度超过限制时，判定为文本过长，不重试
+                    if error_code == '411' and total_length > YOUDAO_MAX_REQUEST_CHARS:
+                        return fail_all(f"{friendly_msg}（批次总长度 {total_length} 字符）")
+                    credential.on_throttle(error_code)
+                    if retry_count < max_retries:
+                        wait_before_retry(f"批量翻译遇到频率限制（错误代码：{error_code}）", retry_count,
+                                          parse_retry_after(response), service='youdao', code=error_code)
+                        continue
+                    return fail_all(f"{friendly_msg}，已达到最大重试次数（{max_retries}次）", retryable=True)
+
+                if error_code in YOUDAO_ACCOUNT_ERROR_CODES:
+                    credential.on_exhausted(friendly_msg)  # 密钥无效或余额不足：本次运行不再使用该账号
+                return fail_all(friendly_msg)
+
+            # 解析出译文后才计入账号用量（只计翻译成功的文本）并让限制器恢复速率
+            results = parse_youdao_batch_results(texts, result)
+            translated_chars = sum(len(text) for text, item in zip(texts, results) if item.text)
+            if translated_chars:
+                credential.on_success(translated_chars)
+            return results
+        return fail_all(f"已达到最大重试次数（{max_retries}次）", retryable=True)
+
+    except requests.exceptions.Timeout:
+        return fail_all("翻译请求超时，请检查网络连接", retryable=True)
+    except requests.exceptions.RequestException as e:
+        return fail_all(f"网络请求异常：{str(e)}", retryable=True)
+    except Exception as e:
+        # 如果出现其他异常（比如JSON解析错误），整批记为失败
+        return fail_all(f"翻译过程中出现异常：{str(e)}")
+
+
+def parse_youdao_batch_results(texts, result):
+    """
+    解析有道批量翻译API的逐条结果
+
+    参数：
+        texts: 请求中的文本列表
+        result: API返回的JSON（errorCode为0）
+
+    返回：
+        与texts一一对应的TranslationResult列表
+    """
+    # errorIndex列出失败的文本下标，translateResults按顺序给出其余文本的译文
+    error_indexes = {int(index) for index in result.get('errorIndex') or []}
+    translate_results = result.get('translateResults') or []
+    success_indexes = [i for i in range(len(texts)) if i not in error_indexes]
+
+    if len(translate_results) != len(success_indexes):
+        # 数量对不上时，按返回结果中的原文（query）对应到请求中的文本
+        by_query = {item.get('query'): item for item in translate_results}
+        paired = [(i, by_query.get(texts[i])) for i in success_indexes]
+    else:
+        paired = list(zip(success_indexes, translate_results))
+
+    results = [TranslationResult(None, "有道批量翻译返回该条失败", True) for _ in texts]
+    for index, item in paired:
+        if item is None:
+            results[index] = TranslationResult(None, "有道批量翻译结果中缺少该条译文", True)
+            continue
+        item_error = str(item.get('errorCode', '0'))
+        if item_error != '0':
+            results[index] = TranslationResult(None, get_error_message(item_error), item_error in ['202', '411', '412'])
+        elif item.get('translation'):
+            translation = item['translation']
+            # 兼容单条接口的列表格式
+            if isinstance(translation, list):
+                translation = translation[0]
+            results[index] = TranslationResult(translation, None)
+        else:
+            results[index] = TranslationResult(None, f"翻译结果格式异常：{item}")
+    return results
 
-def translate_text_deepl(text, from_lang='ZH', to_lang='EN', retry_count=0):
+
+def translate_text_deepl(text, from_lang='ZH', to_lang='EN', credential=None, max_retries=None):
     """
-    调用DeepL翻译API翻译文本（带重试机制）
+    调用DeepL翻译API翻译文本（带自适应退避重试）
     
     参数：
         text: 要翻译的文本
         from_lang: 源语言，默认是中文（DeepL格式：ZH, EN，或使用auto自动检测）
         to_lang: 目标语言，默认是英文（DeepL格式：ZH, EN）
-        retry_count: 当前重试次数（内部使用）
+        credential: 使用的账号（ApiCredential，默认为密钥池中的第一个账号）
+        max_retries: 遇到频率限制时的最大重试次数（默认 MAX_RETRIES）
     
     返回：
-        翻译后的文本，如果失败返回None
+        TranslationResult（失败时 retryable 表示稍后重试或改用其他账号是否可能成功）
     """
+    credential = credential or get_default_credential('deepl')
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
     try:
         # 检查文本长度（DeepL免费版限制单次翻译文本不超过5000字符）
         text_length = len(text)
         if text_length > 5000:
-            print(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过5000字符限制，请缩短文本")
-            return None
+            log_detail(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过5000字符限制，请缩短文本")
+            return TranslationResult(None, f"文本过长：{text_length} 字符，超过5000字符限制")
         elif text_length > 2000:
             # 文本过长，会直接返回错误，不发送请求
-            print(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过建议长度2000字符")
-            print(f"     💡 建议：请将文本缩短至2000字符以内，或分段处理")
-            return None
+            log_detail(f"  ❌ 文本过长错误：文本长度 {text_length} 字符，超过建议长度2000字符")
+            log_detail("     💡 建议：请将文本缩短至2000字符以内，或分段处理")
+            return TranslationResult(None, f"文本过长：{text_length} 字符，超过建议长度2000字符")
         
         # 检查文本是否为空
         if not text or not text.strip():
-            print("❌ 文本为空，跳过翻译")
-            return None
+            log_detail("❌ 文本为空，跳过翻译")
+            return TranslationResult(None, "文本为空")
         
         # 准备API请求的参数
         # DeepL API：source_lang可以使用'auto'自动检测，也可以指定语言
         data = {
-            'auth_key': DEEPL_API_KEY,  # DeepL API密钥
+            'auth_key': credential.secrets['auth_key'],  # DeepL API密钥
             'text': text,  # 要翻译的文本
             'target_lang': to_lang,  # 目标语言（必需）
         }
@@ -283,73 +965,933 @@ def translate_text_deepl(text, from_lang='ZH', to_lang='EN', retry_count=0):
             data['source_lang'] = from_lang  # 如果明确指定了源语言，则使用指定值
         # 如果from_lang是'auto'，则不添加source_lang参数，让DeepL自动检测
         
-        # 发送POST请求到DeepL翻译API
-        response = requests.post(DEEPL_API_URL, data=data, timeout=10)
-        
-        # 检查HTTP状态码
-        if response.status_code != 200:
-            print(f"  ❌ HTTP请求失败，状态码：{response.status_code}")
-            if response.status_code == 403:
-                print(f"     💡 提示：可能是API密钥无效或权限不足")
-            elif response.status_code == 456:
-                print(f"     💡 提示：本月字符配额已用完")
-            return None
-        
-        # 将返回的JSON格式数据转换为Python字典
-        result = response.json()
-        
-        # 检查返回结果中是否有错误
-        if 'message' in result:
-            error_msg = result.get('message', '')
-            print(f"  ❌ DeepL翻译失败：{error_msg}")
+        limiter = credential.limiter
+        for retry_count in range(max_retries + 1):
+            # 发送POST请求到DeepL翻译API
+            limiter.acquire(len(text))  # 共享频率限制，必要时等待
+            response = http_post('deepl', DEEPL_API_URL, data)
             
-            # 如果是配额或频率限制错误，尝试重试
-            if response.status_code == 429 or 'quota' in error_msg.lower() or 'limit' in error_msg.lower():
-                if retry_count < MAX_RETRIES:
-                    print(f"     ⏳ 频率限制错误，等待 {RETRY_DELAY} 秒后自动重试（第 {retry_count + 1}/{MAX_RETRIES} 次）...")
-                    time.sleep(RETRY_DELAY)  # 固定1秒延时
-                    return translate_text_deepl(text, from_lang, to_lang, retry_count + 1)
-                else:
-                    print(f"     ❌ 已达到最大重试次数（{MAX_RETRIES}次）")
-                    print(f"     💡 建议：等待几分钟后重新运行程序")
+            # 频率限制（429）时，降低全局请求速率，并按指数退避（或Retry-After）等待后重试
+            if response.status_code == 429:
+                credential.on_throttle(429)
+                if retry_count < max_retries:
+                    wait_before_retry("频率限制错误（HTTP 429）", retry_count, parse_retry_after(response),
+                                      service='deepl', code=429)
+                    continue
+                log_detail(f"  ❌ 频率限制错误（HTTP 429），已达到最大重试次数（{max_retries}次）")
+                log_detail("     💡 建议：等待几分钟后重新运行程序")
+                return TranslationResult(None, f"请求频率超限，已达到最大重试次数（{max_retries}次）", True)
             
-            return None
-        
-        # 提取翻译结果
-        if 'translations' in result and len(result['translations']) > 0:
-            return result['translations'][0].get('text', None)
-        else:
-            print(f"  ❌ DeepL翻译结果格式异常：{result}")
-            return None
+            # 检查HTTP状态码
+            if response.status_code != 200:
+                log_detail(f"  ❌ HTTP请求失败，状态码：{response.status_code}")
+                if response.status_code == 403:
+                    log_detail("     💡 提示：可能是API密钥无效或权限不足")
+                    credential.on_exhausted("HTTP 403：API密钥无效或权限不足")
+                elif response.status_code == 456:
+                    log_detail("     💡 提示：本月字符配额已用完")
+                    credential.on_exhausted("HTTP 456：本月字符配额已用完")
+                return TranslationResult(None, f"HTTP请求失败，状态码：{response.status_code}",
+                                         response.status_code >= 500)
             
+            # 将返回的JSON格式数据转换为Python字典
+            result = response.json()
+            
+            # 检查返回结果中是否有错误
+            if 'message' in result:
+                error_msg = result.get('message', '')
+                log_detail(f"  ❌ DeepL翻译失败：{error_msg}")
+                
+                # 如果是配额或频率限制错误，降低全局请求速率后重试
+                if 'quota' in error_msg.lower() or 'limit' in error_msg.lower():
+                    credential.on_throttle('quota')
+                    if retry_count < max_retries:
+                        wait_before_retry("频率限制错误", retry_count, parse_retry_after(response),
+                                          service='deepl', code='quota')
+                        continue
+                    log_detail(f"     ❌ 已达到最大重试次数（{max_retries}次）")
+                    log_detail("     💡 建议：等待几分钟后重新运行程序")
+                    return TranslationResult(None, f"DeepL翻译失败：{error_msg}，已达到最大重试次数（{max_retries}次）",
+                                             True)
+                return TranslationResult(None, f"DeepL翻译失败：{error_msg}")
+            
+            # 提取翻译结果；格式正确时才计入账号用量并让限制器恢复速率
+            if 'translations' in result and len(result['translations']) > 0 and result['translations'][0].get('text'):
+                credential.on_success(len(text))
+                return TranslationResult(result['translations'][0]['text'], None)
+            else:
+                log_detail(f"  ❌ DeepL翻译结果格式异常：{result}")
+                return TranslationResult(None, f"DeepL翻译结果格式异常：{result}")
+        return TranslationResult(None, f"已达到最大重试次数（{max_retries}次）", True)
+    
     except requests.exceptions.Timeout:
-        print(f"  ❌ 翻译请求超时，请检查网络连接")
-        return None
+        log_detail("  ❌ 翻译请求超时，请检查网络连接")
+        return TranslationResult(None, "翻译请求超时，请检查网络连接", True)
     except requests.exceptions.RequestException as e:
-        print(f"  ❌ 网络请求异常：{str(e)}")
-        return None
+        log_detail(f"  ❌ 网络请求异常：{str(e)}")
+        return TranslationResult(None, f"网络请求异常：{str(e)}", True)
     except Exception as e:
         # 如果出现其他异常（比如JSON解析错误），打印错误信息
-        print(f"  ❌ 翻译过程中出现异常：{str(e)}")
-        return None
+        log_detail(f"  ❌ 翻译过程中出现异常：{str(e)}")
+        return TranslationResult(None, f"翻译过程中出现异常：{str(e)}")
 
 
-def convert_lang_code_to_youdao(lang_code):
+def estimate_form_size(text, field_name='text'):
     """
-    将语言代码转换为有道翻译API格式
-    
+    估算一个文本字段在表单编码（application/x-www-form-urlencoded）后占用的字节数
+
     参数：
-        lang_code: 语言代码（'zh' 或 'en'）
-    
+        text: 字段的值
+        field_name: 字段名，默认是'text'
+
     返回：
-        有道翻译API格式的语言代码
+        编码后的字节数（包含字段名、等号和分隔符&）
     """
-    if lang_code == 'zh':
-        return 'zh-CHS'  # 有道使用zh-CHS表示中文
-    elif lang_code == 'en':
-        return 'en'  # 有道使用en表示英文
-    else:
-        return lang_code
+    return len(field_name) + 2 + len(quote_plus(text))
+
+
+def split_into_batches(texts, max_count, max_size, measure=estimate_form_size):
+    """
+    将文本列表按数量和请求大小切分成多个批次
+
+    参数：
+        texts: 要翻译的文本列表
+        max_count: 每个批次最多包含的文本数量
+        max_size: 每个批次的最大大小（单位由measure决定）
+        measure: 计算单个文本大小的函数，默认按表单编码后的字节数计算
+
+    返回：
+        批次列表，每个批次是原列表中的下标列表（保持原有顺序）
+    """
+    batches = []
+    current_batch = []
+    current_size = 0
+
+    for index, text in enumerate(texts):
+        text_size = measure(text)
+        # 当前批次已满（数量或大小超限）时，开始一个新批次
+        if current_batch and (len(current_batch) >= max_count or current_size + text_size > max_size):
+            batches.append(current_batch)
+            current_batch = []
+            current_size = 0
+        current_batch.append(index)
+        current_size += text_size
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+# 句子切分：中文句末标点（。！？…）后直接断开；英文句末标点（.!?）后必须跟空白，避免拆开"3.5"、"e.g."等；
+# 句末的右引号、右括号归入前一句；换行也作为断开位置
+SENTENCE_PATTERN = re.compile(r'.+?(?:[。！？…]+[”’"」』）)]*|[.!?]+[”’"\')]*(?=\s)|(?=\n)|$)', re.S)
+# 句子本身超过长度限制时，依次尝试在这些位置断开
+CLAUSE_BREAK_PATTERNS = [re.compile(r'(?<=[；;：:])'), re.compile(r'(?<=[，,、])'), re.compile(r'(?<=\s)')]
+
+
+def split_long_sentence(sentence, max_length):
+    """
+    把超过长度限制的句子按分句标点、逗号、空白依次断开，仍然过长的部分按长度硬切
+    
+    参数：
+        sentence: 句子
+        max_length: 每段最大字符数
+    
+    返回：
+        分段列表（拼接后等于原句）
+    """
+    for pattern in CLAUSE_BREAK_PATTERNS:
+        pieces = [piece for piece in pattern.split(sentence) if piece]
+        if len(pieces) > 1:
+            break
+    else:
+        return [sentence[i:i + max_length] for i in range(0, len(sentence), max_length)]
+    
+    # 把相邻的小片段合并到不超过长度限制，单个片段仍然过长时继续细分
+    parts = []
+    current = ''
+    for piece in pieces:
+        if len(piece) > max_length:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.extend(split_long_sentence(piece, max_length))
+        elif len(current) + len(piece) > max_length:
+            parts.append(current)
+            current = piece
+        else:
+            current += piece
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_into_segments(text, max_length=None):
+    """
+    把长文本按句子边界拆分成若干段，每段不超过翻译服务的长度限制
+    
+    每个句子单独成段（而不是合并成尽量长的块），这样长文本中与其他单元格相同的句子
+    可以直接使用去重和缓存的结果。
+    
+    参数：
+        text: 原文（已去除首尾空白）
+        max_length: 每段最大字符数（默认使用 MAX_TEXT_LENGTH）
+    
+    返回：
+        [(段落文本, 段后的空白), ...]，按顺序拼接即为原文
+    """
+    max_length = max_length or MAX_TEXT_LENGTH
+    segments = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = match.group()
+        core = sentence.strip()
+        if not core:
+            # 连续的空白（如空行）并入前一段的分隔符
+            if segments:
+                segments[-1] = (segments[-1][0], segments[-1][1] + sentence)
+            continue
+        leading = sentence[:len(sentence) - len(sentence.lstrip())]
+        if leading and segments:
+            segments[-1] = (segments[-1][0], segments[-1][1] + leading)
+        trailing = sentence[len(sentence.rstrip()):]
+        pieces = split_long_sentence(core, max_length) if len(core) > max_length else [core]
+        for piece in pieces[:-1]:
+            segments.append((piece, ''))
+        segments.append((pieces[-1], trailing))
+    return segments
+
+
+def join_segments(translations, separators, to_lang_code):
+    """
+    把各段译文按原顺序拼接成完整译文
+    
+    参数：
+        translations: 各段译文
+        separators: 原文中各段之后的空白
+        to_lang_code: 目标语言（'zh'、'en'等）
+    
+    返回：
+        完整译文
+    """
+    parts = []
+    for index, (translation, separator) in enumerate(zip(translations, separators)):
+        parts.append(translation)
+        if index == len(translations) - 1:
+            break
+        if '\n' in separator:
+            parts.append(separator)  # 保留原文的换行
+        elif to_lang_code not in ('zh', 'ja'):
+            parts.append(' ')  # 英文等语言的句子之间需要空格（中文原文的句子之间没有空格）
+        # 中文、日文句子之间不需要空格
+    return ''.join(parts)
+
+
+def translate_batch_deepl(texts, from_lang='auto', to_lang='EN', credential=None, max_retries=None):
+    """
+    调用DeepL翻译API批量翻译多个文本（一次请求携带多个text参数，带自适应退避重试）
+
+    参数：
+        texts: 要翻译的文本列表（调用方需保证数量和大小不超过单次请求限制）
+        from_lang: 源语言（DeepL格式：ZH, EN，或使用auto自动检测）
+        to_lang: 目标语言（DeepL格式：ZH, EN）
+        credential: 使用的账号（ApiCredential，默认为密钥池中的第一个账号）
+        max_retries: 遇到频率限制时的最大重试次数（默认 MAX_RETRIES）
+
+    返回：
+        与texts一一对应的TranslationResult列表
+    """
+    def fail_all(error, retryable=False):
+        return [TranslationResult(None, error, retryable) for _ in texts]
+
+    credential = credential or get_default_credential('deepl')
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    try:
+        # 准备API请求的参数：DeepL支持在同一请求中重复传入text参数，译文按相同顺序返回
+        data = [('auth_key', credential.secrets['auth_key'])]
+        data.extend(('text', text) for text in texts)
+        data.append(('target_lang', to_lang))
+        if from_lang and from_lang.upper() != 'AUTO':
+            data.append(('source_lang', from_lang))
+
+        limiter = credential.limiter
+        total_chars = sum(len(text) for text in texts)
+        for retry_count in range(max_retries + 1):
+            # 发送POST请求到DeepL翻译API
+            limiter.acquire(total_chars)  # 共享频率限制，必要时等待
+            response = http_post('deepl', DEEPL_API_URL, data)
+
+            # 频率限制（429）时，降低全局请求速率，整批按指数退避（或Retry-After）等待后重试
+            if response.status_code == 429:
+                credential.on_throttle(429)
+                if retry_count < max_retries:
+                    wait_before_retry("频率限制错误（HTTP 429）", retry_count, parse_retry_after(response),
+                                      service='deepl', code=429)
+                    continue
+                return fail_all(f"请求频率超限，已达到最大重试次数（{max_retries}次）", retryable=True)
+
+            # 检查HTTP状态码
+            if response.status_code != 200:
+                if response.status_code in (403, 456):
+                    # 密钥无效或配额用完：本次运行不再使用该账号（有其他账号或服务时改用其他账号）
+                    error = "HTTP 403：API密钥无效或权限不足" if response.status_code == 403 else "HTTP 456：本月字符配额已用完"
+                    credential.on_exhausted(error)
+                    return fail_all(error)
+                return fail_all(f"HTTP请求失败，状态码：{response.status_code}", retryable=response.status_code >= 500)
+
+            # 将返回的JSON格式数据转换为Python字典
+            result = response.json()
+            translations = result.get('translations') or []
+
+            # 返回的译文数量必须与请求的文本数量一致，否则无法对应到行
+            if len(translations) != len(texts):
+                return fail_all(f"DeepL返回的译文数量（{len(translations)}）与请求数量（{len(texts)}）不一致")
+
+            # 响应解析和校验通过后才计入账号用量并让限制器恢复速率（格式异常的响应不算成功）
+            credential.on_success(total_chars)
+
+            results = []
+            for item in translations:
+                translated_text = item.get('text')
+                if translated_text:
+                    results.append(TranslationResult(translated_text, None))
+                else:
+                    results.append(TranslationResult(None, f"DeepL翻译结果格式异常：{item}"))
+            return results
+        return fail_all(f"已达到最大重试次数（{max_retries}次）", retryable=True)
+
+    except requests.exceptions.Timeout:
+        return fail_all("翻译请求超时，请检查网络连接", retryable=True)
+    except requests.exceptions.RequestException as e:
+        return fail_all(f"网络请求异常：{str(e)}", retryable=True)
+    except Exception as e:
+        # 如果出现其他异常（比如JSON解析错误），整批记为失败
+        return fail_all(f"翻译过程中出现异常：{str(e)}")
+
+
+class TranslationBackend:
+    """
+    翻译服务后端的接口：新增翻译服务时继承该类并调用 register_backend 注册，不需要修改其他代码
+    
+    每个后端声明单次请求的批量限制、默认频率限制和语言代码映射，并实现单条和批量翻译；
+    缓存、去重、并发、频率限制器和重试队列由调用方统一处理。
+    """
+    
+    name = ''  # 服务名称（命令行参数 --service 的取值，也是缓存键和 RATE_LIMITS 的键）
+    display_name = ''  # 显示名称
+    default_rate_limits = {'requests_per_second': None, 'chars_per_second': None}  # RATE_LIMITS 中没有配置时使用
+    language_codes = {}  # 统一语言代码（'zh'、'en'等）-> API语言代码（同时也是该服务支持的语言）
+    
+    @property
+    def max_texts_per_request(self):
+        """单次请求最多携带的文本数（1表示逐条请求）"""
+        return 1
+    
+    @property
+    def max_request_size(self):
+        """单次请求的最大大小（单位由measure决定）"""
+        return float('inf')
+    
+    def measure(self, text):
+        """
+        计算单个文本在请求中占用的大小（默认按字符数）
+        
+        参数：
+            text: 文本
+        
+        返回：
+            大小
+        """
+        return len(text)
+    
+    @property
+    def rate_limits(self):
+        """频率限制：RATE_LIMITS 中的配置优先，否则使用后端声明的默认值"""
+        return RATE_LIMITS.get(self.name) or self.default_rate_limits
+    
+    def convert_lang_code(self, lang_code):
+        """
+        将统一语言代码转换为API格式
+        
+        参数：
+            lang_code: 语言代码（'zh'、'en'等；'auto' 表示由翻译服务识别源语言）
+        
+        返回：
+            API格式的语言代码（映射表中没有时原样返回）
+        """
+        return self.language_codes.get(lang_code, lang_code)
+    
+    def supports_language(self, lang_code):
+        """
+        检查服务是否支持某种语言
+        
+        参数：
+            lang_code: 统一语言代码
+        
+        返回：
+            True表示支持
+        """
+        return lang_code in self.language_codes
+    
+    def credentials(self):
+        """
+        列出已配置的账号（不需要密钥的服务返回一个空的账号）
+        
+        返回：
+            密钥字典列表，每个字典可以带有 name（显示名称）和 quota_chars（剩余字符配额）
+        """
+        return [{}]
+    
+    def check_credentials(self):
+        """
+        检查API密钥是否已配置，未配置时打印获取方法
+        
+        返回：
+            True表示已配置
+        """
+        return True
+    
+    def fetch_remaining_quota(self, credential):
+        """
+        向翻译服务查询账号剩余的字符配额（不支持查询的服务返回None）
+        
+        参数：
+            credential: 账号（ApiCredential）
+        
+        返回：
+            剩余字符数，无法查询时为None
+        """
+        return None
+    
+    def translate_text(self, text, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        """
+        翻译单个文本（不经过缓存）
+        
+        参数：
+            text: 要翻译的文本
+            from_lang_code: 源语言代码（统一格式）
+            to_lang_code: 目标语言代码（统一格式）
+            credential: 使用的账号（ApiCredential，默认为密钥池中的第一个账号）
+            max_retries: 遇到频率限制时的最大重试次数（默认 MAX_RETRIES）
+        
+        返回：
+            翻译后的文本，如果失败返回None
+        """
+        raise NotImplementedError
+    
+    def translate_batch(self, texts, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        """
+        批量翻译多个文本（不经过缓存）；默认逐条调用 translate_text，无法区分失败原因，失败都按可以重试处理
+        （能够区分的后端应重写该方法）
+        
+        参数：
+            texts: 要翻译的文本列表（数量和大小不超过批量限制）
+            from_lang_code: 源语言代码（统一格式）
+            to_lang_code: 目标语言代码（统一格式）
+            credential: 使用的账号（ApiCredential）
+            max_retries: 遇到频率限制时的最大重试次数
+        
+        返回：
+            与texts一一对应的TranslationResult列表
+        """
+        results = []
+        for text in texts:
+            translated_text = self.translate_text(text, from_lang_code, to_lang_code, credential, max_retries)
+            if translated_text:
+                results.append(TranslationResult(translated_text, None))
+            else:
+                results.append(TranslationResult(None, "翻译失败", True))
+        return results
+
+
+class YoudaoBackend(TranslationBackend):
+    """
+    有道翻译：默认使用批量翻译接口（YOUDAO_BATCH_MODE 为 False 时逐条请求），按所有q的总字符数限制批次大小
+    """
+    
+    name = 'youdao'
+    display_name = '有道翻译'
+    default_rate_limits = {'requests_per_second': 1.0, 'chars_per_second': 5000}
+    language_codes = {  # 有道使用zh-CHS表示中文，其他语言与统一语言代码相同
+        'auto': 'auto', 'zh': 'zh-CHS', 'en': 'en', 'ja': 'ja', 'ko': 'ko', 'ru': 'ru', 'fr': 'fr', 'de': 'de',
+        'es': 'es', 'pt': 'pt', 'it': 'it', 'nl': 'nl', 'pl': 'pl', 'tr': 'tr', 'uk': 'uk', 'id': 'id', 'ar': 'ar',
+        'vi': 'vi', 'th': 'th',
+    }
+    
+    @property
+    def max_texts_per_request(self):
+        return YOUDAO_MAX_TEXTS_PER_REQUEST if YOUDAO_BATCH_MODE else 1
+    
+    @property
+    def max_request_size(self):
+        return YOUDAO_MAX_REQUEST_CHARS if YOUDAO_BATCH_MODE else float('inf')
+    
+    def credentials(self):
+        # YOUDAO_APP_KEY 是第一个账号，YOUDAO_CREDENTIALS 中的账号依次排在后面；跳过未填写的占位值
+        entries = [{'app_key': YOUDAO_APP_KEY, 'app_secret': YOUDAO_APP_SECRET}] + list(YOUDAO_CREDENTIALS)
+        return [entry for entry in entries if entry.get('app_key') and entry.get('app_secret')
+                and entry['app_key'] != '你的AppKey' and entry['app_secret'] != '你的AppSecret']
+    
+    def check_credentials(self):
+        if not self.credentials():
+            print("❌ 错误：未配置有道翻译API密钥！")
+            print("请打开 translate_excel.py 文件，修改 YOUDAO_APP_KEY 和 YOUDAO_APP_SECRET 配置")
+            return False
+        return True
+    
+    def translate_text(self, text, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        return translate_text_youdao(text, self.convert_lang_code(from_lang_code), self.convert_lang_code(to_lang_code),
+                                     credential, max_retries).text
+    
+    def translate_batch(self, texts, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        if not YOUDAO_BATCH_MODE:
+            # 逐条请求：保留每条失败是否可以重试（密钥无效、文本过长等错误不进入重试队列，也不改用其他账号）
+            return [translate_text_youdao(text, self.convert_lang_code(from_lang_code),
+                                          self.convert_lang_code(to_lang_code), credential, max_retries)
+                    for text in texts]
+        return translate_batch_youdao(texts, self.convert_lang_code(from_lang_code), self.convert_lang_code(to_lang_code),
+                                      credential, max_retries)
+
+
+class DeepLBackend(TranslationBackend):
+    """
+    DeepL翻译：多个text参数合并到同一请求，按表单编码后的请求体字节数限制批次大小；源语言交给DeepL自动检测
+    """
+    
+    name = 'deepl'
+    display_name = 'DeepL'
+    default_rate_limits = {'requests_per_second': 2.0, 'chars_per_second': 50000}
+    language_codes = {  # DeepL使用大写语言代码，目标语言为葡萄牙文时需要指定地区；不支持越南文和泰文
+        'auto': 'auto', 'zh': 'ZH', 'en': 'EN', 'ja': 'JA', 'ko': 'KO', 'ru': 'RU', 'fr': 'FR', 'de': 'DE',
+        'es': 'ES', 'pt': 'PT-PT', 'it': 'IT', 'nl': 'NL', 'pl': 'PL', 'tr': 'TR', 'uk': 'UK', 'id': 'ID', 'ar': 'AR',
+    }
+    
+    @property
+    def max_texts_per_request(self):
+        return DEEPL_MAX_TEXTS_PER_REQUEST
+    
+    @property
+    def max_request_size(self):
+        return DEEPL_MAX_REQUEST_BYTES
+    
+    def measure(self, text):
+        return estimate_form_size(text)
+    
+    def convert_lang_code(self, lang_code):
+        # DeepL使用大写语言代码
+        return self.language_codes.get(lang_code, lang_code.upper())
+    
+    def credentials(self):
+        # DEEPL_API_KEY 是第一个账号，DEEPL_CREDENTIALS 中的账号依次排在后面；跳过未填写的占位值
+        entries = [{'auth_key': DEEPL_API_KEY}] + list(DEEPL_CREDENTIALS)
+        return [entry for entry in entries if entry.get('auth_key') and entry['auth_key'] != '你的DeepL_API_Key']
+    
+    def check_credentials(self):
+        if not self.credentials():
+            print("❌ 错误：未配置DeepL API密钥！")
+            print("请打开 translate_excel.py 文件，修改 DEEPL_API_KEY 配置")
+            print("\n获取DeepL API密钥的方法：")
+            print("  1. 访问 https://www.deepl.com/zh/pro-api")
+            print("  2. 注册并登录账号")
+            print("  3. 在账户中获取API密钥")
+            return False
+        return True
+    
+    def fetch_remaining_quota(self, credential):
+        # DeepL的用量接口与翻译接口在同一路径下：/v2/usage 返回本计费周期已用字符数和字符上限
+        usage_url = DEEPL_API_URL.rsplit('/', 1)[0] + '/usage'
+        try:
+            response = http_post('deepl', usage_url, {'auth_key': credential.secrets['auth_key']})
+            if response.status_code != 200:
+                return None
+            usage = response.json()
+            return max(0, int(usage['character_limit']) - int(usage['character_count']))
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError):
+            return None
+    
+    def translate_text(self, text, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        # 使用'auto'让DeepL自动检测源语言，这样更智能
+        return translate_text_deepl(text, 'auto', self.convert_lang_code(to_lang_code), credential, max_retries).text
+    
+    def translate_batch(self, texts, from_lang_code, to_lang_code, credential=None, max_retries=None):
+        return translate_batch_deepl(texts, 'auto', self.convert_lang_code(to_lang_code), credential, max_retries)
+
+
+TRANSLATION_BACKENDS = {}  # 服务名称 -> TranslationBackend
+
+
+def register_backend(backend):
+    """
+    注册翻译服务后端（同名后端会被替换）
+    
+    参数：
+        backend: TranslationBackend实例
+    
+    返回：
+        传入的backend
+    """
+    TRANSLATION_BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(service):
+    """
+    获取已注册的翻译服务后端
+    
+    参数：
+        service: 服务名称（'youdao'、'deepl'等）
+    
+    返回：
+        TranslationBackend实例
+    """
+    if service not in TRANSLATION_BACKENDS:
+        raise ValueError(f"不支持的翻译服务：{service}（可选：{'、'.join(TRANSLATION_BACKENDS)}）")
+    return TRANSLATION_BACKENDS[service]
+
+
+register_backend(YoudaoBackend())
+register_backend(DeepLBackend())
+
+
+class ApiCredential:
+    """
+    密钥池中的一个账号：保存密钥、用量和健康状态；每个账号使用自己的频率限制器
+    
+    连续收到 KEY_THROTTLE_THRESHOLD 次频率限制信号后暂停使用 KEY_COOLDOWN_SECONDS 秒（没有其他账号时仍会使用），
+    密钥无效或配额用完后本次运行不再使用
+    """
+    
+    def __init__(self, service, index, secrets):
+        """
+        参数：
+            service: 翻译服务名称
+            index: 账号在密钥池中的序号（也是频率限制器的键）
+            secrets: 密钥字典（如有道的 app_key/app_secret、DeepL的 auth_key，可带 name 和 quota_chars）
+        """
+        self.service = service
+        self.index = index
+        self.secrets = secrets
+        self.name = secrets.get('name') or f"{service}#{index + 1}"
+        self.quota_chars = secrets.get('quota_chars')  # 剩余字符配额（None表示未知）
+        self.used_chars = 0  # 本次运行翻译成功的字符数
+        self.request_count = 0  # 成功的请求数
+        self.throttle_count = 0  # 收到频率限制信号的次数
+        self.throttle_streak = 0  # 连续收到频率限制信号的次数（请求成功后清零）
+        self.cooldown_until = 0.0  # 暂停使用的截止时间（time.monotonic()）
+        self.disabled_reason = None  # 停用原因（None表示可用）
+        self.in_flight = 0  # 正在进行中的请求数（由TranslationRouter维护）
+        self.last_used = 0.0  # 最近一次分配请求的时间
+        self._lock = threading.Lock()
+    
+    @property
+    def limiter(self):
+        """该账号的频率限制器"""
+        return get_rate_limiter(self.service, self.index)
+    
+    @property
+    def remaining_quota(self):
+        """剩余字符配额（未知时为None）"""
+        if self.quota_chars is None:
+            return None
+        return max(0, self.quota_chars - self.used_chars)
+    
+    def is_usable(self, chars=0):
+        """
+        判断账号能否用于翻译指定字符数的请求（不考虑是否在暂停中）
+        
+        参数：
+            chars: 请求的字符数
+        
+        返回：
+            True表示账号未停用且剩余配额足够
+        """
+        remaining = self.remaining_quota
+        return self.disabled_reason is None and (remaining is None or remaining >= max(chars, 1))
+    
+    def is_cooling_down(self):
+        """账号是否因连续被限流而暂停使用中"""
+        return time.monotonic() < self.cooldown_until
+    
+    def on_success(self, chars):
+        """
+        请求成功时调用：累计用量，清零连续限流次数，并让频率限制器恢复速率
+        
+        参数：
+            chars: 本次请求翻译的字符数
+        """
+        with self._lock:
+            self.used_chars += chars
+            self.request_count += 1
+            self.throttle_streak = 0
+        self.limiter.on_success()
+        get_metrics().inc('key_chars', chars, service=self.service, key=self.name)
+    
+    def on_throttle(self, code=None):
+        """
+        收到频率限制信号时调用：频率限制器降速，连续次数达到阈值时暂停使用该账号
+        
+        参数：
+            code: 错误代码或HTTP状态码
+        """
+        self.limiter.on_throttle(code)
+        with self._lock:
+            self.throttle_count += 1
+            self.throttle_streak += 1
+            paused = self.throttle_streak >= KEY_THROTTLE_THRESHOLD and not self.is_cooling_down()
+            if paused:
+                self.cooldown_until = time.monotonic() + KEY_COOLDOWN_SECONDS
+                self.throttle_streak = 0
+        if paused:
+            log_detail(f"  ⚠ 账号 {self.name} 连续收到 {KEY_THROTTLE_THRESHOLD} 次频率限制信号，"
+                       f"暂停使用 {KEY_COOLDOWN_SECONDS:g} 秒")
+    
+    def on_exhausted(self, reason):
+        """
+        密钥无效或配额用完时调用：本次运行不再使用该账号
+        
+        参数：
+            reason: 停用原因
+        """
+        with self._lock:
+            if self.disabled_reason is not None:
+                return
+            self.disabled_reason = reason
+        get_metrics().inc('key_disabled', service=self.service, key=self.name)
+        log_info(f"⚠ 账号 {self.name} 已停用：{reason}")
+    
+    def describe_status(self):
+        """
+        返回：
+            账号状态文本：'可用'、'暂停使用中'或'已停用（原因）'
+        """
+        if self.disabled_reason is not None:
+            return f"已停用（{self.disabled_reason}）"
+        if self.remaining_quota == 0:
+            return "已停用（配额已用完）"
+        return "暂停使用中" if self.is_cooling_down() else "可用"
+
+
+_credential_pools = {}  # 翻译服务 -> ApiCredential列表
+_credential_pools_lock = threading.Lock()
+
+
+def get_credential_pool(service):
+    """
+    获取翻译服务的密钥池（首次使用时按后端的 credentials() 创建，并查询各账号的剩余配额）
+    
+    参数：
+        service: 翻译服务
+    
+    返回：
+        ApiCredential列表；没有配置有效密钥时为一个使用原始配置值的账号（由服务端返回密钥错误）
+    """
+    with _credential_pools_lock:
+        if service in _credential_pools:
+            return _credential_pools[service]
+        backend = get_backend(service)
+        entries = backend.credentials()
+        pool = [ApiCredential(service, index, entry) for index, entry in enumerate(entries)]
+        for credential in pool:
+            if credential.quota_chars is None:
+                credential.quota_chars = backend.fetch_remaining_quota(credential)
+        if not pool:
+            pool = [ApiCredential(service, 0, {'app_key': YOUDAO_APP_KEY, 'app_secret': YOUDAO_APP_SECRET,
+                                               'auth_key': DEEPL_API_KEY})]
+        _credential_pools[service] = pool
+    for credential in pool:
+        if credential.remaining_quota == 0:
+            credential.on_exhausted("字符配额已用完")
+    return pool
+
+
+def reset_credential_pools():
+    """清空已创建的密钥池和路由（修改密钥或 FAILOVER_SERVICES 配置后调用）"""
+    with _credential_pools_lock:
+        _credential_pools.clear()
+        _routers.clear()
+
+
+def get_default_credential(service):
+    """
+    获取翻译服务密钥池中的第一个账号（直接调用底层翻译函数、没有指定账号时使用）
+    
+    参数：
+        service: 翻译服务
+    
+    返回：
+        ApiCredential实例
+    """
+    return get_credential_pool(service)[0]
+
+
+class TranslationRouter:
+    """
+    把翻译请求分配到密钥池中的账号：优先使用进行中请求最少、最久未使用的账号；
+    一个账号被限流、停用时改用同一服务的其他账号，所选服务的账号都不可用时依次改用 FAILOVER_SERVICES 中的服务
+    """
+    
+    def __init__(self, services):
+        """
+        参数：
+            services: 服务名称列表（第一个是所选服务，其余是切换时依次使用的服务）
+        """
+        self.services = services
+        self.failed_over = False  # 当前是否正在使用其他服务
+        self._lock = threading.Lock()
+    
+    @property
+    def credentials(self):
+        """所有服务的账号（按服务顺序）"""
+        return [credential for service in self.services for credential in get_credential_pool(service)]
+    
+    def _choose(self, tried, chars):
+        """
+        选择一个账号：依次查看各服务，返回第一个有空闲账号的服务中负载最低的账号；
+        所有账号都在暂停中时，返回最早恢复的账号
+        
+        参数：
+            tried: 本批文本已经尝试过的账号集合
+            chars: 待翻译的字符数
+        
+        返回：
+            ApiCredential实例，没有可用账号时为None
+        """
+        cooling = []
+        for service in self.services:
+            candidates = [credential for credential in get_credential_pool(service)
+                          if credential not in tried and credential.is_usable(chars)]
+            ready = [credential for credential in candidates if not credential.is_cooling_down()]
+            if ready:
+                return min(ready, key=lambda credential: (credential.in_flight, credential.last_used))
+            cooling.extend(candidates)
+        return min(cooling, key=lambda credential: credential.cooldown_until) if cooling else None
+    
+    def _acquire(self, tried, chars):
+        """选择账号并登记一个进行中的请求，返回 (账号, 之后是否还有其他账号可以改用)"""
+        with self._lock:
+            credential = self._choose(tried, chars)
+            if credential is None:
+                return None, False
+            has_alternatives = self._choose(tried | {credential}, chars) is not None
+            credential.in_flight += 1
+            credential.last_used = time.monotonic()
+            primary = self.services[0]
+            if credential.service != primary and not self.failed_over:
+                self.failed_over = True
+                log_info(f"⚠ {get_backend(primary).display_name}的账号都不可用，"
+                         f"改用{get_backend(credential.service).display_name}")
+            elif credential.service == primary and self.failed_over:
+                self.failed_over = False
+                log_info(f"✓ 恢复使用{get_backend(primary).display_name}")
+        if credential.service != self.services[0]:
+            get_metrics().inc('failovers', service=self.services[0], to=credential.service)
+        return credential, has_alternatives
+    
+    def _release(self, credential):
+        with self._lock:
+            credential.in_flight -= 1
+    
+    def translate_batch(self, texts, from_lang_code, to_lang_code):
+        """
+        批量翻译：失败的文本（可重试的失败，或账号已停用）改用其他账号重新翻译，直到没有账号可以尝试
+        
+        参数：
+            texts: 要翻译的文本列表（数量和大小应符合所选服务的批量限制）
+            from_lang_code: 源语言代码（统一格式）
+            to_lang_code: 目标语言代码（统一格式）
+        
+        返回：
+            与texts一一对应的TranslationResult列表（result.service 为实际使用的服务）
+        """
+        results = [None] * len(texts)
+        pending = list(range(len(texts)))
+        tried = set()
+        while pending:
+            # 剩余配额至少够翻译最短的文本时才使用该账号（超出配额的批次由服务端拒绝后停用账号）
+            credential, has_alternatives = self._acquire(tried, min(len(texts[i]) for i in pending))
+            if credential is None:
+                break
+            tried.add(credential)
+            backend = get_backend(credential.service)
+            # 还有其他账号时少重试几次，尽快改用其他账号
+            max_retries = KEY_FAILOVER_RETRIES if has_alternatives else None
+            try:
+                # 改用其他服务时按该服务的批量限制重新分批
+                pending_texts = [texts[i] for i in pending]
+                for batch in split_into_batches(pending_texts, backend.max_texts_per_request,
+                                                backend.max_request_size, backend.measure):
+                    batch_results = backend.translate_batch([pending_texts[i] for i in batch], from_lang_code,
+                                                            to_lang_code, credential, max_retries)
+                    for i, result in zip(batch, batch_results):
+                        results[pending[i]] = result._replace(service=credential.service)
+            finally:
+                self._release(credential)
+            disabled = credential.disabled_reason is not None
+            pending = [i for i in pending if not results[i].text and (results[i].retryable or disabled)]
+        for i in pending:
+            if results[i] is None:
+                results[i] = TranslationResult(None, "没有可用的翻译账号（已停用或配额不足）")
+        return results
+    
+    def translate_text(self, text, from_lang_code, to_lang_code):
+        """
+        翻译单个文本：账号在请求过程中被暂停或停用时改用其他账号
+        
+        参数：
+            text: 要翻译的文本
+            from_lang_code: 源语言代码（统一格式）
+            to_lang_code: 目标语言代码（统一格式）
+        
+        返回：
+            翻译后的文本，如果失败返回None
+        """
+        tried = set()
+        while True:
+            credential, has_alternatives = self._acquire(tried, len(text))
+            if credential is None:
+                return None
+            tried.add(credential)
+            try:
+                translated_text = get_backend(credential.service).translate_text(
+                    text, from_lang_code, to_lang_code, credential, KEY_FAILOVER_RETRIES if has_alternatives else None)
+            finally:
+                self._release(credential)
+            if translated_text or credential.disabled_reason is None and not credential.is_cooling_down():
+                return translated_text
+
+
+_routers = {}  # 所选翻译服务 -> TranslationRouter
+
+
+def get_router(service):
+    """
+    获取所选翻译服务的路由（包括 FAILOVER_SERVICES 中已注册且配置了密钥的服务）
+    
+    参数：
+        service: 所选翻译服务
+    
+    返回：
+        TranslationRouter实例
+    """
+    with _credential_pools_lock:
+        if service not in _routers:
+            services = [service] + [name for name in FAILOVER_SERVICES
+                                    if name != service and name in TRANSLATION_BACKENDS
+                                    and get_backend(name).credentials()]
+            _routers[service] = TranslationRouter(list(dict.fromkeys(services)))
+        return _routers[service]
+
+
+def convert_lang_code_to_youdao(lang_code):
+    """
+    将语言代码转换为有道翻译API格式
+    
+    参数：
+        lang_code: 语言代码（'zh'、'en'、'ja'等）
+    
+    返回：
+        有道翻译API格式的语言代码
+    """
+    return get_backend('youdao').convert_lang_code(lang_code)
 
 
 def convert_lang_code_to_deepl(lang_code):
@@ -357,172 +1899,2179 @@ def convert_lang_code_to_deepl(lang_code):
     将语言代码转换为DeepL翻译API格式
     
     参数：
-        lang_code: 语言代码（'zh' 或 'en'）
+        lang_code: 语言代码（'zh'、'en'、'ja'等）
     
     返回：
         DeepL翻译API格式的语言代码
     """
-    if lang_code == 'zh':
-        return 'ZH'  # DeepL使用ZH表示中文
-    elif lang_code == 'en':
-        return 'EN'  # DeepL使用EN表示英文
-    else:
-        return lang_code.upper()  # DeepL使用大写
+    return get_backend('deepl').convert_lang_code(lang_code)
 
 
-def translate_text(text, from_lang_code, to_lang_code, service='youdao'):
+def memory_enabled():
+    """
+    是否使用翻译记忆
+    
+    占位符替换（MASK_UNTRANSLATABLE）已经把编号、网址、日期、数字等换成了占位符，缓存键也已合并空白，
+    启用时记忆键只比缓存键多忽略全角半角，不值得在每次未命中缓存时再查询一次数据库，因此只在关闭占位符替换时使用
+    
+    返回：
+        True表示查找和套用相似文本的译文
+    """
+    return TRANSLATION_MEMORY and not MASK_UNTRANSLATABLE
+
+
+def normalize_text(text):
     """
-    统一的翻译接口，根据选择的服务调用相应的翻译函数
+    规范化文本，用作缓存键（统一Unicode组合形式、合并连续空白、去除首尾空白）
     
     参数：
-        text: 要翻译的文本
-        from_lang_code: 源语言代码（'zh' 或 'en'），用于有道翻译
-        to_lang_code: 目标语言代码（'zh' 或 'en'）
-        service: 翻译服务（'youdao' 或 'deepl'）
+        text: 原文
     
     返回：
-        翻译后的文本，如果失败返回None
+        规范化后的文本
     """
-    if service == 'youdao':
-        # 转换为有道翻译API的语言代码格式
-        from_lang = convert_lang_code_to_youdao(from_lang_code)
-        to_lang = convert_lang_code_to_youdao(to_lang_code)
-        return translate_text_youdao(text, from_lang, to_lang)
-    elif service == 'deepl':
-        # DeepL可以自动检测源语言，所以不传source_lang参数（或者传'auto'）
-        # 只需要目标语言
-        to_lang = convert_lang_code_to_deepl(to_lang_code)
-        # 使用'auto'让DeepL自动检测源语言，这样更智能
-        return translate_text_deepl(text, 'auto', to_lang)
-    else:
-        print(f"  ❌ 不支持的翻译服务：{service}")
-        return None
+    text = unicodedata.normalize('NFC', str(text))
+    return ' '.join(text.split())
+
+
+class TranslationCache:
+    """
+    基于SQLite的持久化翻译缓存
+    
+    缓存键为（翻译服务, 源语言, 目标语言, 规范化后的原文），
+    支持按条目数（淘汰最久未使用的条目）和按保存时间淘汰，并统计命中/未命中次数。
+    每个条目同时按记忆键建立索引，用于查找只有编号、数字等片段不同的已翻译文本（get_similar）。
+    """
+    
+    def __init__(self, path, max_entries=CACHE_MAX_ENTRIES, max_age_days=CACHE_MAX_AGE_DAYS):
+        """
+        参数：
+            path: 缓存文件路径
+            max_entries: 最多保留的条目数
+            max_age_days: 条目最长保留天数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0  # 命中次数
+        self.misses = 0  # 未命中次数
+        self.memory_hits = 0  # 通过记忆键套用译文的次数
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # WAL模式允许批量模式下多个进程同时读写同一个缓存文件
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                service TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                memory_key TEXT,
+                PRIMARY KEY (service, source_lang, target_lang, source_text)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._add_memory_keys()
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_memory_key "
+                           "ON translations (service, source_lang, target_lang, memory_key)")
+        self._conn.commit()
+        self.evict()
+    
+    def _add_memory_keys(self):
+        """
+        旧版本的缓存文件没有记忆键，或记忆键按旧方法计算：添加该列，并为已有的条目重新计算记忆键
+        （缓存文件的 user_version 记录记忆键的计算方法版本）
+        """
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= MEMORY_KEY_VERSION:
+            return
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(translations)")]
+        if 'memory_key' not in columns:
+            self._conn.execute("ALTER TABLE translations ADD COLUMN memory_key TEXT")
+        rows = self._conn.execute("SELECT rowid, source_text FROM translations").fetchall()
+        self._conn.executemany("UPDATE translations SET memory_key = ? WHERE rowid = ?",
+                               [(memory_key(source_text)[0], rowid) for rowid, source_text in rows])
+        self._conn.execute(f"PRAGMA user_version = {MEMORY_KEY_VERSION}")
+    
+    def get_many(self, service, source_lang, target_lang, texts):
+        """
+        批量查询缓存
+        
+        参数：
+            service: 翻译服务
+            source_lang: 源语言代码
+            target_lang: 目标语言代码
+            texts: 原文列表
+        
+        返回：
+            字典：原文 -> 缓存的译文（只包含命中的文本）
+        """
+        keys = {normalize_text(text): text for text in texts}
+        found = {}
+        now = time.time()
+        with self._lock:
+            key_list = list(keys)
+            # 分段查询，避免超过SQLite的参数个数限制
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source_text, translation FROM translations "
+                    f"WHERE service = ? AND source_lang = ? AND target_lang = ? AND source_text IN ({placeholders})",
+                    [service, source_lang, target_lang] + chunk,
+                ).fetchall()
+                for source_text, translation in rows:
+                    found[keys[source_text]] = translation
+                # 更新命中条目的最近使用时间，用于按条目数淘汰
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? "
+                    "WHERE service = ? AND source_lang = ? AND target_lang = ? AND source_text = ?",
+                    [(now, service, source_lang, target_lang, source_text) for source_text, _ in rows],
+                )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return {text: found[text] for text in texts if text in found}
+    
+    def get_similar(self, service, source_lang, target_lang, texts):
+        """
+        查找记忆键相同（只有编号、数字等片段不同）的已翻译文本，把其译文套用到要查询的文本，并统计套用次数
+        
+        参数、返回：与 find_similar 相同
+        """
+        found = self.find_similar(service, source_lang, target_lang, texts)
+        with self._lock:
+            self.memory_hits += len(found)
+        return found
+    
+    def find_similar(self, service, source_lang, target_lang, texts):
+        """
+        查找记忆键相同的已翻译文本并套用其译文（只读：不更新命中统计，用于预估模式）
+        
+        参数：
+            service: 翻译服务
+            source_lang: 源语言代码
+            target_lang: 目标语言代码
+            texts: 原文列表（通常是 get_many 未命中的文本）
+        
+        返回：
+            字典：原文 -> 套用后的译文（只包含能够套用的文本）
+        """
+        texts_by_key = {}  # 记忆键 -> [原文, ...]
+        for text in texts:
+            texts_by_key.setdefault(memory_key(text)[0], []).append(text)
+        found = {}
+        with self._lock:
+            key_list = list(texts_by_key)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                # 同一记忆键有多条译文时（如编号不同的大量文本），只尝试最近使用过的几条
+                rows = self._conn.execute(
+                    f"SELECT memory_key, source_text, translation FROM ("
+                    f"  SELECT memory_key, source_text, translation, ROW_NUMBER() OVER "
+                    f"    (PARTITION BY memory_key ORDER BY last_used DESC) AS recent_rank FROM translations "
+                    f"  WHERE service = ? AND source_lang = ? AND target_lang = ? AND memory_key IN ({placeholders})"
+                    f") WHERE recent_rank <= ? ORDER BY recent_rank",
+                    [service, source_lang, target_lang] + chunk + [MEMORY_CANDIDATES],
+                ).fetchall()
+                for key, source_text, translation in rows:
+                    for text in texts_by_key[key]:
+                        if text not in found:
+                            adapted = adapt_translation(translation, source_text, text)
+                            if adapted is not None:
+                                found[text] = adapted
+        return found
+    
+    def find_cached(self, service, source_lang, target_lang, texts):
+        """
+        查询哪些文本已有缓存（只读：不更新最近使用时间和命中统计，用于预估模式）
+        
+        参数：
+            service: 翻译服务
+            source_lang: 源语言代码
+            target_lang: 目标语言代码
+            texts: 原文列表
+        
+        返回：
+            已有缓存的原文集合
+        """
+        key_list = list({normalize_text(text) for text in texts})
+        found = set()  # 已有缓存的规范化文本
+        with self._lock:
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT source_text FROM translations "
+                    f"WHERE service = ? AND source_lang = ? AND target_lang = ? AND source_text IN ({placeholders})",
+                    [service, source_lang, target_lang] + chunk,
+                ).fetchall()
+                found.update(source_text for source_text, in rows)
+        return {text for text in texts if normalize_text(text) in found}
+    
+    def get(self, service, source_lang, target_lang, text):
+        """
+        查询单条缓存，未命中时返回None
+        """
+        return self.get_many(service, source_lang, target_lang, [text]).get(text)
+    
+    def set_many(self, service, source_lang, target_lang, pairs):
+        """
+        批量写入缓存
+        
+        参数：
+            pairs: (原文, 译文) 列表
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(service, source_lang, target_lang, normalize_text(text), translation, now, now,
+                  memory_key(normalize_text(text))[0])
+                 for text, translation in pairs],
+            )
+            self._conn.commit()
+    
+    def set(self, service, source_lang, target_lang, text, translation):
+        """
+        写入单条缓存
+        """
+        self.set_many(service, source_lang, target_lang, [(text, translation)])
+    
+    def evict(self):
+        """
+        淘汰过期条目和超出数量上限的最久未使用条目
+        
+        返回：
+            淘汰的条目数
+        """
+        with self._lock:
+            cutoff = time.time() - self.max_age_days * 86400
+            evicted = self._conn.execute("DELETE FROM translations WHERE created_at < ?", (cutoff,)).rowcount
+            count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                evicted += self._conn.execute(
+                    "DELETE FROM translations WHERE rowid IN "
+                    "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        return evicted
+    
+    def clear(self):
+        """
+        清空缓存
+        
+        返回：
+            删除的条目数
+        """
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM translations").rowcount
+            self._conn.commit()
+        return deleted
+    
+    def close(self):
+        """
+        淘汰过期条目后关闭数据库连接
+        """
+        self.evict()
+        with self._lock:
+            self._conn.close()
+
+
+_translation_cache = None  # 全局翻译缓存实例（首次使用时创建）
+
+
+def get_translation_cache():
+    """
+    获取全局翻译缓存实例
+    
+    返回：
+        TranslationCache实例；如果缓存被禁用，返回None
+    """
+    global _translation_cache
+    if not CACHE_ENABLED:
+        return None
+    if _translation_cache is None:
+        _translation_cache = TranslationCache(CACHE_FILE)
+    return _translation_cache
+
+
+def close_translation_cache():
+    """
+    关闭全局翻译缓存（如果已打开）
+    """
+    global _translation_cache
+    if _translation_cache is not None:
+        _translation_cache.close()
+        _translation_cache = None
+
+
+def translate_text(text, from_lang_code, to_lang_code, service='youdao'):
+    """
+    统一的翻译接口，先查询翻译缓存，未命中时根据选择的服务调用相应的翻译函数
+    
+    参数：
+        text: 要翻译的文本
+        from_lang_code: 源语言代码（'zh' 或 'en'），用于有道翻译
+        to_lang_code: 目标语言代码（'zh' 或 'en'）
+        service: 翻译服务（'youdao' 或 'deepl'）
+    
+    返回：
+        翻译后的文本，如果失败返回None
+    """
+    cache = get_translation_cache()
+    if cache is not None:
+        cached = cache.get(service, from_lang_code, to_lang_code, text)
+        if cached is not None:
+            return cached
+    
+    translated_text = call_translation_api(text, from_lang_code, to_lang_code, service)
+    if translated_text and cache is not None:
+        cache.set(service, from_lang_code, to_lang_code, text, translated_text)
+    return translated_text
+
+
+def call_translation_api(text, from_lang_code, to_lang_code, service='youdao'):
+    """
+    根据选择的服务调用相应的翻译函数（不经过缓存）
+    
+    参数：
+        text: 要翻译的文本
+        from_lang_code: 源语言代码（'zh' 或 'en'），用于有道翻译
+        to_lang_code: 目标语言代码（'zh' 或 'en'）
+        service: 翻译服务（'youdao' 或 'deepl'）
+    
+    返回：
+        翻译后的文本，如果失败返回None
+    """
+    if service not in TRANSLATION_BACKENDS:
+        print(f"  ❌ 不支持的翻译服务：{service}")
+        return None
+    return get_router(service).translate_text(text, from_lang_code, to_lang_code)
+
+
+def get_batch_limits(service):
+    """
+    获取翻译服务单次请求的批量限制
+
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+
+    返回：
+        (每批最多文本数, 每批最大大小, 计算单个文本大小的函数)
+    """
+    backend = get_backend(service)
+    return backend.max_texts_per_request, backend.max_request_size, backend.measure
+
+
+def translate_batch(texts, from_lang_code, to_lang_code, service='youdao', use_cache=True):
+    """
+    统一的批量翻译接口，一次翻译同一方向的多个文本
+
+    参数：
+        texts: 要翻译的文本列表（数量和大小应符合get_batch_limits的限制）
+        from_lang_code: 源语言代码（'zh' 或 'en'）
+        to_lang_code: 目标语言代码（'zh' 或 'en'）
+        service: 翻译服务（'youdao' 或 'deepl'）
+        use_cache: 是否查询并写入翻译缓存（调用方已自行查询缓存时传False）
+
+    返回：
+        与texts一一对应的TranslationResult列表
+    """
+    cache = get_translation_cache() if use_cache else None
+    cached = cache.get_many(service, from_lang_code, to_lang_code, texts) if cache is not None else {}
+
+    # 只对未命中缓存的文本调用翻译API
+    pending_indexes = [i for i, text in enumerate(texts) if text not in cached]
+    pending_results = call_batch_translation_api(
+        [texts[i] for i in pending_indexes], from_lang_code, to_lang_code, service
+    ) if pending_indexes else []
+
+    results = [TranslationResult(cached[text], None) if text in cached else None for text in texts]
+    metrics = get_metrics()
+    for index, result in zip(pending_indexes, pending_results):
+        results[index] = result
+        if result.text:
+            metrics.inc('texts_translated', service=result.service or service)
+            metrics.inc('chars_billed', len(texts[index]), service=result.service or service)
+        else:
+            metrics.inc('texts_failed', service=service, retryable=result.retryable)
+    if cached:
+        metrics.inc('cache_hits', len(texts) - len(pending_indexes), service=service)
+
+    if cache is not None:
+        # 译文按实际使用的服务写入缓存（切换到其他服务时不会混入所选服务的缓存）
+        for used_service in {result.service or service for result in pending_results if result.text}:
+            cache.set_many(used_service, from_lang_code, to_lang_code,
+                           [(texts[i], result.text) for i, result in zip(pending_indexes, pending_results)
+                            if result.text and (result.service or service) == used_service])
+    return results
+
+
+def call_batch_translation_api(texts, from_lang_code, to_lang_code, service='youdao'):
+    """
+    根据选择的服务批量调用翻译API（不经过缓存）；请求由密钥池中的账号分摊，
+    所有账号都不可用时改用 FAILOVER_SERVICES 中的服务
+
+    参数：
+        texts: 要翻译的文本列表（数量和大小应符合get_batch_limits的限制）
+        from_lang_code: 源语言代码（'zh' 或 'en'）
+        to_lang_code: 目标语言代码（'zh' 或 'en'）
+        service: 翻译服务（'youdao' 或 'deepl'）
+
+    返回：
+        与texts一一对应的TranslationResult列表（result.service 为实际使用的服务）
+    """
+    return get_router(service).translate_batch(texts, from_lang_code, to_lang_code)
+
+
+def column_letter_to_number(column_input):
+    """
+    将列号转换为数字（支持字母格式如A、B、C，也支持数字格式如1、2、3）
+    
+    参数：
+        column_input: 用户输入的列号（可以是'A'、'B'或'1'、'2'等）
+    
+    返回：
+        列的数字编号（1表示A列，2表示B列，以此类推）
+    """
+    column_input = str(column_input).strip().upper()  # 转换为大写并去除空格
+    
+    # 如果输入的是字母（如A、B、C）
+    if column_input.isalpha():
+        # 将字母转换为数字：A=1, B=2, ..., Z=26, AA=27, AB=28, ...
+        result = 0
+        for char in column_input:
+            result = result * 26 + (ord(char) - ord('A') + 1)
+        return result
+    # 如果输入的是数字（如1、2、3）
+    elif column_input.isdigit():
+        return int(column_input)
+    else:
+        return None  # 无效输入
+
+
+def number_to_column_letter(column_num):
+    """
+    将列的数字编号转换为字母格式（1→A, 2→B, 等等）
+    
+    参数：
+        column_num: 列的数字编号
+    
+    返回：
+        列的字母表示（如'A'、'B'、'AA'等）
+    """
+    result = ""
+    while column_num > 0:
+        column_num -= 1  # 转换为0-based索引
+        result = chr(65 + (column_num % 26)) + result  # 65是'A'的ASCII码
+        column_num //= 26
+    return result
+
+
+def show_excel_preview(sheet, max_cols=5):
+    """
+    显示Excel文件的前几列和行的预览，帮助用户了解文件结构
+    
+    参数：
+        sheet: Excel工作表对象
+        max_cols: 最多显示多少列（默认5列）
+    """
+    max_row = min(sheet.max_row, 5)  # 最多显示5行
+    max_col = min(sheet.max_column, max_cols)  # 最多显示指定列数
+    
+    print("\n📊 Excel文件预览（前5行）：")
+    print("-" * 60)
+    
+    # 显示列标题
+    header = "行号"
+    for col in range(1, max_col + 1):
+        col_letter = number_to_column_letter(col)
+        header += f" | {col_letter}列"
+    print(header)
+    print("-" * 60)
+    
+    # 显示每行数据
+    for row in range(1, max_row + 1):
+        row_data = f"{row:3d}"
+        for col in range(1, max_col + 1):
+            cell_value = sheet.cell(row=row, column=col).value
+            if cell_value is None:
+                cell_str = "(空)"
+            else:
+                cell_str = str(cell_value)[:15]  # 只显示前15个字符
+                if len(str(cell_value)) > 15:
+                    cell_str += "..."
+            row_data += f" | {cell_str:18s}"
+        print(row_data)
+    print("-" * 60)
+    print(f"总行数：{sheet.max_row}，总列数：{sheet.max_column}")
+    print()
+
+
+def format_row_numbers(rows, max_shown=3):
+    """
+    将行号列表格式化为便于阅读的描述，用于显示同一文本对应的多行
+    
+    参数：
+        rows: 行号列表
+        max_shown: 最多显示的行号个数
+    
+    返回：
+        如'第 2 行'、'第 2、5 行'或'第 2、5、9 行等 12 行'
+    """
+    shown = '、'.join(str(row) for row in rows[:max_shown])
+    if len(rows) > max_shown:
+        return f"第 {shown} 行等 {len(rows)} 行"
+    return f"第 {shown} 行"
+
+
+def get_user_column_input(sheet, prompt_text, default_value=None):
+    """
+    获取用户输入的列号，并验证有效性
+    
+    参数：
+        sheet: Excel工作表对象
+        prompt_text: 提示信息
+        default_value: 默认值（如果用户直接回车，使用此值）
+    
+    返回：
+        有效的列号（数字）
+    """
+    max_col = sheet.max_column
+    
+    while True:
+        if default_value is not None:
+            user_input = input(f"{prompt_text}（直接回车使用默认值：{number_to_column_letter(default_value)}列）: ").strip()
+            if user_input == "":
+                return default_value
+        else:
+            user_input = input(f"{prompt_text}（输入列号，如A、B或1、2）: ").strip()
+        
+        # 转换为列号数字
+        col_num = column_letter_to_number(user_input)
+        
+        if col_num is None:
+            print("❌ 输入格式错误！请输入列号（如 A、B 或 1、2）")
+            continue
+        
+        if col_num < 1 or col_num > max_col:
+            print(f"❌ 列号超出范围！请输入 1 到 {max_col} 之间的列号（或 A 到 {number_to_column_letter(max_col)}）")
+            continue
+        
+        return col_num
+
+
+def get_journal_file(excel_file):
+    """
+    获取Excel文件对应的进度记录文件路径
+    
+    参数：
+        excel_file: Excel文件路径
+    
+    返回：
+        进度记录文件路径（原文件名后加".journal.jsonl"）
+    """
+    return excel_file + '.journal.jsonl'
+
+
+class ProgressJournal:
+    """
+    只追加的翻译进度记录（每行一个JSON对象）
+    
+    第一行记录本次运行的设置（翻译任务列表），之后每翻译成功一行追加一条"任务序号, 行号 -> 译文"。
+    每条记录写入后立即刷新到文件，程序崩溃或被中断时已付费的译文不会丢失；
+    使用 --resume 时读回已完成的行，这些行不再调用API。
+    """
+    
+    def __init__(self, path, header, resume=False):
+        """
+        参数：
+            path: 进度记录文件路径
+            header: 本次运行的设置（字典），继续时必须与记录中的设置一致
+            resume: 是否读取已有的进度记录并继续
+        """
+        self.path = path
+        self.header = header
+        self.completed = {}  # 任务序号 -> {行号: 译文}（从已有进度记录中读回）
+        self._lock = threading.Lock()  # 流式模式中记录和强制写入磁盘来自不同的线程
+        
+        if resume:
+            self.completed = self._load()
+        elif os.path.exists(path):
+            print(f"⚠ 发现未完成的进度记录：{path}（使用 --resume 可继续上次的翻译），本次将重新开始")
+        
+        if self.completed:
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+            self._write({'header': header})
+    
+    def _load(self):
+        """
+        读取已有的进度记录
+        
+        返回：
+            字典：任务序号 -> {行号: 译文}；记录不存在或设置不一致时返回空字典
+        """
+        if not os.path.exists(self.path):
+            print(f"⚠ 没有找到进度记录：{self.path}，将从头开始翻译")
+            return {}
+        
+        completed = {}
+        with open(self.path, encoding='utf-8') as f:
+            for line_num, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 程序崩溃时最后一行可能只写了一半，忽略即可
+                    continue
+                if line_num == 0:
+                    if entry.get('header') != self.header:
+                        print(f"⚠ 进度记录的设置（{entry.get('header')}）与本次不一致，将从头开始翻译")
+                        return {}
+                    continue
+                completed.setdefault(entry.get('job', 0), {})[entry['row']] = entry['value']
+        return completed
+    
+    def _write(self, entry):
+        """写入一条记录并立即刷新到文件"""
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+    
+    def completed_rows(self, job=0):
+        """
+        获取某个任务已完成的行
+        
+        参数：
+            job: 任务序号
+        
+        返回：
+            字典：行号 -> 译文
+        """
+        return self.completed.get(job, {})
+    
+    def record(self, row_nums, value, job=0):
+        """
+        记录已翻译完成的行
+        
+        参数：
+            row_nums: 行号列表（相同文本的所有行）
+            value: 译文
+            job: 任务序号
+        """
+        for row_num in row_nums:
+            self._write({'job': job, 'row': row_num, 'value': value})
+    
+    def sync(self):
+        """把进度记录强制写入磁盘（检查点时调用）"""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        """关闭进度记录文件（保留文件，供 --resume 使用）"""
+        if not self._file.closed:
+            self._file.close()
+    
+    def remove(self):
+        """翻译全部完成并保存后删除进度记录"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class WorkbookCheckpoint:
+    """
+    定期保存工作簿：每翻译 CHECKPOINT_ROWS 行或每隔 CHECKPOINT_SECONDS 秒保存一次
+    """
+    
+    def __init__(self, workbook, path, journal=None, rows=None, seconds=None):
+        """
+        参数：
+            workbook: Excel工作簿对象
+            path: 保存路径
+            journal: 进度记录（保存工作簿时同时写入磁盘）
+            rows: 每翻译多少行保存一次（默认使用 CHECKPOINT_ROWS）
+            seconds: 每隔多少秒保存一次（默认使用 CHECKPOINT_SECONDS）
+        """
+        self.workbook = workbook
+        self.path = path
+        self.journal = journal
+        self.rows = rows or CHECKPOINT_ROWS
+        self.seconds = seconds or CHECKPOINT_SECONDS
+        self._pending_rows = 0
+        self._last_save = time.monotonic()
+    
+    def add(self, row_count):
+        """
+        记录新翻译完成的行数，达到保存条件时保存工作簿
+        
+        参数：
+            row_count: 新完成的行数
+        """
+        self._pending_rows += row_count
+        if self._pending_rows >= self.rows or time.monotonic() - self._last_save >= self.seconds:
+            self.save()
+    
+    def save(self):
+        """立即保存工作簿"""
+        with get_metrics().stage('checkpoint_save'):
+            self.workbook.save(self.path)
+        if self.journal is not None:
+            self.journal.sync()
+        log_detail(f"  💾 已保存进度（{self.path}）")
+        self._pending_rows = 0
+        self._last_save = time.monotonic()
+
+
+def get_state_file(excel_file):
+    """
+    获取Excel文件对应的增量翻译状态文件路径
+    
+    参数：
+        excel_file: Excel文件路径
+    
+    返回：
+        状态文件路径（原文件名后加".state.json"）
+    """
+    return excel_file + '.state.json'
+
+
+class IncrementalState:
+    """
+    增量翻译状态：记录每段原文（规范化后的哈希）对应的机器译文，保存在Excel文件旁的状态文件中
+    
+    再次运行时按目标列的内容判断每一行是否需要翻译：
+    - 目标列为空：新行，需要翻译
+    - 目标列等于当前原文记录的译文：译文是最新的，跳过
+    - 目标列是程序写入过的其他译文（或"翻译失败"等提示）：原文已修改，重新翻译
+    - 目标列是程序从未写入过的内容：人工填写的译文，跳过
+    按内容而不是行号判断，插入或删除行后其他行仍能正确识别。
+    """
+    
+    def __init__(self, path, sheet_name, source_column, target_column):
+        """
+        参数：
+            path: 状态文件路径
+            sheet_name: 工作表名称
+            source_column: 源列编号
+            target_column: 目标列编号
+        """
+        self.path = path
+        self.key = f"{sheet_name}|{source_column}|{target_column}"  # 同一文件的不同工作表和列分别记录
+        self._data = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._data = json.load(f)
+        self.translations = self._data.setdefault(self.key, {})  # 原文哈希 -> 译文
+        self._known_translations = set(self.translations.values())  # 程序写入过的所有译文
+    
+    @staticmethod
+    def hash_text(text):
+        """
+        计算原文的哈希（先规范化，空白或Unicode写法不同的文本视为相同）
+        
+        参数：
+            text: 原文
+        
+        返回：
+            16位十六进制哈希字符串
+        """
+        return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()[:16]
+    
+    def check(self, source_text, target_value):
+        """
+        判断一行是否需要翻译
+        
+        参数：
+            source_text: 原文
+            target_value: 目标列当前的值
+        
+        返回：
+            'translate'（需要翻译）、'unchanged'（译文已是最新）或 'manual'（人工填写的译文）
+        """
+        if target_value is None or str(target_value).strip() == '':
+            return 'translate'
+        target_text = str(target_value)
+        if self.translations.get(self.hash_text(source_text)) == target_text:
+            return 'unchanged'
+        if target_text in self._known_translations or target_text == "翻译失败" or target_text.startswith("文本过长错误"):
+            return 'translate'
+        return 'manual'
+    
+    def record(self, source_text, translation):
+        """
+        记录原文对应的译文
+        
+        参数：
+            source_text: 原文
+            translation: 译文
+        """
+        self.translations[self.hash_text(source_text)] = translation
+        self._known_translations.add(translation)
+    
+    def save(self):
+        """
+        保存状态文件（先写临时文件再替换，避免写到一半时损坏）
+        同一文件的多个任务各自保存时，重新读取文件并只更新本任务的记录
+        """
+        data = self._data
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        data[self.key] = self.translations
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+
+def new_run_stats():
+    """
+    创建一次运行的统计计数
+    
+    返回：
+        统计字典（各项计数初始为0）
+    """
+    return {
+        'success': 0,  # 成功翻译的行数
+        'fail': 0,  # 翻译失败的行数
+        'skip': 0,  # 跳过的行数（空行、文本过长）
+        'resumed': 0,  # 从进度记录恢复、不再翻译的行数
+        'unchanged': 0,  # 增量模式下原文未修改、跳过的行数
+        'manual': 0,  # 增量模式下目标列为人工填写、跳过的行数
+        'untranslated': 0,  # 无需翻译（只有编号、数字、网址、符号等）、原样保留的行数
+        'masked': 0,  # 替换为占位符、不发送给翻译服务的片段数
+        'unique': 0,  # 不重复的文本数
+        'duplicates': 0,  # 重复文本节省的翻译次数
+        'saved_chars': 0,  # 重复文本节省的字符数
+        'retried': 0,  # 进入重试队列的文本数
+        'memory_hits': 0,  # 套用相似文本（只有编号、数字等片段不同）译文的文本数
+    }
+
+
+# 每行的处理结果恰好计入其中一项（用于计算进度和运行指标中的行数）
+ROW_RESULTS = ['success', 'fail', 'skip', 'resumed', 'unchanged', 'manual', 'untranslated']
+
+
+def report_progress(stats, force=False):
+    """
+    按统计字典更新进度显示（距上次刷新不足刷新间隔时几乎没有开销，可以每行调用）
+    
+    参数：
+        stats: 统计字典
+        force: 是否立即刷新
+    """
+    get_progress().update(sum(stats[result] for result in ROW_RESULTS), stats['fail'], force)
+
+
+def read_source_cell(row_num, cell_value, source_col_letter, stats, targets=1):
+    """
+    检查源列单元格，判断是否需要翻译
+    
+    参数：
+        row_num: 行号
+        cell_value: 源列单元格的值
+        source_col_letter: 源列字母（用于提示信息）
+        stats: 统计字典
+        targets: 这一行要写入的目标列个数（同一源列翻译成多种语言时，跳过的行按目标列分别计数）
+    
+    返回：
+        (需要翻译的原文, 直接写入目标列的值)：
+        需要翻译时为(原文, None)；空行为(None, None)；文本过长为(None, 错误提示)
+    """
+    # 检查单元格是否有内容
+    if cell_value is None or str(cell_value).strip() == '':
+        log_detail(f"第 {row_num} 行 {source_col_letter}列为空，跳过")
+        stats['skip'] += targets
+        return None, None
+    
+    # 将单元格值转换为字符串
+    source_text = str(cell_value).strip()
+    
+    # 检查文本长度：启用长文本拆分时按句子拆分翻译，否则提前提示并跳过
+    text_length = len(source_text)
+    if text_length > MAX_TEXT_LENGTH and not SEGMENT_LONG_TEXT:
+        log_detail(f"第 {row_num} 行 ❌ 文本过长错误：文本长度 {text_length} 字符，超过{MAX_TEXT_LENGTH}字符限制")
+        log_detail("  跳过此行的翻译，建议手动缩短文本或分段处理")
+        get_progress().add_failure([row_num], f"文本过长（超过{MAX_TEXT_LENGTH}字符限制），已跳过")
+        stats['skip'] += targets
+        return None, f"文本过长错误（{text_length}字符，超过{MAX_TEXT_LENGTH}字符限制）"
+    
+    return source_text, None
+
+
+def choose_direction(detected_lang, direction=None):
+    """
+    根据检测到的语言确定翻译方向
+    
+    参数：
+        detected_lang: 检测到的语言（不能是LANG_NONE）
+        direction: 任务指定的翻译方向（parse_direction 的结果）：(源语言, 目标语言) 或 (None, 目标语言)；
+                   为None时按检测结果中英互译
+    
+    返回：
+        (源语言, 目标语言)；源语言与目标语言相同时不需要翻译
+    """
+    if direction is not None:
+        source_lang, target_lang = direction
+        if source_lang is not None:
+            # 任务指定了翻译方向，不再按检测结果决定
+            return direction
+        # 只指定了目标语言：源语言按检测结果，无法判断时交给翻译服务识别
+        return (detected_lang if detected_lang != LANG_UNKNOWN else LANG_AUTO, target_lang)
+    if detected_lang == LANG_EN:
+        # 如果是英文，翻译成中文
+        return (LANG_EN, LANG_ZH)
+    if detected_lang == LANG_ZH:
+        # 如果是中文，翻译成英文
+        return (LANG_ZH, LANG_EN)
+    if detected_lang != LANG_UNKNOWN:
+        # 日文、韩文、俄文等其他语言翻译成 OTHER_LANGUAGE_TARGET
+        return (detected_lang, OTHER_LANGUAGE_TARGET)
+    # 无法判断语言时，默认按中文处理
+    return (LANG_ZH, LANG_EN)
+
+
+class RowTranslation:
+    """
+    一组行的翻译，分为两步：
+    prepare 替换占位符、检测语言、拆分长文本并按翻译方向去重（只做本地计算，不查询缓存、不调用API）；
+    translate 查询缓存和翻译记忆、分批并发调用API、重试暂时失败的文本，最后按原顺序拼接各段译文
+    流式模式的流水线在不同的线程中执行这两步，下一块的准备与这一块的翻译同时进行：
+    prepare 只修改自己的统计字典、不刷新进度显示，translate 之前可以把 stats 换成合并后的统计字典
+    """
+    
+    def __init__(self, row_texts, service, stats, on_translated=None, directions=None):
+        """
+        参数：与 translate_rows 相同
+        """
+        self.row_texts = row_texts
+        self.service = service
+        self.stats = stats
+        self.on_translated = on_translated
+        self.directions = directions or [None]
+        self.row_values = [{} for _ in self.directions]  # 各目标：行号 -> 应写入的值
+        self.source_by_row = {}  # 行号 -> 原文
+        self.kept_cells = []  # 原样保留的 (行号, 目标序号)，在 translate 中调用回调
+        self.segments_by_cell = {}  # (行号, 目标序号) -> [(段落键, 段后的空白, 这一段的片段列表), ...]
+        self.rows_by_key = {}  # 段落键 (翻译方向, 规范化文本) -> [(行号, 目标序号), ...]
+        self.text_by_key = {}  # 段落键 -> 首次出现的文本（作为发送给API的文本）
+        self.token_counts = {}  # 段落键 -> 占位符个数（用于检查译文是否保留了全部占位符）
+        self.prepared = False
+    
+    def keep_source(self, row_num, target):
+        """原文不需要翻译（没有文字，或已是目标语言）：原样写入目标列，同样记入进度记录和增量翻译状态"""
+        self.row_values[target][row_num] = self.source_by_row[row_num]
+        self.stats['untranslated'] += 1
+        self.kept_cells.append((row_num, target))
+    
+    def prepare(self):
+        """
+        翻译前的本地处理：替换占位符、检测语言、拆分长文本、按翻译方向和规范化文本去重
+        """
+        directions = self.directions
+        all_targets = tuple(range(len(directions)))
+        stats = self.stats
+        metrics = get_metrics()
+        stage_started = time.perf_counter()
+        
+        # 把不需要翻译的片段（编号、网址、日期、数字等）替换为占位符，之后的语言检测、去重、缓存都以替换后的文本为准
+        masked_by_row = {}  # 行号 -> (替换后的文本, 片段列表)
+        targets_by_row = {}  # 行号 -> 需要翻译的目标序号
+        for entry in self.row_texts:
+            row_num, source_text = entry[0], entry[1]
+            self.source_by_row[row_num] = source_text
+            targets_by_row[row_num] = entry[2] if len(entry) > 2 else all_targets
+            masked_by_row[row_num] = mask_tokens(source_text) if MASK_UNTRANSLATABLE else (source_text, [])
+        
+        # 对每个不重复的文本检测一次语言（整列批量检测，与目标语言的个数无关）
+        rows_by_text = {}  # 规范化文本 -> [行号, ...]
+        source_by_text = {}  # 规范化文本 -> 首次出现的文本
+        text_key_by_row = {}  # 行号 -> 规范化文本
+        for row_num, (masked_text, _) in masked_by_row.items():
+            text_key = normalize_text(masked_text)
+            text_key_by_row[row_num] = text_key
+            if text_key not in rows_by_text:
+                rows_by_text[text_key] = []
+                source_by_text[text_key] = masked_text
+            rows_by_text[text_key].append(row_num)
+        
+        lang_by_text = {}  # 规范化文本 -> 检测到的语言
+        for text_key, detected_lang in zip(source_by_text, detect_languages(list(source_by_text.values()))):
+            if detected_lang == LANG_NONE:
+                # 只有编号、数字、网址、标点等，没有需要翻译的文字：不调用API，原样写入目标列
+                for row_num in rows_by_text[text_key]:
+                    for target in targets_by_row[row_num]:
+                        self.keep_source(row_num, target)
+                first_source = self.source_by_row[rows_by_text[text_key][0]]
+                log_detail(f"  = {format_row_numbers(rows_by_text[text_key])}无需翻译，原样保留：{first_source[:30]}")
+            else:
+                lang_by_text[text_key] = detected_lang
+                if detected_lang == LANG_UNKNOWN and None in directions:
+                    log_detail(f"  ⚠ 无法判断{format_row_numbers(rows_by_text[text_key])}的语言类型，将按中文处理")
+        stage_started = metrics.record_stage('detect', stage_started)
+        
+        # 每行拆分为若干段：超过长度限制的文本按句子拆分，其余文本只有一段；每段的占位符重新从0编号
+        # 翻译方向和规范化文本都相同的段只翻译一次（相同的单元格、长文本中重复的句子、只有编号不同的文本）
+        # 翻译成多种语言时，每个目标的一行（单元格）分别记录，拆分结果在各目标之间共用
+        segments_by_cell = self.segments_by_cell
+        rows_by_key = self.rows_by_key
+        text_by_key = self.text_by_key
+        occurrences = {}  # 段落键 -> 出现次数
+        for row_num, (masked_text, tokens) in masked_by_row.items():
+            detected_lang = lang_by_text.get(text_key_by_row[row_num])
+            if detected_lang is None:
+                continue  # 无需翻译
+            if len(masked_text) > MAX_TEXT_LENGTH:
+                segments = split_into_segments(masked_text)
+                log_detail(f"  ✂ 第 {row_num} 行文本较长（{len(masked_text)}字符），已按句子拆分为 {len(segments)} 段")
+            else:
+                segments = [(masked_text, '')]
+            prepared = []  # [(段落文本, 规范化文本, 段后的空白, 这一段的片段列表), ...]
+            for segment, separator in segments:
+                segment, segment_tokens = renumber_placeholders(segment, tokens)
+                stats['masked'] += len(segment_tokens)
+                prepared.append((segment, normalize_text(segment), separator, segment_tokens))
+            for target in targets_by_row[row_num]:
+                text_direction = choose_direction(detected_lang, directions[target])
+                if text_direction[0] == text_direction[1]:
+                    # 原文已经是目标语言：不调用API，原样写入目标列
+                    self.keep_source(row_num, target)
+                    continue
+                cell = (row_num, target)
+                segments_by_cell[cell] = []
+                for segment, segment_text, separator, segment_tokens in prepared:
+                    key = (text_direction, segment_text)
+                    if key not in rows_by_key:
+                        rows_by_key[key] = []
+                        text_by_key[key] = segment
+                        self.token_counts[key] = len(segment_tokens)
+                        occurrences[key] = 0
+                    if not rows_by_key[key] or rows_by_key[key][-1] != cell:
+                        # 行按顺序处理，同一单元格的重复段只需与最后一个单元格比较
+                        rows_by_key[key].append(cell)
+                    occurrences[key] += 1
+                    segments_by_cell[cell].append((key, separator, segment_tokens))
+        
+        # 去重统计：重复出现的文本（段）不再单独调用API
+        stats['unique'] += len(rows_by_key)
+        stats['duplicates'] += sum(occurrences.values()) - len(rows_by_key)
+        stats['saved_chars'] += sum(len(text_by_key[key]) * (count - 1) for key, count in occurrences.items())
+        metrics.record_stage('segment', stage_started)
+        self.prepared = True
+    
+    def translate(self):
+        """
+        翻译准备好的文本（还没有调用 prepare 时先调用）
+        
+        返回：
+            与directions一一对应的字典列表，每个字典为 行号 -> 应写入该目标列的值（译文或"翻译失败"）
+        """
+        if not self.prepared:
+            self.prepare()
+        service = self.service
+        stats = self.stats
+        on_translated = self.on_translated
+        row_values = self.row_values
+        segments_by_cell = self.segments_by_cell
+        rows_by_key = self.rows_by_key
+        text_by_key = self.text_by_key
+        token_counts = self.token_counts
+        metrics = get_metrics()
+        stage_started = time.perf_counter()
+        
+        if on_translated is not None:
+            for row_num, target in self.kept_cells:
+                on_translated([row_num], self.source_by_row[row_num], target)
+        report_progress(stats)
+        
+        tasks_by_direction = {}  # (源语言, 目标语言) -> [(段落键, 原文), ...]
+        for key, source_text in text_by_key.items():
+            tasks_by_direction.setdefault(key[0], []).append((key, source_text))
+        
+        segment_values = {}  # 段落键 -> 译文（最终失败时为None）
+        segment_errors = {}  # 段落键 -> 失败原因
+        remaining_keys = {cell: {key for key, _, _ in segments} for cell, segments in segments_by_cell.items()}
+        
+        def describe_rows(key):
+            """段落所在的行（用于提示信息）"""
+            return format_row_numbers(list(dict.fromkeys(row for row, _ in rows_by_key[key])))
+        
+        def write_rows(key, value, translated=True, error=None):
+            """记录一段文本的结果；某个单元格的所有段都有结果后，拼接该单元格的译文"""
+            segment_values[key] = value if translated else None
+            if not translated:
+                segment_errors[key] = error or "翻译失败"
+            completed = {}  # (目标序号, 译文) -> [行号, ...]
+            failed_rows = {}  # 失败原因 -> [行号, ...]
+            for cell in rows_by_key[key]:
+                remaining_keys[cell].discard(key)
+                if remaining_keys[cell]:
+                    continue
+                row, target = cell
+                translations = [segment_values[segment_key] for segment_key, _, _ in segments_by_cell[cell]]
+                if None in translations:
+                    # 任何一段翻译失败，整行都视为失败
+                    row_values[target][row] = "翻译失败"
+                    stats['fail'] += 1
+                    reason = next(segment_errors[segment_key] for segment_key, _, _ in segments_by_cell[cell]
+                                  if segment_values[segment_key] is None)
+                    failed_rows.setdefault(reason, []).append(row)
+                    continue
+                # 把占位符还原为本行原来的编号、数字等
+                translations = [restore_tokens(translation, segment_tokens)
+                                for translation, (_, _, segment_tokens) in zip(translations, segments_by_cell[cell])]
+                separators = [separator for _, separator, _ in segments_by_cell[cell]]
+                row_values[target][row] = join_segments(translations, separators, key[0][1])
+                stats['success'] += 1
+                completed.setdefault((target, row_values[target][row]), []).append(row)
+            for reason, rows in failed_rows.items():
+                # 失败原因在运行结束时汇总显示
+                get_progress().add_failure(rows, reason)
+            if on_translated is not None:
+                for (target, value), rows in completed.items():
+                    on_translated(rows, value, target)
+            report_progress(stats)
+        
+        # 查询翻译缓存：命中的文本直接使用缓存的译文，不再调用API
+        cache = get_translation_cache()
+        if cache is not None:
+            for (from_lang_code, to_lang_code), tasks in tasks_by_direction.items():
+                cached = cache.get_many(service, from_lang_code, to_lang_code, [text for _, text in tasks])
+                remaining_tasks = []
+                for key, source_text in tasks:
+                    if source_text in cached:
+                        write_rows(key, cached[source_text])
+                        log_detail(f"  ✓ {describe_rows(key)}命中缓存：{cached[source_text]}")
+                    else:
+                        remaining_tasks.append((key, source_text))
+                metrics.inc('cache_hits', len(cached), service=service)
+                if memory_enabled() and remaining_tasks:
+                    # 翻译记忆：缓存中只有编号、数字等片段不同的文本，套用其译文
+                    similar = cache.get_similar(service, from_lang_code, to_lang_code,
+                                                [text for _, text in remaining_tasks])
+                    for key, source_text in remaining_tasks:
+                        if source_text in similar and placeholders_intact(similar[source_text], token_counts[key]):
+                            write_rows(key, similar[source_text])
+                            stats['memory_hits'] += 1
+                            metrics.inc('memory_hits', service=service)
+                            log_detail(f"  ≈ {describe_rows(key)}套用相似文本的译文：{similar[source_text]}")
+                    remaining_tasks = [task for task in remaining_tasks if task[0] not in segment_values]
+                tasks_by_direction[(from_lang_code, to_lang_code)] = remaining_tasks
+            stage_started = metrics.record_stage('cache', stage_started)
+        
+        # 翻译记忆：本次要翻译的文本中记忆键相同的（只有编号、数字等片段不同），只翻译第一条，其余套用它的译文
+        followers_by_key = {}  # 段落键 -> [(段落键, 原文), ...]（等待套用该段译文的文本）
+        if memory_enabled():
+            for text_direction, tasks in tasks_by_direction.items():
+                leaders = {}  # 记忆键 -> 第一条文本的段落键
+                remaining_tasks = []
+                for key, source_text in tasks:
+                    leader_key = leaders.setdefault(memory_key(source_text)[0], key)
+                    if leader_key == key:
+                        remaining_tasks.append((key, source_text))
+                    else:
+                        followers_by_key.setdefault(leader_key, []).append((key, source_text))
+                tasks_by_direction[text_direction] = remaining_tasks
+        
+        def release_followers(key, translation, released):
+            """把一段文本的译文套用到等待它的文本；无法套用（或该段翻译失败）的文本放入released，改为直接翻译"""
+            for follower_key, follower_text in followers_by_key.pop(key, []):
+                adapted = adapt_translation(translation, text_by_key[key], follower_text) if translation else None
+                if adapted is not None and placeholders_intact(adapted, token_counts[follower_key]):
+                    write_rows(follower_key, adapted)
+                    stats['memory_hits'] += 1
+                    metrics.inc('memory_hits', service=service)
+                    log_detail(f"  ≈ {describe_rows(follower_key)}套用相似文本的译文：{adapted}")
+                else:
+                    released.setdefault(follower_key[0], []).append((follower_key, follower_text))
+        
+        # 按翻译方向分批调用翻译API
+        max_count, max_size, measure = get_batch_limits(service)
+        
+        def build_batches(tasks_by_direction):
+            """按翻译方向把待翻译文本切分成批次"""
+            batches = []
+            for (from_lang_code, to_lang_code), tasks in tasks_by_direction.items():
+                for batch in split_into_batches([text for _, text in tasks], max_count, max_size, measure):
+                    batches.append((from_lang_code, to_lang_code, [tasks[i] for i in batch]))
+            return batches
+        
+        def run_batch(from_lang_code, to_lang_code, batch_tasks):
+            """在工作线程中翻译一批文本（频率限制由共享的限制器控制）"""
+            lang_info = f"{LANGUAGE_NAMES.get(from_lang_code, from_lang_code)} → {LANGUAGE_NAMES.get(to_lang_code, to_lang_code)}"
+            if len(batch_tasks) == 1:
+                # 显示当前处理的行和翻译方向，同时显示文本长度
+                key, source_text = batch_tasks[0]
+                text_preview = source_text[:30] + "..." if len(source_text) > 30 else source_text
+                log_detail(f"正在翻译{describe_rows(key)} [{lang_info}]（文本长度：{len(source_text)}字符）：{text_preview}")
+            else:
+                batch_chars = sum(len(text) for _, text in batch_tasks)
+                log_detail(f"正在批量翻译 {len(batch_tasks)} 条文本 [{lang_info}]（共{batch_chars}字符）")
+        
+            # 调用统一的批量翻译函数，传入翻译方向和选择的翻译服务（缓存已在上面查询过）
+            return translate_batch([text for _, text in batch_tasks], from_lang_code, to_lang_code,
+                                   service, use_cache=False)
+        
+        # 多个批次并发翻译；结果在主线程中按批次记录到对应的行
+        # 因频率限制或网络问题暂时失败的文本放入重试队列，整轮结束并冷却后再统一重试
+        pending_batches = build_batches(tasks_by_direction)
+        pass_index = 0  # 已进行的重试轮数
+        while pending_batches:
+            is_final_pass = pass_index == RETRY_PASSES
+            retry_queue = {}  # (源语言, 目标语言) -> [(段落键, 原文), ...]
+            released = {}  # 无法套用译文、改为直接翻译的文本：(源语言, 目标语言) -> [(段落键, 原文), ...]
+        
+            with ThreadPoolExecutor(max_workers=max(1, CONCURRENCY)) as executor:
+                futures = {
+                    executor.submit(run_batch, from_lang_code, to_lang_code, batch_tasks): (from_lang_code, to_lang_code, batch_tasks)
+                    for from_lang_code, to_lang_code, batch_tasks in pending_batches
+                }
+                for future in as_completed(futures):
+                    from_lang_code, to_lang_code, batch_tasks = futures[future]
+                    results = future.result()
+                
+                    translated_pairs = {}  # 实际使用的翻译服务 -> [(原文, 译文), ...]
+                    for (key, source_text), result in zip(batch_tasks, results):
+                        rows_text = describe_rows(key)
+                        if result.text and not placeholders_intact(result.text, token_counts[key]):
+                            # 译文丢失或改写了占位符，无法还原编号等内容，按翻译失败处理（不写入缓存）
+                            log_detail(f"  ⚠ {rows_text}译文中的占位符不完整：{result.text}")
+                            result = TranslationResult(None, "译文中的占位符不完整")
+                        if result.text:
+                            # 如果翻译成功，记录到所有相同文本所在的行
+                            write_rows(key, result.text)
+                            log_detail(f"  ✓ {rows_text}翻译成功：{result.text}")
+                            translated_pairs.setdefault(result.service or service, []).append((source_text, result.text))
+                            release_followers(key, result.text, released)
+                        elif result.retryable and not is_final_pass:
+                            # 暂时性失败：放入重试队列，稍后再试
+                            retry_queue.setdefault((from_lang_code, to_lang_code), []).append((key, source_text))
+                            log_detail(f"  ↻ {rows_text}暂时失败，已放入重试队列：{result.error}")
+                        else:
+                            # 如果翻译失败，在目标列写入提示信息，失败原因在运行结束时汇总显示
+                            write_rows(key, "翻译失败", translated=False, error=result.error or "翻译失败")
+                            log_detail(f"  ✗ {rows_text}翻译失败：{result.error}")
+                            release_followers(key, None, released)
+                
+                    # 每批翻译完成后立即写入缓存，程序中断时已付费的译文也不会丢失
+                    if cache is not None:
+                        for used_service, pairs in translated_pairs.items():
+                            cache.set_many(used_service, from_lang_code, to_lang_code, pairs)
+        
+            pending_batches = build_batches(released)
+            if not retry_queue:
+                continue
+            queued = sum(len(tasks) for tasks in retry_queue.values())
+            stats['retried'] += queued
+            log_info(f"🔁 第 {pass_index + 1}/{RETRY_PASSES} 轮重试：{queued} 条文本，冷却 {RETRY_PASS_DELAY:g} 秒后开始...")
+            metrics.inc('sleep_seconds', RETRY_PASS_DELAY, kind='retry_pass', service=service)
+            time.sleep(RETRY_PASS_DELAY)
+            pass_index += 1
+            pending_batches += build_batches(retry_queue)
+        metrics.record_stage('translate', stage_started)
+        
+        return row_values
+
+
+def translate_rows(row_texts, service, stats, on_translated=None, directions=None):
+    """
+    翻译一组行的文本：检测语言、把长文本按句子拆分、按规范化文本去重、查询缓存、分批并发调用API，
+    暂时失败的文本进入重试队列，最后按原顺序拼接各段译文
+    
+    同一源列翻译成多种语言时（directions有多项），每行只替换占位符、检测语言和拆分一次；
+    各语言的文本按翻译方向分别去重、查询缓存和分批，所有批次在同一个线程池中并发翻译
+    
+    参数：
+        row_texts: [(行号, 原文), ...]（原文已去除首尾空白；超过长度限制的文本按句子拆分后翻译）；
+                   元组中还可以有第三项"目标序号元组"，只翻译到其中的目标（其余目标已从进度记录恢复或无需更新）
+        service: 翻译服务（'youdao' 或 'deepl'）
+        stats: 统计字典（会累加各项计数；翻译成多种语言时每个目标的每一行各计一行）
+        on_translated: 可选的回调函数 on_translated(行号列表, 译文, 目标序号)，每得到一条译文（包括缓存命中）时
+                       在主线程中立即调用，用于写入进度记录和定期保存
+        directions: 各目标的翻译方向列表（parse_direction 的结果）；为None时只有一个目标，按每段文本自动识别语言
+    
+    返回：
+        与directions一一对应的字典列表，每个字典为 行号 -> 应写入该目标列的值（译文或"翻译失败"）
+    """
+    return RowTranslation(row_texts, service, stats, on_translated, directions).translate()
+
+
+def should_translate(state, source_text, target_value, stats):
+    """
+    增量模式下判断一行是否需要翻译，并累加跳过的行数
+    
+    参数：
+        state: 增量翻译状态（IncrementalState）
+        source_text: 原文
+        target_value: 目标列当前的值
+        stats: 统计字典
+    
+    返回：
+        True表示需要翻译
+    """
+    status = state.check(source_text, target_value)
+    if status == 'translate':
+        return True
+    stats[status] += 1
+    return False
+
+
+def translate_sheet_in_place(sheet, jobs, start_row, service, stats, journal=None, checkpoint=None, states=None):
+    """
+    翻译工作表的源列，并把结果写入同一工作表的目标列（整个工作簿已加载到内存）
+    同一源列翻译成多种语言（多个目标列）时，每行只读取和检测一次，各语言的译文分别批量翻译
+    
+    参数：
+        sheet: Excel工作表对象
+        jobs: [(任务序号, TranslationJob), ...]（源列相同的一组任务，见 group_jobs）
+        start_row: 开始翻译的行号
+        service: 翻译服务（'youdao' 或 'deepl'）
+        stats: 统计字典
+        journal: 进度记录（ProgressJournal），已完成的行直接使用记录中的译文，新译文追加到记录中
+        checkpoint: 定期保存工作簿（WorkbookCheckpoint）
+        states: 按任务序号排列的增量翻译状态列表（IncrementalState），只翻译新增或修改过的行
+    """
+    source_column = jobs[0][1].source_column
+    source_col_letter = number_to_column_letter(source_column)
+    target_columns = [job.target_column for _, job in jobs]
+    target_states = [states[job_index] if states else None for job_index, _ in jobs]
+    completed = [journal.completed_rows(job_index) if journal is not None else {} for job_index, _ in jobs]
+    
+    # 第一遍：读取源列，收集需要翻译的行（上次已完成的行直接写回记录中的译文）
+    metrics = get_metrics()
+    read_started = time.perf_counter()
+    row_texts = []
+    for row_num in range(start_row, sheet.max_row + 1):
+        pending = []  # 这一行需要翻译的目标序号
+        for target, target_column in enumerate(target_columns):
+            if row_num in completed[target]:
+                sheet.cell(row=row_num, column=target_column).value = completed[target][row_num]
+                stats['resumed'] += 1
+            else:
+                pending.append(target)
+        if not pending:
+            continue
+        cell_value = sheet.cell(row=row_num, column=source_column).value
+        source_text, target_value = read_source_cell(row_num, cell_value, source_col_letter, stats, len(pending))
+        if source_text is not None:
+            pending = [target for target in pending if target_states[target] is None or should_translate(
+                target_states[target], source_text, sheet.cell(row=row_num, column=target_columns[target]).value, stats)]
+            if pending:
+                row_texts.append((row_num, source_text, tuple(pending)))
+        elif target_value is not None:
+            for target in pending:
+                sheet.cell(row=row_num, column=target_columns[target]).value = target_value
+    metrics.record_stage('read', read_started)
+    report_progress(stats)
+    
+    if any(completed):
+        first_row = row_texts[0][0] if row_texts else None
+        log_info(f"✓ 已从进度记录恢复 {stats['resumed']} 行" + (f"，从第 {first_row} 行继续" if first_row else ""))
+    
+    source_by_row = {row_num: source_text for row_num, source_text, _ in row_texts}
+    
+    def on_translated(row_nums, value, target):
+        """译文到达后立即写入工作表和进度记录，并按需保存工作簿"""
+        for row_num in row_nums:
+            sheet.cell(row=row_num, column=target_columns[target]).value = value
+        if target_states[target] is not None:
+            target_states[target].record(source_by_row[row_nums[0]], value)
+        if journal is not None:
+            journal.record(row_nums, value, jobs[target][0])
+        if checkpoint is not None:
+            checkpoint.add(len(row_nums))
+    
+    # 第二遍：翻译并把结果写回对应的行
+    directions = [parse_direction(job.direction) for _, job in jobs]
+    for target, values in enumerate(translate_rows(row_texts, service, stats, on_translated, directions)):
+        for row_num, value in values.items():
+            sheet.cell(row=row_num, column=target_columns[target]).value = value
+
+
+def get_streaming_output_file(input_file):
+    """
+    生成流式模式默认的输出文件名（在原文件名后加"_translated"）
+    
+    参数：
+        input_file: 输入的Excel文件路径
+    
+    返回：
+        输出文件路径
+    """
+    base, ext = os.path.splitext(input_file)
+    return f"{base}_translated{ext or '.xlsx'}"
+
+
+def translate_workbook_streaming(input_file, output_file, jobs, start_row, service, stats,
+                                 chunk_rows=None, journal=None, states=None):
+    """
+    流式翻译：以只读模式逐行读取输入文件，分块翻译后以只写模式写入新的输出文件
+    内存占用只与块大小和队列容量有关，与总行数无关；输入文件保持不变
+    
+    读取、分类去重、翻译、写入是由有界队列连接的四个阶段（见 pipeline.py），各自在单独的线程中运行：
+    翻译一块的同时，下一块已在读取和准备，上一块在写入；某个阶段处理不过来时上游会等待（背压），
+    内存中最多只有 PIPELINE_QUEUE_SIZE 决定的若干块。翻译阶段在主线程中运行，Ctrl+C 可以立即中断
+    
+    注意：只写模式只复制单元格的值，不保留格式、列宽、合并单元格等；
+    输出文件只能在最后一次性保存，中途的进度依靠进度记录（journal）保留
+    
+    参数：
+        input_file: 输入的Excel文件路径
+        output_file: 输出的Excel文件路径（不能与输入文件相同）
+        jobs: 翻译任务列表（TranslationJob），同一工作表的多个任务在同一次读取中按顺序完成
+        start_row: 开始翻译的行号
+        service: 翻译服务（'youdao' 或 'deepl'）
+        stats: 统计字典
+        chunk_rows: 每块的行数（默认使用 STREAMING_CHUNK_ROWS）
+        journal: 进度记录（ProgressJournal），已完成的行直接使用记录中的译文，新译文追加到记录中
+        states: 与jobs一一对应的增量翻译状态列表（IncrementalState），以输入文件的目标列为准
+    """
+    if os.path.abspath(input_file) == os.path.abspath(output_file):
+        raise ValueError("流式模式的输出文件不能与输入文件相同")
+    
+    chunk_rows = chunk_rows or STREAMING_CHUNK_ROWS
+    states = states or [None] * len(jobs)
+    metrics = get_metrics()
+    with metrics.stage('load'):
+        input_workbook = openpyxl.load_workbook(input_file, read_only=True)
+    output_workbook = openpyxl.Workbook(write_only=True)
+    groups_by_sheet = {}  # 工作表名称 -> 源列相同的各组任务（见 group_jobs）
+    for group in group_jobs(jobs):
+        groups_by_sheet.setdefault(group[0][1].sheet, []).append(group)
+    
+    def read_chunks():
+        """读取阶段：逐行读取各工作表，每 chunk_rows 行为一块；没有行的工作表也送出一个空块，以便创建输出工作表"""
+        for input_sheet in input_workbook.worksheets:
+            chunk = []
+            sent = False
+            read_started = time.perf_counter()
+            for row_num, row in enumerate(input_sheet.iter_rows(values_only=True), start=1):
+                chunk.append((row_num, list(row)))
+                if len(chunk) >= chunk_rows:
+                    metrics.record_stage('read', read_started)
+                    yield input_sheet.title, chunk
+                    chunk = []
+                    sent = True
+                    read_started = time.perf_counter()
+            metrics.record_stage('read', read_started)
+            if chunk or not sent:
+                yield input_sheet.title, chunk
+    
+    def classify(item):
+        """
+        分类阶段：恢复进度记录中的译文、读取源列、增量判断，并为每组任务完成翻译前的本地处理；
+        源列是前面某组任务目标列的任务要等前一组的译文写入后才能读取，留到翻译阶段再准备。
+        翻译阶段同时在主线程中修改 stats，因此每组任务先计入单独的统计字典，由翻译阶段合并
+        """
+        title, chunk = item
+        translations = []  # [(任务组, RowTranslation或None, 本组的统计字典), ...]
+        written_columns = set()
+        for group in groups_by_sheet.get(title, []):
+            if group[0][1].source_column in written_columns:
+                translations.append((group, None, None))
+            else:
+                group_stats = new_run_stats()
+                translation = prepare_chunk(chunk, group, start_row, service, group_stats, journal, states)
+                translations.append((group, translation, group_stats))
+            written_columns.update(job.target_column for _, job in group)
+        return title, chunk, translations
+    
+    def translate(item):
+        """翻译阶段：合并分类阶段的统计，依次翻译本块的各组任务，译文写入行数据列表"""
+        title, chunk, translations = item
+        for group, translation, group_stats in translations:
+            if translation is None:
+                translation = prepare_chunk(chunk, group, start_row, service, stats, journal, states)
+            else:
+                for key, value in group_stats.items():
+                    stats[key] += value
+                translation.stats = stats
+            fill_chunk(chunk, group, translation.translate())
+        return title, chunk
+    
+    output_sheets = {}  # 工作表名称 -> 输出工作表（没有任务的工作表原样复制）
+    
+    def write(item):
+        """写入阶段：按顺序把整块写入输出工作表，然后把进度记录强制写入磁盘"""
+        title, chunk = item
+        if title not in output_sheets:
+            output_sheets[title] = output_workbook.create_sheet(title)
+        with metrics.stage('write'):
+            for _, values in chunk:
+                output_sheets[title].append(values)
+        if journal is not None:
+            journal.sync()
+    
+    pipeline = Pipeline(PIPELINE_QUEUE_SIZE)
+    pipeline.add_stage('read', read_chunks)
+    pipeline.add_stage('classify', classify)
+    pipeline.add_stage('translate', translate, in_main_thread=True)
+    pipeline.add_stage('write', write)
+    try:
+        pipeline.run()
+        with metrics.stage('save'):
+            output_workbook.save(output_file)
+    except BaseException:
+        # 中途出错或被中断时关闭已写入一半的工作表，避免临时文件残留未关闭的写入器
+        for output_sheet in output_workbook.worksheets:
+            output_sheet.close()
+        raise
+    finally:
+        input_workbook.close()
+
+
+def prepare_chunk(chunk, jobs, start_row, service, stats, journal=None, states=None):
+    """
+    流式模式下为一块行准备一组源列相同的翻译任务：已完成的行直接写回进度记录中的译文，
+    读取源列并做增量判断，然后完成翻译前的本地处理（RowTranslation.prepare）
+    
+    参数：
+        chunk: [(行号, 值列表), ...]（行号连续）
+        jobs: [(任务序号, TranslationJob), ...]（源列相同的一组任务，见 group_jobs）
+        start_row: 开始翻译的行号
+        service: 翻译服务（'youdao' 或 'deepl'）
+        stats: 统计字典（不刷新进度显示；在分类线程中调用时应为本块单独的统计字典，见 translate_workbook_streaming）
+        journal: 进度记录（ProgressJournal）
+        states: 按任务序号排列的增量翻译状态列表（IncrementalState）
+    
+    返回：
+        RowTranslation，调用其 translate 得到译文后用 fill_chunk 写入块中
+    """
+    source_column = jobs[0][1].source_column
+    source_col_letter = number_to_column_letter(source_column)
+    target_columns = [job.target_column for _, job in jobs]
+    target_states = [states[job_index] if states else None for job_index, _ in jobs]
+    completed = [journal.completed_rows(job_index) if journal is not None else {} for job_index, _ in jobs]
+    
+    row_texts = []
+    for row_num, values in chunk:
+        if row_num < start_row:
+            continue
+        pending = []  # 这一行需要翻译的目标序号
+        for target, target_column in enumerate(target_columns):
+            if row_num in completed[target]:
+                set_row_value(values, target_column, completed[target][row_num])
+                stats['resumed'] += 1
+            else:
+                pending.append(target)
+        if not pending:
+            continue
+        cell_value = values[source_column - 1] if len(values) >= source_column else None
+        source_text, target_value = read_source_cell(row_num, cell_value, source_col_letter, stats, len(pending))
+        if source_text is not None:
+            pending = [target for target in pending if target_states[target] is None or should_translate(
+                target_states[target], source_text,
+                values[target_columns[target] - 1] if len(values) >= target_columns[target] else None, stats)]
+            if pending:
+                row_texts.append((row_num, source_text, tuple(pending)))
+        elif target_value is not None:
+            for target in pending:
+                set_row_value(values, target_columns[target], target_value)
+    
+    source_by_row = {row_num: source_text for row_num, source_text, _ in row_texts}
+    
+    def on_translated(row_nums, value, target):
+        """译文到达后立即写入进度记录和增量翻译状态"""
+        if target_states[target] is not None:
+            target_states[target].record(source_by_row[row_nums[0]], value)
+        if journal is not None:
+            journal.record(row_nums, value, jobs[target][0])
+    
+    directions = [parse_direction(job.direction) for _, job in jobs]
+    translation = RowTranslation(row_texts, service, stats, on_translated, directions)
+    translation.prepare()
+    return translation
+
+
+def fill_chunk(chunk, jobs, row_values):
+    """
+    把一组任务的译文写入块的行数据列表
+    
+    参数：
+        chunk: [(行号, 值列表), ...]（行号连续）
+        jobs: [(任务序号, TranslationJob), ...]（与 prepare_chunk 相同的一组任务）
+        row_values: RowTranslation.translate 的返回值
+    """
+    first_row = chunk[0][0]
+    for (_, job), values in zip(jobs, row_values):
+        for row_num, value in values.items():
+            set_row_value(chunk[row_num - first_row][1], job.target_column, value)
+
+
+def set_row_value(values, column, value):
+    """
+    设置行数据列表中指定列的值（列表长度不足时补None）
+    
+    参数：
+        values: 一行的值列表
+        column: 列编号（从1开始）
+        value: 要设置的值
+    """
+    if len(values) < column:
+        values.extend([None] * (column - len(values)))
+    values[column - 1] = value
+
+
+def print_run_stats(stats, service):
+    """
+    打印运行结束时的统计信息
+    
+    参数：
+        stats: 统计字典
+        service: 翻译服务（'youdao' 或 'deepl'）
+    """
+    print("\n📊 统计信息：")
+    print(f"  成功翻译：{stats['success']} 行")
+    print(f"  翻译失败：{stats['fail']} 行")
+    print(f"  跳过空行：{stats['skip']} 行")
+    if stats['untranslated']:
+        print(f"  无需翻译：{stats['untranslated']} 行（只有编号、数字、网址、符号等，或原文已是目标语言，原样保留）")
+    if stats['masked']:
+        print(f"  占位符保护：{stats['masked']} 个编号、数字、网址等片段未发送给翻译服务")
+    if stats['resumed']:
+        print(f"  从进度记录恢复：{stats['resumed']} 行")
+    if stats['unchanged'] or stats['manual']:
+        print(f"  增量跳过：原文未修改 {stats['unchanged']} 行，人工填写 {stats['manual']} 行")
+    skipped = stats['skip'] + stats['resumed'] + stats['unchanged'] + stats['manual'] + stats['untranslated']
+    print(f"  总计处理：{stats['success'] + stats['fail'] + skipped} 行")
+    print(f"  不重复文本：{stats['unique']} 条，重复文本节省：{stats['duplicates']} 次翻译，共 {stats['saved_chars']} 字符")
+    if stats['memory_hits']:
+        print(f"  翻译记忆：{stats['memory_hits']} 条文本套用了相似文本的译文（只有编号、数字等片段不同）")
+    cache = get_translation_cache()
+    if cache is not None:
+        print(f"  缓存命中：{cache.hits} 条，未命中：{cache.misses} 条")
+    # 只统计已经使用过的密钥池（没有翻译请求时不为了统计去查询配额）
+    credentials = [credential for routed_service in get_router(service).services
+                   for credential in _credential_pools.get(routed_service, [])]
+    wait_time = sum(credential.limiter.wait_time for credential in credentials)
+    throttle_count = sum(credential.limiter.throttle_count for credential in credentials)
+    print(f"  限速等待：{wait_time:.1f} 秒（并发请求数：{CONCURRENCY}）")
+    print(f"  频率限制信号：{throttle_count} 次，重试队列：{stats['retried']} 条文本")
+    if len(credentials) > 1:
+        # 多个账号或配置了切换服务时，显示每个账号的用量和状态
+        for credential in credentials:
+            remaining = credential.remaining_quota
+            quota_info = f"，剩余配额 {remaining} 字符" if remaining is not None else ""
+            print(f"  账号 {credential.name}：成功请求 {credential.request_count} 次，翻译 {credential.used_chars} 字符"
+                  f"{quota_info}，频率限制 {credential.throttle_count} 次，{credential.describe_status()}")
+    connection_stats = get_connection_stats()
+    print(f"  HTTP连接：请求 {connection_stats['requests']} 次，新建连接 {connection_stats['connections']} 个，"
+          f"复用连接 {connection_stats['reused']} 次")
+    print_stage_times()
+    get_progress().print_failures(FAILURE_SUMMARY_LIMIT)
+
+
+# 阶段名称（用于显示各阶段耗时）
+STAGE_NAMES = {
+    'load': '加载',
+    'read': '读取',
+    'detect': '语言检测',
+    'segment': '拆分去重',
+    'cache': '查询缓存',
+    'translate': '翻译',
+    'write': '写入',
+    'checkpoint_save': '检查点保存',
+    'save': '保存',
+}
+
+# 流式模式流水线各阶段的名称
+PIPELINE_STAGE_NAMES = {
+    'read': '读取',
+    'classify': '分类去重',
+    'translate': '翻译',
+    'write': '写入',
+}
+
+# 等待类型的名称
+SLEEP_NAMES = {
+    'rate_limit': '限速',
+    'retry': '退避重试',
+    'retry_pass': '重试队列冷却',
+}
+
+
+def print_stage_times():
+    """
+    打印运行指标中的各阶段耗时、等待时间和HTTP请求延时
+    """
+    metrics = get_metrics()
+    stage_times = [f"{title} {metrics.get('stage_seconds', stage=stage):.1f}秒"
+                   for stage, title in STAGE_NAMES.items() if metrics.get('stage_calls', stage=stage)]
+    if stage_times:
+        print(f"  阶段耗时：{'，'.join(stage_times)}")
+    sleep_times = [f"{title} {metrics.get('sleep_seconds', kind=kind):.1f}秒"
+                   for kind, title in SLEEP_NAMES.items() if metrics.get('sleep_seconds', kind=kind)]
+    if sleep_times:
+        print(f"  等待时间（各请求累计）：{'，'.join(sleep_times)}")
+    for item in metrics.to_dict()['histograms'].get('http_request_seconds', []):
+        print(f"  请求延时（{item['labels'].get('service', '')}）：平均 {item['mean'] * 1000:.0f} 毫秒，"
+              f"最长 {item['max'] * 1000:.0f} 毫秒，共 {item['count']} 次")
+    print_pipeline_times(metrics)
+
+
+def print_pipeline_times(metrics):
+    """
+    打印流式模式流水线各阶段的处理、空闲（等待上游）和阻塞（等待下游）时间及输入队列深度，
+    处理时间最长的阶段就是限制吞吐量的瓶颈，其他阶段大部分时间在等待它
+    
+    参数：
+        metrics: 运行指标（Metrics）
+    """
+    stages = [stage for stage in PIPELINE_STAGE_NAMES if metrics.get('pipeline_items', stage=stage)]
+    if not stages:
+        return
+    depths = {item['labels'].get('stage'): item
+              for item in metrics.to_dict()['histograms'].get('pipeline_queue_depth', [])}
+    print(f"  流水线（队列容量 {PIPELINE_QUEUE_SIZE} 块）：")
+    for stage in stages:
+        line = (f"    {PIPELINE_STAGE_NAMES[stage]}：{metrics.get('pipeline_items', stage=stage):.0f} 块，"
+                f"处理 {metrics.get('pipeline_seconds', stage=stage, state='busy'):.1f}秒，"
+                f"等待上游 {metrics.get('pipeline_seconds', stage=stage, state='idle'):.1f}秒，"
+                f"等待下游 {metrics.get('pipeline_seconds', stage=stage, state='blocked'):.1f}秒")
+        if stage in depths:
+            line += f"，输入队列平均 {depths[stage]['mean']:.1f} 块、最多 {depths[stage]['max']:.0f} 块"
+        print(line)
+    bottleneck = max(stages, key=lambda stage: metrics.get('pipeline_seconds', stage=stage, state='busy'))
+    print(f"  流水线瓶颈：{PIPELINE_STAGE_NAMES[bottleneck]}（处理时间最长，其他阶段主要在等待它）")
+
+
+def export_metrics(stats=None):
+    """
+    运行结束后把运行指标写入 METRICS_JSON_FILE 和 METRICS_PROMETHEUS_FILE（未配置时不写入）
+    
+    参数：
+        stats: 统计字典（行数按结果记入 rows 指标）
+    """
+    if not METRICS_JSON_FILE and not METRICS_PROMETHEUS_FILE:
+        return
+    metrics = get_metrics()
+    if stats is not None:
+        for result in ROW_RESULTS:
+            metrics.inc('rows', stats[result], result=result)
+    try:
+        if METRICS_JSON_FILE:
+            metrics.write_json(METRICS_JSON_FILE)
+            print(f"✓ 运行指标已写入：{METRICS_JSON_FILE}")
+        if METRICS_PROMETHEUS_FILE:
+            metrics.write_prometheus(METRICS_PROMETHEUS_FILE)
+            print(f"✓ Prometheus指标已写入：{METRICS_PROMETHEUS_FILE}")
+    except OSError as e:
+        print(f"⚠ 写入运行指标失败：{e}")
+
+
+def parse_direction(direction):
+    """
+    解析翻译方向
+    
+    参数：
+        direction: 'auto'（自动识别中英文后互译）、目标语言（如'ja'，自动识别源语言）或 '源语言-目标语言'（如'zh-en'）
+    
+    返回：
+        None（自动识别后中英互译）、(None, 目标语言) 或 (源语言, 目标语言)
+    """
+    direction = str(direction or 'auto').strip().lower()
+    if direction == 'auto':
+        return None
+    languages = direction.split('-')
+    if len(languages) > 2 or not all(lang in LANGUAGE_NAMES for lang in languages):
+        raise ValueError(f"不支持的翻译方向：{direction}（应为 auto、目标语言或 源语言-目标语言，"
+                         f"语言代码可选：{'、'.join(LANGUAGE_NAMES)}）")
+    if len(languages) == 1:
+        return (None, languages[0])
+    if languages[0] == languages[1]:
+        raise ValueError(f"翻译方向的源语言和目标语言相同：{direction}")
+    return tuple(languages)
+
+
+def make_translation_job(sheet, source, target, direction='auto'):
+    """
+    创建翻译任务并检查参数
+    
+    参数：
+        sheet: 工作表名称（None表示当前活动工作表）
+        source: 源列（字母或数字，如'A'或1）
+        target: 目标列（字母或数字）
+        direction: 翻译方向（'auto'、目标语言如'ja'，或'源语言-目标语言'如'zh-en'）
+    
+    返回：
+        TranslationJob
+    """
+    source_column = column_letter_to_number(source)
+    target_column = column_letter_to_number(target)
+    if not source_column or not target_column:
+        raise ValueError(f"列号格式错误：{source} → {target}（应为 A、B 或 1、2）")
+    direction = str(direction or 'auto').strip().lower()
+    parse_direction(direction)
+    return TranslationJob(sheet, source_column, target_column, direction)
+
+
+def parse_job_spec(spec):
+    """
+    解析命令行中的翻译任务，格式为 [工作表:]源列:目标列[:方向]，如 'A:B'、'A:B:ja'、'Sheet1:C:D:en-zh'；
+    同一源列翻译成多种语言时目标写成 目标列=方向 并用逗号分隔，如 'Sheet1:A:B=en,C=ja,D=ko'
+    
+    参数：
+        spec: 任务字符串
+    
+    返回：
+        TranslationJob列表（每个目标列一个任务）
+    """
+    parts = spec.split(':')  # Excel工作表名称中不允许出现冒号
+    direction = 'auto'
+    last = parts[-1].strip().lower()
+    if len(parts) > 2 and (last == 'auto' or '-' in last or last in LANGUAGE_NAMES):
+        # 列号中不会出现"-"，带"-"的最后一项是翻译方向；与语言代码同名的最后一项按目标语言处理（如 A:B:ja）
+        direction = parts.pop().strip().lower()
+    if len(parts) == 2:
+        sheet, source, targets = None, parts[0], parts[1]
+    elif len(parts) == 3:
+        sheet, source, targets = parts
+    else:
+        raise ValueError(f"任务格式错误：{spec}（应为 [工作表:]源列:目标列[:方向] 或 [工作表:]源列:目标列=方向,...）")
+    jobs = []
+    for target in targets.split(','):
+        target, _, target_direction = target.partition('=')
+        jobs.append(make_translation_job(sheet, source, target, target_direction or direction))
+    return jobs
+
+
+def load_job_config(path):
+    """
+    读取JSON格式的任务配置文件
+    
+    配置示例：
+        {
+            "file": "产品表.xlsx",
+            "service": "deepl",
+            "skip_header": true,
+            "delay": 0.5,
+            "jobs": [
+                {"sheet": "Sheet1", "source": "A", "target": "B"},
+                {"sheet": "规格", "source": "C", "target": "D", "direction": "zh-en"},
+                {"sheet": "规格", "source": "E", "targets": {"F": "en", "G": "ja", "H": "ko"}}
+            ]
+        }
+    
+    参数：
+        path: 配置文件路径
+    
+    返回：
+        (配置字典, 翻译任务列表)
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return config, parse_job_config(config.get('jobs', []))
+
+
+def parse_job_config(items):
+    """
+    解析配置中的任务列表（配置文件和翻译服务模式提交的任务使用相同的格式）
+    
+    参数：
+        items: [{"sheet": ..., "source": ..., "target": ..., "direction": ...}, ...]，
+               同一源列翻译成多种语言时用 "targets": {目标列: 翻译方向, ...} 代替 target 和 direction
+    
+    返回：
+        翻译任务列表（TranslationJob）
+    """
+    jobs = []
+    for item in items:
+        # targets：同一源列翻译成多种语言，目标列 -> 翻译方向
+        targets = item['targets'] if 'targets' in item else {item['target']: item.get('direction', 'auto')}
+        for target, direction in targets.items():
+            jobs.append(make_translation_job(item.get('sheet'), item['source'], target, direction))
+    return jobs
+
+
+def resolve_jobs(jobs, sheet_names, active_sheet):
+    """
+    检查任务中的工作表是否存在，并把未指定的工作表替换为当前活动工作表
+    
+    参数：
+        jobs: 翻译任务列表
+        sheet_names: 工作簿中所有工作表的名称
+        active_sheet: 当前活动工作表的名称
+    
+    返回：
+        工作表名称已确定的任务列表
+    """
+    resolved = []
+    for job in jobs:
+        if job.sheet is None:
+            job = job._replace(sheet=active_sheet)
+        if job.sheet not in sheet_names:
+            raise ValueError(f"找不到工作表：{job.sheet}（可选：{'、'.join(sheet_names)}）")
+        resolved.append(job)
+    return resolved
+
+
+def group_jobs(jobs):
+    """
+    把源列相同的任务分为一组（同一源列翻译成多种语言），每组只读取和检测一次源列
+    
+    参数：
+        jobs: 工作表名称已确定的任务列表
+    
+    返回：
+        [[(任务序号, TranslationJob), ...], ...]（按每组第一个任务的顺序）
+    """
+    groups = {}  # (工作表, 源列) -> [(任务序号, 任务), ...]
+    for job_index, job in enumerate(jobs):
+        groups.setdefault((job.sheet, job.source_column), []).append((job_index, job))
+    return list(groups.values())
+
+
+def describe_direction(direction):
+    """
+    生成翻译方向的说明文字
+    
+    参数：
+        direction: 翻译方向（如'auto'、'ja'、'zh-en'）
+    
+    返回：
+        如'自动识别中英文'、'翻译成日文'或'中文 → 英文'
+    """
+    languages = parse_direction(direction)
+    if languages is None:
+        return '自动识别中英文'
+    source_lang, target_lang = languages
+    if source_lang is None:
+        return f"翻译成{LANGUAGE_NAMES[target_lang]}"
+    return f"{LANGUAGE_NAMES[source_lang]} → {LANGUAGE_NAMES[target_lang]}"
+
+
+def describe_job(job):
+    """
+    生成翻译任务的说明文字
+    
+    参数：
+        job: 翻译任务
+    
+    返回：
+        如'工作表「Sheet1」A列 → B列（自动识别中英文）'
+    """
+    return (f"工作表「{job.sheet}」{number_to_column_letter(job.source_column)}列 → "
+            f"{number_to_column_letter(job.target_column)}列（{describe_direction(job.direction)}）")
+
+
+def describe_job_group(group):
+    """
+    生成一组源列相同的任务的说明文字
+    
+    参数：
+        group: [(任务序号, TranslationJob), ...]
+    
+    返回：
+        如'工作表「Sheet1」A列 → B列（翻译成英文）、C列（翻译成日文）'
+    """
+    if len(group) == 1:
+        return describe_job(group[0][1])
+    first_job = group[0][1]
+    targets = '、'.join(f"{number_to_column_letter(job.target_column)}列（{describe_direction(job.direction)}）"
+                       for _, job in group)
+    return f"工作表「{first_job.sheet}」{number_to_column_letter(first_job.source_column)}列 → {targets}"
 
 
-def column_letter_to_number(column_input):
+def check_job_languages(jobs, service):
     """
-    将列号转换为数字（支持字母格式如A、B、C，也支持数字格式如1、2、3）
+    检查所选翻译服务是否支持任务中的所有语言
     
     参数：
-        column_input: 用户输入的列号（可以是'A'、'B'或'1'、'2'等）
+        jobs: 翻译任务列表
+        service: 翻译服务
     
     返回：
-        列的数字编号（1表示A列，2表示B列，以此类推）
+        True表示都支持
     """
-    column_input = str(column_input).strip().upper()  # 转换为大写并去除空格
-    
-    # 如果输入的是字母（如A、B、C）
-    if column_input.isalpha():
-        # 将字母转换为数字：A=1, B=2, ..., Z=26, AA=27, AB=28, ...
-        result = 0
-        for char in column_input:
-            result = result * 26 + (ord(char) - ord('A') + 1)
-        return result
-    # 如果输入的是数字（如1、2、3）
-    elif column_input.isdigit():
-        return int(column_input)
-    else:
-        return None  # 无效输入
+    backend = get_backend(service)
+    for job in jobs:
+        languages = parse_direction(job.direction) or (LANG_ZH, LANG_EN)
+        unsupported = [lang for lang in languages if lang is not None and not backend.supports_language(lang)]
+        if unsupported:
+            print(f"❌ 错误：{backend.display_name}不支持{'、'.join(LANGUAGE_NAMES[lang] for lang in unsupported)}"
+                  f"（{number_to_column_letter(job.target_column)}列：{describe_direction(job.direction)}）")
+            return False
+    return True
 
 
-def number_to_column_letter(column_num):
+def check_api_key(service):
     """
-    将列的数字编号转换为字母格式（1→A, 2→B, 等等）
+    检查所选翻译服务的API密钥是否已配置，未配置时打印获取方法
     
     参数：
-        column_num: 列的数字编号
+        service: 翻译服务（'youdao' 或 'deepl'）
     
     返回：
-        列的字母表示（如'A'、'B'、'AA'等）
+        True表示已配置
     """
-    result = ""
-    while column_num > 0:
-        column_num -= 1  # 转换为0-based索引
-        result = chr(65 + (column_num % 26)) + result  # 65是'A'的ASCII码
-        column_num //= 26
-    return result
+    return get_backend(service).check_credentials()
 
 
-def show_excel_preview(sheet, max_cols=5):
+def use_mock_server(base_url):
     """
-    显示Excel文件的前几列和行的预览，帮助用户了解文件结构
+    把有道翻译和DeepL的接口地址都指向本地模拟翻译服务（mock_server.py），用于离线压测
+    
+    未配置的API密钥使用占位值；模拟译文不能混入真实的翻译缓存，因此同时禁用缓存。
     
     参数：
-        sheet: Excel工作表对象
-        max_cols: 最多显示多少列（默认5列）
+        base_url: 模拟服务的地址（如 http://127.0.0.1:8800）
     """
-    max_row = min(sheet.max_row, 5)  # 最多显示5行
-    max_col = min(sheet.max_column, max_cols)  # 最多显示指定列数
-    
-    print("\n📊 Excel文件预览（前5行）：")
-    print("-" * 60)
+    global YOUDAO_API_URL, YOUDAO_BATCH_API_URL, DEEPL_API_URL
+    global YOUDAO_APP_KEY, YOUDAO_APP_SECRET, DEEPL_API_KEY, CACHE_ENABLED
+    base_url = base_url.rstrip('/')
+    YOUDAO_API_URL = base_url + '/api'
+    YOUDAO_BATCH_API_URL = base_url + '/v2/api'
+    DEEPL_API_URL = base_url + '/v2/translate'
+    YOUDAO_APP_KEY = YOUDAO_APP_KEY or 'mock'
+    YOUDAO_APP_SECRET = YOUDAO_APP_SECRET or 'mock'
+    DEEPL_API_KEY = DEEPL_API_KEY or 'mock'
+    CACHE_ENABLED = False
+    print(f"✓ 使用模拟翻译服务：{base_url}（不使用翻译缓存）")
+
+
+def set_translate_delay(service, delay):
+    """
+    设置翻译延时（每个请求之间的最小间隔），换算为共享频率限制器的每秒请求数
     
-    # 显示列标题
-    header = "行号"
-    for col in range(1, max_col + 1):
-        col_letter = number_to_column_letter(col)
-        header += f" | {col_letter}列"
-    print(header)
-    print("-" * 60)
+    参数：
+        service: 翻译服务（'youdao' 或 'deepl'）
+        delay: 延时秒数（0表示不限制请求数）
+    """
+    configure_rate_limit(
+        service,
+        requests_per_second=1.0 / delay if delay > 0 else None,
+        chars_per_second=get_backend(service).rate_limits.get('chars_per_second'),
+    )
+
+
+def print_resume_hint(excel_file):
+    """
+    翻译中断时，如果存在进度记录，提示使用 --resume 继续
     
-    # 显示每行数据
-    for row in range(1, max_row + 1):
-        row_data = f"{row:3d}"
-        for col in range(1, max_col + 1):
-            cell_value = sheet.cell(row=row, column=col).value
-            if cell_value is None:
-                cell_str = "(空)"
-            else:
-                cell_str = str(cell_value)[:15]  # 只显示前15个字符
-                if len(str(cell_value)) > 15:
-                    cell_str += "..."
-            row_data += f" | {cell_str:18s}"
-        print(row_data)
-    print("-" * 60)
-    print(f"总行数：{sheet.max_row}，总列数：{sheet.max_column}")
-    print()
+    参数：
+        excel_file: Excel文件路径
+    """
+    journal_file = get_journal_file(excel_file)
+    if os.path.exists(journal_file):
+        print(f"已完成的译文保存在进度记录 {journal_file} 中，使用 --resume 可从中断处继续")
 
 
-def get_user_column_input(sheet, prompt_text, default_value=None):
+def run_translation_jobs(excel_file, jobs, service, start_row=1, streaming=False, output_file=None,
+                         resume=False, incremental=False, workbook=None, show_progress=True):
     """
-    获取用户输入的列号，并验证有效性
+    执行同一个工作簿的所有翻译任务：工作簿只加载一次，全部任务完成后只保存一次
     
     参数：
-        sheet: Excel工作表对象
-        prompt_text: 提示信息
-        default_value: 默认值（如果用户直接回车，使用此值）
+        excel_file: Excel文件路径
+        jobs: 翻译任务列表（TranslationJob）
+        service: 翻译服务（'youdao' 或 'deepl'）
+        start_row: 开始翻译的行号
+        streaming: 是否使用流式模式（结果写入新文件）
+        output_file: 流式模式的输出文件路径
+        resume: 是否读取上次中断时的进度记录继续
+        incremental: 是否使用增量模式
+        workbook: 已加载的工作簿（为None时自动加载；流式模式下不使用）
+        show_progress: 是否显示单行进度（批量模式的工作进程不显示；quiet模式下也不显示）
     
     返回：
-        有效的列号（数字）
+        统计字典
     """
-    max_col = sheet.max_column
+    if streaming:
+        # 只读打开一次，检查工作表名称；文件记录了尺寸信息时顺便得到总行数
+        preview_workbook = openpyxl.load_workbook(excel_file, read_only=True)
+        jobs = resolve_jobs(jobs, preview_workbook.sheetnames, preview_workbook.active.title)
+        max_rows = [preview_workbook[job.sheet].max_row for job in jobs]
+        preview_workbook.close()
+    else:
+        if workbook is None:
+            log_info(f"正在打开Excel文件：{excel_file}")
+            with get_metrics().stage('load'):
+                workbook = openpyxl.load_workbook(excel_file)
+        jobs = resolve_jobs(jobs, workbook.sheetnames, workbook.active.title)
+        max_rows = [workbook[job.sheet].max_row for job in jobs]
     
-    while True:
-        if default_value is not None:
-            user_input = input(f"{prompt_text}（直接回车使用默认值：{number_to_column_letter(default_value)}列）: ").strip()
-            if user_input == "":
-                return default_value
-        else:
-            user_input = input(f"{prompt_text}（输入列号，如A、B或1、2）: ").strip()
-        
-        # 转换为列号数字
-        col_num = column_letter_to_number(user_input)
-        
-        if col_num is None:
-            print("❌ 输入格式错误！请输入列号（如 A、B 或 1、2）")
-            continue
+    stats = new_run_stats()
+    total_rows = None if None in max_rows else sum(max(0, max_row - start_row + 1) for max_row in max_rows)
+    progress = set_progress(ProgressReporter(total_rows, interval=PROGRESS_INTERVAL, log_interval=PROGRESS_LOG_INTERVAL,
+                                             enabled=show_progress and LOG_LEVEL != 'quiet'))
+    
+    # 打开进度记录：每得到一条译文立即追加，程序中断后可使用 --resume 继续
+    journal = ProgressJournal(get_journal_file(excel_file), {
+        'jobs': [list(job) for job in jobs],
+        'streaming': streaming,
+    }, resume=resume)
+    
+    try:
+        # 增量模式：读取上次运行记录的原文哈希和译文
+        states = [None] * len(jobs)
+        if incremental:
+            states = [IncrementalState(get_state_file(excel_file), job.sheet, job.source_column, job.target_column)
+                      for job in jobs]
+            log_info(f"✓ 增量模式：已读取 {sum(len(state.translations) for state in states)} 条翻译记录，只翻译新增或修改过的行")
         
-        if col_num < 1 or col_num > max_col:
-            print(f"❌ 列号超出范围！请输入 1 到 {max_col} 之间的列号（或 A 到 {number_to_column_letter(max_col)}）")
-            continue
+        if streaming:
+            output_file = output_file or get_streaming_output_file(excel_file)
+            log_info(f"\n开始流式处理（每块 {STREAMING_CHUNK_ROWS} 行，共 {len(jobs)} 个任务），结果将写入：{output_file}")
+            log_info("=" * 60)
+            translate_workbook_streaming(excel_file, output_file, jobs, start_row, service, stats,
+                                         journal=journal, states=states)
+            progress.finish()
+            log_info("=" * 60)
+            print(f"✓ 文件已保存：{output_file}（原文件未修改）")
+        else:
+            checkpoint = WorkbookCheckpoint(workbook, excel_file, journal)
+            for group in group_jobs(jobs):
+                # 源列相同的任务（翻译成多种语言）一起执行，源列只读取和检测一次
+                sheet = workbook[group[0][1].sheet]
+                numbers = '、'.join(str(job_index + 1) for job_index, _ in group)
+                log_info(f"\n▶ 任务 {numbers}/{len(jobs)}：{describe_job_group(group)}，"
+                         f"共 {sheet.max_row - start_row + 1} 行数据")
+                log_info("=" * 60)
+                translate_sheet_in_place(sheet, group, start_row, service, stats,
+                                         journal=journal, checkpoint=checkpoint, states=states)
+            
+            # 所有任务完成后统一保存一次
+            progress.finish()
+            log_info("=" * 60)
+            log_info("正在保存文件...")
+            with get_metrics().stage('save'):
+                workbook.save(excel_file)
+            print(f"✓ 文件已保存：{excel_file}")
         
-        return col_num
+        # 全部完成并保存后，进度记录不再需要
+        for state in states:
+            if state is not None:
+                state.save()
+        journal.remove()
+    finally:
+        # 中断或出错时也结束进度行，之后的提示信息单独成行
+        progress.finish()
+        journal.close()
+    
+    print_run_stats(stats, service)
+    return stats
 
 
-def translate_excel():
+def translate_excel(streaming=False, output_file=None, resume=False, incremental=False):
     """
     主函数：处理Excel文件，让用户选择翻译服务、源列和目标列，自动识别语言后互译
     中文会自动翻译成英文，英文会自动翻译成中文
+    
+    参数：
+        streaming: 是否使用流式模式（只读读取、只写输出到新文件，适合超大工作簿）
+        output_file: 流式模式的输出文件路径（默认在原文件名后加"_translated"）
+        resume: 是否读取上次中断时的进度记录，跳过已完成的行继续翻译
+        incremental: 是否使用增量模式（只翻译新增或原文修改过的行，跳过人工填写的译文）
     """
     try:
         # 让用户选择翻译服务
@@ -537,32 +4086,25 @@ def translate_excel():
         if service_choice == '2':
             selected_service = 'deepl'
             service_name = 'DeepL'
-            # 检查DeepL API密钥是否已配置
-            if DEEPL_API_KEY == '你的DeepL_API_Key' or not DEEPL_API_KEY:
-                print("❌ 错误：未配置DeepL API密钥！")
-                print("请打开 translate_excel.py 文件，修改 DEEPL_API_KEY 配置")
-                print("\n获取DeepL API密钥的方法：")
-                print("  1. 访问 https://www.deepl.com/zh/pro-api")
-                print("  2. 注册并登录账号")
-                print("  3. 在账户中获取API密钥")
-                return
         else:
             selected_service = 'youdao'
             service_name = '有道翻译'
-            # 检查有道API密钥是否已配置
-            if YOUDAO_APP_KEY == '你的AppKey' or YOUDAO_APP_SECRET == '你的AppSecret':
-                print("❌ 错误：未配置有道翻译API密钥！")
-                print("请打开 translate_excel.py 文件，修改 YOUDAO_APP_KEY 和 YOUDAO_APP_SECRET 配置")
-                return
+        
+        # 检查所选翻译服务的API密钥是否已配置
+        if not check_api_key(selected_service):
+            return
         
         print(f"✓ 已选择翻译服务：{service_name}\n")
         
         # 打开Excel文件
         print(f"正在打开Excel文件：{EXCEL_FILE}")
-        workbook = openpyxl.load_workbook(EXCEL_FILE)
+        workbook = openpyxl.load_workbook(EXCEL_FILE, read_only=streaming)
         
         # 获取第一个工作表（sheet）
         sheet = workbook.active
+        if streaming:
+            # 只读模式下部分文件没有记录尺寸信息，需要扫描一遍才能得到行数和列数
+            sheet.calculate_dimension(force=True)
         
         # 显示Excel文件预览，帮助用户了解文件结构
         show_excel_preview(sheet, max_cols=min(10, sheet.max_column))
@@ -603,121 +4145,622 @@ def translate_excel():
         else:
             print("✓ 将从第一行开始翻译")
         
-        # 询问是否调整翻译延时（用于避免频率限制）
-        # 使用局部变量存储延时时间，避免修改全局变量
-        current_delay = TRANSLATE_DELAY  # 使用全局变量作为默认值
-        print(f"\n当前翻译延时设置为：{current_delay} 秒/次（固定1秒）")
-        delay_input = input(f"是否调整延时时间？（直接回车使用默认值 {current_delay} 秒）: ").strip()
+        # 询问是否调整翻译延时（每个请求之间的最小间隔，用于避免频率限制）
+        # 延时换算为共享频率限制器的每秒请求数，所有并发请求共同遵守
+        requests_per_second = get_backend(selected_service).rate_limits.get('requests_per_second')
+        current_delay = 1.0 / requests_per_second if requests_per_second else 0.0
+        print(f"\n当前翻译延时设置为：{current_delay:g} 秒/次（并发请求数：{CONCURRENCY}）")
+        delay_input = input(f"是否调整延时时间？（直接回车使用默认值 {current_delay:g} 秒）: ").strip()
         
         if delay_input:
             try:
                 custom_delay = float(delay_input)
                 if custom_delay >= 0:
                     current_delay = custom_delay  # 使用局部变量
-                    print(f"✓ 已设置延时时间为：{current_delay} 秒")
+                    print(f"✓ 已设置延时时间为：{current_delay:g} 秒")
+                    set_translate_delay(selected_service, current_delay)
                 else:
-                    print(f"⚠ 延时时间不能为负数，使用默认值：{current_delay} 秒")
+                    print(f"⚠ 延时时间不能为负数，使用默认值：{current_delay:g} 秒")
             except ValueError:
-                print(f"⚠ 输入格式错误，使用默认值：{current_delay} 秒")
+                print(f"⚠ 输入格式错误，使用默认值：{current_delay:g} 秒")
         else:
-            print(f"✓ 使用默认延时时间：{current_delay} 秒")
-        
-        # 获取工作表中使用的最大行数
-        max_row = sheet.max_row
-        print(f"\n开始处理 {max_row - start_row + 1} 行数据...")
-        print("=" * 60)
+            print(f"✓ 使用默认延时时间：{current_delay:g} 秒")
         
-        # 遍历每一行
-        success_count = 0  # 成功翻译的行数
-        fail_count = 0  # 翻译失败的行数
-        skip_count = 0  # 跳过的空行数
+        if streaming:
+            # 只读打开的工作簿仅用于预览，翻译时重新逐行读取
+            workbook.close()
+            workbook = None
         
-        for row_num in range(start_row, max_row + 1):
-            # 获取源列的单元格值
-            cell_value = sheet.cell(row=row_num, column=source_column).value
-            
-            # 检查单元格是否有内容
-            if cell_value is None or str(cell_value).strip() == '':
-                print(f"第 {row_num} 行 {source_col_letter}列为空，跳过")
-                skip_count += 1
-                continue
-            
-            # 将单元格值转换为字符串
-            source_text = str(cell_value).strip()
-            
-            # 检查文本长度，如果过长则提前提示并跳过
-            text_length = len(source_text)
-            if text_length > 2000:
-                print(f"第 {row_num} 行 ❌ 文本过长错误：文本长度 {text_length} 字符，超过2000字符限制")
-                print(f"  跳过此行的翻译，建议手动缩短文本或分段处理")
-                sheet.cell(row=row_num, column=target_column).value = f"文本过长错误（{text_length}字符，超过2000字符限制）"
-                skip_count += 1
-                continue
-            
-            # 自动检测文本语言（中文还是英文）
-            detected_lang = detect_language(source_text)
-            
-            # 根据检测到的语言确定翻译方向（使用统一的语言代码格式）
-            if detected_lang == 'zh':
-                # 如果是中文，翻译成英文
-                from_lang_code = 'zh'
-                to_lang_code = 'en'
-                lang_info = "中文 → 英文"
-            elif detected_lang == 'en':
-                # 如果是英文，翻译成中文
-                from_lang_code = 'en'
-                to_lang_code = 'zh'
-                lang_info = "英文 → 中文"
-            else:
-                # 如果无法判断语言，默认按中文处理
-                from_lang_code = 'zh'
-                to_lang_code = 'en'
-                lang_info = "未知语言，默认：中文 → 英文"
-                print(f"  ⚠ 无法判断第 {row_num} 行的语言类型，将按中文处理")
-            
-            # 显示当前处理的行和翻译方向，同时显示文本长度
-            text_length = len(source_text)
-            text_preview = source_text[:30] + "..." if len(source_text) > 30 else source_text
-            print(f"正在翻译第 {row_num} 行 [{lang_info}]（文本长度：{text_length}字符）：{text_preview}")
-            
-            # 调用统一的翻译函数，传入检测到的语言方向和选择的翻译服务
-            translated_text = translate_text(source_text, from_lang_code, to_lang_code, selected_service)
-            
-            if translated_text:
-                # 如果翻译成功，将结果写入目标列
-                sheet.cell(row=row_num, column=target_column).value = translated_text
-                print(f"  ✓ 翻译成功：{translated_text}")
-                success_count += 1
-            else:
-                # 如果翻译失败，在目标列写入提示信息（或者留空）
-                sheet.cell(row=row_num, column=target_column).value = "翻译失败"
-                print(f"  ✗ 翻译失败")
-                fail_count += 1
-                # 翻译失败后，等待1秒再继续下一行
-                if row_num < max_row:
-                    print(f"  ⏸ 翻译失败，等待 1 秒后继续下一行...")
-                    time.sleep(1.0)  # 失败后等待1秒
-            
-            # 添加延时，避免API调用过于频繁（有道API有频率限制）
-            # 使用用户设置的延时时间（current_delay）
-            if row_num < max_row:  # 最后一行不需要延时
-                time.sleep(current_delay)
-        
-        # 保存修改后的Excel文件
-        print("\n" + "=" * 60)
-        print(f"正在保存文件...")
-        workbook.save(EXCEL_FILE)
-        print(f"✓ 文件已保存！")
-        print(f"\n📊 统计信息：")
-        print(f"  成功翻译：{success_count} 行")
-        print(f"  翻译失败：{fail_count} 行")
-        print(f"  跳过空行：{skip_count} 行")
-        print(f"  总计处理：{success_count + fail_count + skip_count} 行")
+        stats = run_translation_jobs(EXCEL_FILE, [TranslationJob(sheet.title, source_column, target_column)],
+                                     selected_service, start_row, streaming=streaming, output_file=output_file,
+                                     resume=resume, incremental=incremental, workbook=workbook)
+        export_metrics(stats)
         
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断翻译")
+        print_resume_hint(EXCEL_FILE)
     except FileNotFoundError:
         print(f"❌ 错误：找不到文件 '{EXCEL_FILE}'，请检查文件路径是否正确")
     except Exception as e:
         print(f"❌ 处理Excel文件时出现错误：{str(e)}")
+        print_resume_hint(EXCEL_FILE)
+    finally:
+        close_translation_cache()
+        close_http_sessions()
+
+
+def translate_excel_jobs(excel_file, jobs, service='youdao', start_row=1, delay=None, streaming=False,
+                         output_file=None, resume=False, incremental=False):
+    """
+    非交互方式执行翻译任务（由命令行参数或配置文件提供），适合定时任务和脚本调用
+    
+    参数：
+        excel_file: Excel文件路径
+        jobs: 翻译任务列表（TranslationJob）
+        service: 翻译服务（'youdao' 或 'deepl'）
+        start_row: 开始翻译的行号（跳过标题行时为2）
+        delay: 翻译延时秒数（None表示使用 RATE_LIMITS 中的默认值）
+        streaming: 是否使用流式模式
+        output_file: 流式模式的输出文件路径
+        resume: 是否读取上次中断时的进度记录继续
+        incremental: 是否使用增量模式
+    
+    返回：
+        True表示全部任务执行完成
+    """
+    if service not in TRANSLATION_BACKENDS:
+        print(f"❌ 错误：不支持的翻译服务：{service}（可选：{'、'.join(TRANSLATION_BACKENDS)}）")
+        return False
+    if not check_api_key(service) or not check_job_languages(jobs, service):
+        return False
+    
+    stats = None
+    try:
+        if delay is not None:
+            set_translate_delay(service, delay)
+        print(f"✓ 翻译服务：{service}，文件：{excel_file}，共 {len(jobs)} 个任务")
+        stats = run_translation_jobs(excel_file, jobs, service, start_row, streaming=streaming,
+                                     output_file=output_file, resume=resume, incremental=incremental)
+        return True
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断翻译")
+        print_resume_hint(excel_file)
+    except FileNotFoundError:
+        print(f"❌ 错误：找不到文件 '{excel_file}'，请检查文件路径是否正确")
+    except Exception as e:
+        print(f"❌ 处理Excel文件时出现错误：{str(e)}")
+        print_resume_hint(excel_file)
+    finally:
+        # 中断或出错时也写入已收集的指标，便于定时任务排查
+        export_metrics(stats)
+        close_translation_cache()
+        close_http_sessions()
+    return False
+
+
+# 批量模式工作进程需要从主进程继承的设置（命令行参数会修改这些全局变量）
+BATCH_WORKER_SETTINGS = ['CONCURRENCY', 'HTTP_CONNECT_TIMEOUT', 'HTTP_READ_TIMEOUT', 'CACHE_ENABLED', 'CACHE_FILE',
+                         'RATE_LIMITS', 'STREAMING_CHUNK_ROWS', 'YOUDAO_API_URL', 'YOUDAO_BATCH_API_URL', 'DEEPL_API_URL',
+                         'YOUDAO_APP_KEY', 'YOUDAO_APP_SECRET', 'DEEPL_API_KEY', 'LOG_LEVEL', 'YOUDAO_CREDENTIALS',
+                         'DEEPL_CREDENTIALS', 'FAILOVER_SERVICES', 'KEY_THROTTLE_THRESHOLD', 'KEY_COOLDOWN_SECONDS',
+                         'KEY_FAILOVER_RETRIES', 'TRANSLATION_MEMORY', 'MEMORY_CANDIDATES', 'PIPELINE_QUEUE_SIZE']
+
+
+def find_workbooks(pattern):
+    """
+    查找批量模式要处理的工作簿
+    
+    参数：
+        pattern: 目录（处理其中所有.xlsx文件）或通配符（如'供应商/**/*.xlsx'）
+    
+    返回：
+        排序后的文件路径列表（不包括Excel的临时文件"~$*.xlsx"和流式模式的输出文件"*_translated.xlsx"）
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.xlsx')
+    files = []
+    for path in glob.glob(pattern, recursive=True):
+        name = os.path.basename(path)
+        if not os.path.isfile(path) or name.startswith('~$'):
+            continue
+        if os.path.splitext(name)[0].endswith('_translated'):
+            continue
+        files.append(path)
+    return sorted(files)
+
+
+def init_batch_worker(settings, shared_buckets):
+    """
+    批量模式工作进程的初始化函数：继承主进程的设置，并使用多进程共享的令牌桶创建频率限制器
+    
+    参数：
+        settings: 全局设置（变量名 -> 值）
+        shared_buckets: (翻译服务, 账号序号) -> (请求数令牌桶, 字符数令牌桶)
+    """
+    globals().update(settings)
+    reset_credential_pools()
+    for (service, key_index), (requests_bucket, chars_bucket) in shared_buckets.items():
+        limits = get_backend(service).rate_limits
+        _rate_limiters[(service, key_index)] = RateLimiter(
+            limits.get('requests_per_second'), limits.get('chars_per_second'),
+            requests_bucket=requests_bucket, chars_bucket=chars_bucket, service=service)
+
+
+def translate_file_in_worker(excel_file, jobs, service, start_row, streaming, resume, incremental):
+    """
+    批量模式的工作进程：翻译一个文件，详细输出只在失败时返回
+    
+    参数：
+        excel_file: Excel文件路径
+        jobs: 翻译任务列表
+        service: 翻译服务
+        start_row: 开始翻译的行号
+        streaming: 是否使用流式模式
+        resume: 是否读取进度记录继续
+        incremental: 是否使用增量模式
+    
+    返回：
+        文件结果摘要字典：file、ok、stats、error、log、elapsed、metrics、failures
+    """
+    started = time.monotonic()
+    summary = {'file': excel_file, 'ok': False, 'stats': None, 'error': None, 'log': ''}
+    output = io.StringIO()
+    get_metrics().reset()  # 每个文件单独收集，由主进程合并
+    set_progress(ProgressReporter(enabled=False))
+    try:
+        with contextlib.redirect_stdout(output):
+            summary['stats'] = run_translation_jobs(excel_file, jobs, service, start_row, streaming=streaming,
+                                                    resume=resume, incremental=incremental, show_progress=False)
+        summary['ok'] = True
+    except Exception as e:
+        summary['error'] = str(e) or type(e).__name__
+        summary['log'] = '\n'.join(output.getvalue().splitlines()[-20:])  # 只保留最后20行，便于排查
+    summary['elapsed'] = time.monotonic() - started
+    summary['metrics'] = get_metrics().to_dict()
+    summary['failures'] = get_progress().failures
+    return summary
+
+
+def print_batch_summary(summaries, elapsed):
+    """
+    打印批量模式的汇总信息
+    
+    参数：
+        summaries: 各文件的结果摘要列表
+        elapsed: 总用时（秒）
+    """
+    totals = sum_run_stats(summary['stats'] for summary in summaries if summary['ok'])
+    failed_files = [summary for summary in summaries if not summary['ok']]
+    
+    print("\n📊 批量处理汇总：")
+    print(f"  文件：成功 {len(summaries) - len(failed_files)} 个，失败 {len(failed_files)} 个，共 {len(summaries)} 个")
+    print(f"  成功翻译：{totals['success']} 行，翻译失败：{totals['fail']} 行，跳过：{totals['skip']} 行")
+    print(f"  不重复文本：{totals['unique']} 条，重复文本节省：{totals['duplicates']} 次翻译")
+    if totals['memory_hits']:
+        print(f"  翻译记忆：{totals['memory_hits']} 条文本套用了相似文本的译文")
+    rows = totals['success'] + totals['fail']
+    print(f"  总用时：{elapsed:.1f} 秒" + (f"（{rows / elapsed:.1f} 行/秒）" if elapsed > 0 else ""))
+    print_stage_times()
+    get_progress().print_failures(FAILURE_SUMMARY_LIMIT)
+    for summary in failed_files:
+        print(f"  ✗ {summary['file']}：{summary['error']}")
+
+
+def sum_run_stats(stats_list):
+    """
+    合计多个统计字典
+    
+    参数：
+        stats_list: 统计字典的可迭代对象
+    
+    返回：
+        合计后的统计字典
+    """
+    totals = new_run_stats()
+    for stats in stats_list:
+        for key, value in stats.items():
+            totals[key] += value
+    return totals
+
+
+def translate_excel_batch(pattern, jobs, service='youdao', start_row=1, delay=None, streaming=False,
+                          resume=False, incremental=False, workers=None):
+    """
+    批量模式：用进程池并行处理一个目录（或通配符）下的所有工作簿
+    
+    openpyxl解析和保存文件在各个进程中并行进行；所有进程共享同一组令牌桶（不会超过翻译服务的频率限制）
+    和同一个翻译缓存文件。每个文件完成后显示一行结果，最后显示汇总。
+    
+    参数：
+        pattern: 目录或通配符
+        jobs: 对每个文件执行的翻译任务列表
+        service: 翻译服务（'youdao' 或 'deepl'）
+        start_row: 开始翻译的行号
+        delay: 翻译延时秒数（None表示使用 RATE_LIMITS 中的默认值）
+        streaming: 是否使用流式模式（每个文件输出到各自的"_translated"文件）
+        resume: 是否读取各文件的进度记录继续
+        incremental: 是否使用增量模式
+        workers: 工作进程数（默认使用 BATCH_WORKERS，再默认为CPU核数）
+    
+    返回：
+        True表示所有文件都处理完成
+    """
+    if service not in TRANSLATION_BACKENDS:
+        print(f"❌ 错误：不支持的翻译服务：{service}（可选：{'、'.join(TRANSLATION_BACKENDS)}）")
+        return False
+    if not check_api_key(service) or not check_job_languages(jobs, service):
+        return False
+    
+    files = find_workbooks(pattern)
+    if not files:
+        print(f"❌ 没有找到要处理的工作簿：{pattern}")
+        return False
+    
+    if delay is not None:
+        set_translate_delay(service, delay)
+    workers = max(1, min(workers or BATCH_WORKERS or os.cpu_count() or 1, len(files)))
+    # 每个服务的每个账号各有一对共享令牌桶：所有工作进程合计不超过每个账号的频率限制
+    shared_buckets = {}
+    for routed_service in get_router(service).services:
+        backend = get_backend(routed_service)
+        limits = backend.rate_limits
+        for key_index in range(max(1, len(backend.credentials()))):
+            shared_buckets[(routed_service, key_index)] = (SharedTokenBucket(limits.get('requests_per_second')),
+                                                           SharedTokenBucket(limits.get('chars_per_second')))
+    settings = {name: globals()[name] for name in BATCH_WORKER_SETTINGS}
+    
+    print(f"✓ 批量模式：共 {len(files)} 个文件，{workers} 个工作进程，翻译服务：{service}，每个文件 {len(jobs)} 个任务")
+    print("=" * 60)
+    
+    started = time.monotonic()
+    summaries = []
+    reporter = set_progress(ProgressReporter(enabled=False))  # 只用于汇总各文件的失败原因
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker,
+                                   initargs=(settings, shared_buckets))
+    try:
+        futures = [
+            executor.submit(translate_file_in_worker, excel_file, jobs, service, start_row, streaming, resume,
+                            incremental)
+            for excel_file in files
+        ]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            get_metrics().merge(summary['metrics'])
+            reporter.merge_failures(summary['failures'], source=os.path.basename(summary['file']))
+            progress = f"[{len(summaries)}/{len(files)}]"
+            if summary['ok']:
+                stats = summary['stats']
+                print(f"✓ {progress} {summary['file']}：成功 {stats['success']} 行，失败 {stats['fail']} 行，"
+                      f"跳过 {stats['skip']} 行，用时 {summary['elapsed']:.1f} 秒")
+            else:
+                print(f"✗ {progress} {summary['file']}：{summary['error']}")
+                if summary['log']:
+                    print('    ' + summary['log'].replace('\n', '\n    '))
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断批量处理，已完成的译文保存在各文件的进度记录中，使用 --resume 可继续")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return False
+    finally:
+        executor.shutdown()
+    
+    print_batch_summary(summaries, time.monotonic() - started)
+    export_metrics(sum_run_stats(summary['stats'] for summary in summaries if summary['ok']))
+    return all(summary['ok'] for summary in summaries)
+
+
+class DryRunEstimator:
+    """
+    预估模式（--dry-run）：按与正式翻译相同的步骤（占位符替换、去重、语言检测、长文本拆分、查询缓存和翻译记忆、分批）
+    统计源列的文本，但不调用翻译API；据此估算请求数、计费字符数和耗时
+    
+    文本逐块交给 add_texts，只保存文本的哈希值，内存占用与不重复文本数有关，与总行数无关
+    """
+    
+    def __init__(self, service):
+        """
+        参数：
+            service: 翻译服务
+        """
+        self.service = service
+        self.backend = get_backend(service)
+        self.cache = get_translation_cache()
+        self.cells = 0  # 非空单元格数
+        self.empty_cells = 0  # 空单元格数
+        self.chars = 0  # 非空单元格的总字符数
+        self.target_chars = 0  # 非空单元格的字符数之和 × 目标语言数（不去重、不使用缓存时要发送的字符数）
+        self.over_limit = 0  # 超过 MAX_TEXT_LENGTH 的单元格数
+        self.languages = {}  # 语言 -> 单元格数
+        self.unique_texts = 0  # 不重复的文本数（需要翻译的）
+        self.unique_chars = 0  # 不重复文本的字符数（替换占位符后）
+        self.segments = 0  # 不重复的段数（长文本拆分后）
+        self.cache_hits = 0  # 翻译缓存中已有的段数
+        self.memory_hits = 0  # 可以套用相似文本译文的段数
+        self.texts_to_translate = 0  # 需要调用API翻译的段数
+        self.billed_chars = 0  # 需要调用API翻译的字符数
+        self.requests = 0  # 预计的API请求数
+        self._languages_by_text = {}  # 规范化文本的哈希 -> 语言
+        self._seen_texts = set()  # (各目标的翻译方向, 规范化文本) 的哈希
+        self._seen_segments = set()  # (翻译方向, 规范化文本) 的哈希
+        self._memory_keys = set()  # (翻译方向, 记忆键) 的哈希
+        self._batches = {}  # 翻译方向 -> [当前批次的文本数, 当前批次的大小]（模拟分批）
+    
+    def add_texts(self, texts, directions=None):
+        """
+        统计一块非空单元格的文本
+        
+        参数：
+            texts: 原文列表（已去除首尾空白）
+            directions: 各目标的翻译方向列表（parse_direction 的结果，同一源列翻译成多种语言时有多项）；
+                        为None时只有一个目标，按检测结果中英互译
+        """
+        directions = directions or [None]
+        masked = [mask_tokens(text) if MASK_UNTRANSLATABLE else (text, []) for text in texts]
+        keys = [hash(normalize_text(masked_text)) for masked_text, _ in masked]
+        
+        # 只对首次出现的文本检测语言
+        first_seen = {}  # 规范化文本的哈希 -> 替换占位符后的文本
+        for key, (masked_text, _) in zip(keys, masked):
+            if key not in self._languages_by_text and key not in first_seen:
+                first_seen[key] = masked_text
+        for key, detected_lang in zip(first_seen, detect_languages(list(first_seen.values()))):
+            self._languages_by_text[key] = detected_lang
+        
+        pending = {}  # 翻译方向 -> [段落文本, ...]（本块中首次出现的段）
+        for text, key, (masked_text, tokens) in zip(texts, keys, masked):
+            detected_lang = self._languages_by_text[key]
+            self.cells += 1
+            self.chars += len(text)
+            self.target_chars += len(text) * len(directions)
+            self.languages[detected_lang] = self.languages.get(detected_lang, 0) + 1
+            if len(text) > MAX_TEXT_LENGTH:
+                self.over_limit += 1
+                if not SEGMENT_LONG_TEXT:
+                    continue  # 不拆分时跳过
+            text_key = hash((tuple(directions), key))
+            if detected_lang == LANG_NONE or text_key in self._seen_texts:
+                continue  # 无需翻译，或重复文本
+            self._seen_texts.add(text_key)
+            self.unique_texts += 1
+            self.unique_chars += len(masked_text)
+            segments = split_into_segments(masked_text) if len(masked_text) > MAX_TEXT_LENGTH else [(masked_text, '')]
+            segments = [renumber_placeholders(segment, tokens)[0] for segment, _ in segments]
+            for direction in directions:
+                text_direction = choose_direction(detected_lang, direction)
+                if text_direction[0] == text_direction[1]:
+                    continue  # 原文已是目标语言
+                for segment in segments:
+                    segment_key = hash((text_direction, normalize_text(segment)))
+                    if segment_key not in self._seen_segments:
+                        self._seen_segments.add(segment_key)
+                        pending.setdefault(text_direction, []).append(segment)
+        
+        for text_direction, segments in pending.items():
+            self.segments += len(segments)
+            if self.cache is not None:
+                cached = self.cache.find_cached(self.service, *text_direction, segments)
+                segments = [segment for segment in segments if segment not in cached]
+                self.cache_hits += len(cached)
+                if memory_enabled() and segments:
+                    similar = self.cache.find_similar(self.service, *text_direction, segments)
+                    segments = [segment for segment in segments if segment not in similar]
+                    self.memory_hits += len(similar)
+            for segment in segments:
+                if memory_enabled():
+                    memory_hash = hash((text_direction, memory_key(segment)[0]))
+                    if memory_hash in self._memory_keys:
+                        self.memory_hits += 1
+                        continue
+                    self._memory_keys.add(memory_hash)
+                self._add_to_batch(text_direction, segment)
+    
+    def _add_to_batch(self, text_direction, segment):
+        """按与 split_into_batches 相同的规则模拟分批，累计请求数"""
+        max_count, max_size, measure = get_batch_limits(self.service)
+        batch = self._batches.setdefault(text_direction, [0, 0])
+        size = measure(segment)
+        if batch[0] and (batch[0] >= max_count or batch[1] + size > max_size):
+            self.requests += 1
+            batch[:] = [0, 0]
+        batch[0] += 1
+        batch[1] += size
+        self.texts_to_translate += 1
+        self.billed_chars += len(segment)
+    
+    def total_requests(self):
+        """预计的API请求数（包括未满的最后一批）"""
+        return self.requests + sum(1 for count, _ in self._batches.values() if count)
+    
+    def estimate_seconds(self):
+        """
+        按频率限制、并发请求数和 DRY_RUN_REQUEST_SECONDS 估算调用API的耗时（不考虑频率限制错误和重试）
+        
+        返回：
+            (秒数, 限制耗时的因素)
+        """
+        requests_count = self.total_requests()
+        limits = self.backend.rate_limits
+        keys = max(1, len(self.backend.credentials()))  # 每个账号单独限速
+        candidates = {f"并发请求数（{CONCURRENCY}）": requests_count * DRY_RUN_REQUEST_SECONDS / max(1, CONCURRENCY)}
+        if limits.get('requests_per_second'):
+            rate = limits['requests_per_second'] * keys
+            candidates[f"每秒请求数限制（{rate:g} 次/秒）"] = requests_count / rate
+        if limits.get('chars_per_second'):
+            rate = limits['chars_per_second'] * keys
+            candidates[f"每秒字符数限制（{rate:g} 字符/秒）"] = self.billed_chars / rate
+        bottleneck = max(candidates, key=candidates.get)
+        return candidates[bottleneck], bottleneck
+    
+    def print_report(self, scan_seconds):
+        """
+        打印预估结果
+        
+        参数：
+            scan_seconds: 扫描工作簿的耗时（秒）
+        """
+        print(f"\n📋 预估结果（{self.backend.display_name}，未调用翻译API）：")
+        print(f"  非空单元格：{self.cells} 个，共 {self.chars} 字符（空单元格 {self.empty_cells} 个）")
+        if self.cells:
+            mix = '，'.join(f"{LANGUAGE_NAMES.get(lang, '无需翻译' if lang == LANG_NONE else '无法判断')} {count}"
+                           f"（{count / self.cells * 100:.1f}%）"
+                           for lang, count in sorted(self.languages.items(), key=lambda item: -item[1]))
+            print(f"  语言分布：{mix}")
+        if self.over_limit:
+            action = "将按句子拆分后翻译" if SEGMENT_LONG_TEXT else "将跳过"
+            print(f"  超过长度限制（{MAX_TEXT_LENGTH}字符）：{self.over_limit} 个单元格，{action}")
+        print(f"  不重复文本：{self.unique_texts} 条，{self.unique_chars} 字符（拆分后 {self.segments} 段）")
+        cache_info = f"翻译缓存已有 {self.cache_hits} 段" if self.cache is not None else "不使用翻译缓存"
+        print(f"  {cache_info}，可套用相似文本译文 {self.memory_hits} 段，需要翻译 {self.texts_to_translate} 段")
+        if self.target_chars:
+            # 节省比例按字符计算（长文本拆分后一个单元格对应多段，按段数计算没有意义）
+            saved = max(0.0, 1 - self.billed_chars / self.target_chars)
+            print(f"  去重、占位符、缓存和翻译记忆节省：{saved * 100:.1f}% 的字符不需要发送给翻译服务")
+        seconds, bottleneck = self.estimate_seconds()
+        print(f"  预计API请求：{self.total_requests()} 次，计费字符：{self.billed_chars} 字符")
+        print(f"  预计翻译耗时：约 {format_duration(seconds)}（主要受{bottleneck}影响，不含频率限制错误后的重试）")
+        print(f"  扫描耗时：{format_duration(scan_seconds)}（正式运行还需加上写入和保存的时间）")
+        quotas = [entry.get('quota_chars') for entry in self.backend.credentials()]
+        if quotas and None not in quotas and self.billed_chars > sum(quotas):
+            print(f"  ⚠ 计费字符数超过已配置的剩余配额（{sum(quotas)} 字符），翻译中途会因配额用完而失败")
+
+
+def estimate_workbook(excel_file, jobs, start_row, estimator, chunk_rows=None):
+    """
+    以只读模式逐块读取工作簿中各任务的源列，交给预估器统计（不调用翻译API，不修改文件）
+    
+    参数：
+        excel_file: Excel文件路径
+        jobs: 翻译任务列表（TranslationJob）
+        start_row: 开始翻译的行号
+        estimator: DryRunEstimator实例
+        chunk_rows: 每块的行数（默认使用 STREAMING_CHUNK_ROWS）
+    """
+    chunk_rows = chunk_rows or STREAMING_CHUNK_ROWS
+    workbook = openpyxl.load_workbook(excel_file, read_only=True)
+    try:
+        jobs = resolve_jobs(jobs, workbook.sheetnames, workbook.active.title)
+        for sheet_name in dict.fromkeys(job.sheet for job in jobs):
+            # 源列相同的任务（翻译成多种语言）一起统计，与正式翻译一样每个单元格只检测一次
+            sheet_groups = [group for group in group_jobs(jobs) if group[0][1].sheet == sheet_name]
+            group_directions = [[parse_direction(job.direction) for _, job in group] for group in sheet_groups]
+            source_columns = [group[0][1].source_column for group in sheet_groups]
+            max_column = max(source_columns)
+            chunk = [[] for _ in sheet_groups]  # 每组任务本块的非空原文
+            
+            def flush():
+                for directions, texts in zip(group_directions, chunk):
+                    estimator.add_texts(texts, directions)
+                    texts.clear()
+            
+            rows = workbook[sheet_name].iter_rows(min_row=start_row, max_col=max_column, values_only=True)
+            for row_count, row in enumerate(rows, start=1):
+                for source_column, texts in zip(source_columns, chunk):
+                    value = row[source_column - 1] if len(row) >= source_column else None
+                    text = str(value).strip() if value is not None else ''
+                    if text:
+                        texts.append(text)
+                    else:
+                        estimator.empty_cells += 1
+                if row_count % chunk_rows == 0:
+                    flush()
+            flush()
+    finally:
+        workbook.close()
+
+
+def estimate_translation_jobs(files, jobs, service='youdao', start_row=1, delay=None):
+    """
+    预估模式的入口：扫描一个或多个工作簿，打印预计的请求数、计费字符数和耗时
+    
+    参数：
+        files: Excel文件路径列表（多个文件时合计，文件之间的重复文本只计算一次）
+        jobs: 翻译任务列表（每个文件执行相同的任务）
+        service: 翻译服务（'youdao' 或 'deepl'）
+        start_row: 开始翻译的行号
+        delay: 翻译延时（秒/次，会覆盖该服务的频率限制配置）
+    
+    返回：
+        True表示所有文件都扫描成功
+    """
+    if service not in TRANSLATION_BACKENDS:
+        print(f"❌ 错误：不支持的翻译服务：{service}（可选：{'、'.join(TRANSLATION_BACKENDS)}）")
+        return False
+    if not check_job_languages(jobs, service):
+        return False
+    if delay is not None:
+        set_translate_delay(service, delay)
+    
+    print(f"✓ 预估模式：共 {len(files)} 个文件，{len(jobs)} 个任务，翻译服务：{service}（不调用翻译API，不修改文件）")
+    estimator = DryRunEstimator(service)
+    started = time.monotonic()
+    succeeded = True
+    for excel_file in files:
+        log_info(f"正在扫描：{excel_file}")
+        try:
+            estimate_workbook(excel_file, jobs, start_row, estimator)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {excel_file}：{e}")
+            succeeded = False
+    estimator.print_report(time.monotonic() - started)
+    return succeeded
+
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+    
+    参数：
+        argv: 命令行参数列表（默认使用sys.argv）
+    
+    返回：
+        解析后的参数对象
+    """
+    parser = argparse.ArgumentParser(description="Excel 中英互译工具")
+    parser.add_argument('--no-cache', action='store_true', help="本次运行不使用翻译缓存")
+    parser.add_argument('--clear-cache', action='store_true', help="运行前清空翻译缓存")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="不套用相似文本（只有编号、数字等片段不同）的译文，每条文本都调用API或使用完全相同的缓存"
+                             "（翻译记忆只在 MASK_UNTRANSLATABLE = False 时生效）")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help=f"同时进行中的翻译请求数（默认{CONCURRENCY}）")
+    parser.add_argument('--connect-timeout', type=float, default=HTTP_CONNECT_TIMEOUT,
+                        help=f"建立HTTP连接的超时时间，单位秒（默认{HTTP_CONNECT_TIMEOUT:g}）")
+    parser.add_argument('--read-timeout', type=float, default=HTTP_READ_TIMEOUT,
+                        help=f"等待HTTP响应的超时时间，单位秒（默认{HTTP_READ_TIMEOUT:g}）")
+    parser.add_argument('--streaming', action='store_true',
+                        help="流式模式：只读读取、只写输出到新文件，内存占用与总行数无关（不保留单元格格式）")
+    parser.add_argument('--output', help="流式模式的输出文件路径（默认在原文件名后加_translated）")
+    parser.add_argument('--resume', action='store_true',
+                        help="读取上次中断时的进度记录，跳过已完成的行继续翻译")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量模式：只翻译新增或原文修改过的行，跳过译文已是最新或人工填写的行")
+    
+    # 非交互模式：指定了翻译任务（--job 或配置文件中的 jobs）时不再逐项询问
+    parser.add_argument('--file', help=f"要翻译的Excel文件（默认{EXCEL_FILE}）")
+    parser.add_argument('--config', help="JSON格式的任务配置文件（命令行参数优先）")
+    parser.add_argument('--job', action='append', default=[], metavar='[工作表:]源列:目标列[:方向]',
+                        help="翻译任务，可重复指定多个；方向为 auto（默认，中英互译）、目标语言（如 ja）或 源语言-目标语言（如 zh-en）；"
+                             "同一源列翻译成多种语言时写成 源列:目标列=语言,目标列=语言，如 A:B=en,C=ja,D=ko")
+    parser.add_argument('--service', choices=sorted(TRANSLATION_BACKENDS), help="翻译服务（默认youdao）")
+    parser.add_argument('--skip-header', action='store_true', default=None, help="跳过第一行（标题行）")
+    parser.add_argument('--delay', type=float, help="翻译延时（秒/次），默认使用 RATE_LIMITS 中的配置")
+    parser.add_argument('--failover', action='append', choices=sorted(TRANSLATION_BACKENDS), metavar='服务',
+                        help="所选服务的账号都被限流或配额用完时改用的翻译服务（可重复指定，按顺序切换）")
+    parser.add_argument('--batch', metavar='目录或通配符',
+                        help="批量模式：用多个进程处理目录（或通配符匹配）中的所有工作簿，对每个文件执行相同的任务")
+    parser.add_argument('--workers', type=int, help="批量模式的工作进程数（默认为CPU核数）")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="预估模式：只扫描源列，估算请求数、计费字符数和耗时，不调用翻译API，不修改文件")
+    parser.add_argument('--metrics-json', metavar='文件路径', help="运行结束后把各阶段耗时、请求延时等运行指标写入JSON文件")
+    parser.add_argument('--metrics-prom', metavar='文件路径',
+                        help="运行结束后把运行指标写入Prometheus textfile（供node_exporter收集，文件名应以.prom结尾）")
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument('--quiet', action='store_const', const='quiet', dest='log_level',
+                              help="不显示进度和过程信息，只显示结果汇总和失败原因")
+    output_group.add_argument('--verbose', action='store_const', const='verbose', dest='log_level',
+                              help="逐行显示原文、译文、重试等详情（默认只显示单行进度）")
+    parser.add_argument('--mock-server', metavar='地址',
+                        help="使用本地模拟翻译服务（python mock_server.py 启动，如 http://127.0.0.1:8800），不消耗API额度")
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
@@ -729,7 +4772,84 @@ if __name__ == '__main__':
     print("功能：自动识别中文/英文，然后互译")
     print("支持：有道翻译 / DeepL翻译")
     print("=" * 60)
-    translate_excel()
+    args = parse_args()
+    CONCURRENCY = args.concurrency
+    HTTP_CONNECT_TIMEOUT = args.connect_timeout
+    HTTP_READ_TIMEOUT = args.read_timeout
+    if args.no_cache:
+        CACHE_ENABLED = False
+        print("✓ 本次运行不使用翻译缓存")
+    elif args.clear_cache:
+        cache = TranslationCache(CACHE_FILE)
+        deleted = cache.clear()
+        cache.close()
+        print(f"✓ 已清空翻译缓存（删除 {deleted} 条）")
+    if args.no_memory:
+        TRANSLATION_MEMORY = False
+    if args.mock_server:
+        use_mock_server(args.mock_server)
+    
+    try:
+        config, jobs = load_job_config(args.config) if args.config else ({}, [])
+        if args.job:
+            jobs = [job for spec in args.job for job in parse_job_spec(spec)]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ 任务配置错误：{e}")
+        sys.exit(2)
+    
+    excel_file = args.file or config.get('file') or EXCEL_FILE
+    streaming = args.streaming or config.get('streaming', False)
+    output_file = args.output or config.get('output')
+    incremental = args.incremental or config.get('incremental', False)
+    
+    batch_pattern = args.batch or config.get('batch')
+    skip_header = args.skip_header if args.skip_header is not None else config.get('skip_header', False)
+    service = args.service or config.get('service', 'youdao')
+    delay = args.delay if args.delay is not None else config.get('delay')
+    METRICS_JSON_FILE = args.metrics_json or config.get('metrics_json')
+    METRICS_PROMETHEUS_FILE = args.metrics_prom or config.get('metrics_prometheus')
+    LOG_LEVEL = args.log_level or config.get('log_level', LOG_LEVEL)
+    FAILOVER_SERVICES = args.failover or config.get('failover', FAILOVER_SERVICES)
+    credentials = config.get('credentials', {})
+    YOUDAO_CREDENTIALS = YOUDAO_CREDENTIALS + credentials.get('youdao', [])
+    DEEPL_CREDENTIALS = DEEPL_CREDENTIALS + credentials.get('deepl', [])
+    
+    if args.dry_run:
+        # 预估模式：只扫描源列（批量模式时扫描所有匹配的工作簿），不调用翻译API
+        if not jobs:
+            print("❌ 预估模式需要通过 --job 或配置文件指定翻译任务")
+            sys.exit(2)
+        files = find_workbooks(batch_pattern) if batch_pattern else [excel_file]
+        if not files:
+            print(f"❌ 没有找到要处理的工作簿：{batch_pattern}")
+            sys.exit(1)
+        succeeded = estimate_translation_jobs(files, jobs, service=service, start_row=2 if skip_header else 1,
+                                              delay=delay)
+        if not succeeded:
+            sys.exit(1)
+    elif batch_pattern:
+        # 批量模式：对目录中的每个工作簿执行相同的任务
+        if not jobs:
+            print("❌ 批量模式需要通过 --job 或配置文件指定翻译任务")
+            sys.exit(2)
+        succeeded = translate_excel_batch(
+            batch_pattern, jobs, service=service, start_row=2 if skip_header else 1, delay=delay,
+            streaming=streaming, resume=args.resume, incremental=incremental,
+            workers=args.workers or config.get('workers'),
+        )
+        if not succeeded:
+            sys.exit(1)
+    elif jobs:
+        # 非交互模式：一次加载工作簿，执行全部任务后保存一次
+        succeeded = translate_excel_jobs(
+            excel_file, jobs, service=service, start_row=2 if skip_header else 1, delay=delay,
+            streaming=streaming, output_file=output_file, resume=args.resume, incremental=incremental,
+        )
+        if not succeeded:
+            sys.exit(1)
+    else:
+        EXCEL_FILE = excel_file
+        translate_excel(streaming=streaming, output_file=output_file, resume=args.resume, incremental=incremental)
     print("=" * 60)
     print("程序执行完毕！")
     print("=" * 60)
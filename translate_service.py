@@ -0,0 +1,600 @@
+"""
+翻译服务模式（常驻进程）
+功能：在本机启动一个HTTP服务，接收工作簿翻译任务，按优先级排队依次执行；所有任务共用同一个进程中的
+      HTTP连接池、翻译缓存、频率限制器和账号池，多人同时提交任务时总请求速率仍然不超过服务的限制，
+      也不需要每次重新导入openpyxl/requests、重新建立连接和打开缓存；
+      提供任务状态（排队位置、进度、预计剩余时间、统计信息、失败原因）和吞吐量查询，以及Prometheus格式的运行指标
+说明：同一时间只执行一个任务（进度显示、运行指标是进程内全局的），任务内部仍按 CONCURRENCY 并发翻译；
+      任务在主线程中执行，Ctrl-C 或 SIGTERM 会中断当前任务（进度记录保留，可提交 resume 任务继续）并停止服务；
+      服务默认只监听127.0.0.1，提交的文件路径是服务所在机器上的路径
+用法：python translate_service.py --port 8870 --config 服务配置.json
+      curl -X POST http://127.0.0.1:8870/jobs -d '{"file": "产品表.xlsx", "jobs": ["A:B"], "service": "deepl"}'
+      curl http://127.0.0.1:8870/jobs/1
+离线测试：python mock_server.py --port 8800
+      python translate_service.py --mock-server http://127.0.0.1:8800 --cache-file mock_cache.sqlite3
+"""
+
+import argparse  # 用于解析命令行参数
+import itertools  # 用于生成任务编号和排队序号
+import json  # 用于解析请求和生成JSON响应
+import os  # 用于检查提交的文件是否存在
+import queue  # 用于按优先级排队的任务队列
+import signal  # 用于把SIGTERM当作Ctrl-C处理
+import threading  # 用于在后台线程中运行HTTP服务和保护任务列表
+import time  # 用于记录任务时间和计算吞吐量
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # 用于实现多线程HTTP服务
+
+import translate_excel as te  # 翻译流程；HTTP连接池、翻译缓存、频率限制器和账号池都是该模块中的全局对象
+from metrics import Metrics, get_metrics
+from progress import ProgressReporter, format_duration, get_progress, set_progress
+
+# 默认设置（命令行参数可修改）
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8870
+
+# 优先级名称 -> 数值（数值小的先执行，相同优先级按提交顺序执行；也可以直接提交整数）
+PRIORITIES = {
+    'high': 0,
+    'normal': 1,
+    'low': 2,
+}
+
+# 最多保留的已结束任务个数（超出时删除最早结束的任务记录）
+MAX_FINISHED_JOBS = 200
+
+# 等待新任务时检查是否需要停止的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 任务状态
+STATUS_QUEUED = 'queued'  # 排队中
+STATUS_RUNNING = 'running'  # 执行中
+STATUS_DONE = 'done'  # 已完成
+STATUS_FAILED = 'failed'  # 出错
+STATUS_CANCELLED = 'cancelled'  # 排队时被取消
+STATUS_INTERRUPTED = 'interrupted'  # 执行时服务被停止（进度记录保留）
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED, STATUS_INTERRUPTED)
+
+
+class JobRequestError(ValueError):
+    """提交的任务不正确（返回HTTP 400）"""
+
+
+class ServiceJob:
+    """
+    一个提交到服务的工作簿翻译任务（可以包含多个列的翻译任务）
+    """
+
+    def __init__(self, job_id, excel_file, jobs, service, priority, start_row=1, streaming=False,
+                 output_file=None, resume=False, incremental=False):
+        """
+        参数：
+            job_id: 任务编号
+            excel_file: Excel文件路径
+            jobs: 翻译任务列表（TranslationJob）
+            service: 翻译服务
+            priority: 优先级数值（小的先执行）
+            start_row: 开始翻译的行号
+            streaming: 是否使用流式模式
+            output_file: 流式模式的输出文件路径
+            resume: 是否读取上次中断时的进度记录继续
+            incremental: 是否使用增量模式
+        """
+        self.id = job_id
+        self.file = excel_file
+        self.jobs = jobs
+        self.service = service
+        self.priority = priority
+        self.start_row = start_row
+        self.streaming = streaming
+        self.output_file = output_file
+        self.resume = resume
+        self.incremental = incremental
+        self.status = STATUS_QUEUED
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.stats = None  # 执行完成后的统计字典
+        self.error = None  # 出错原因
+        self.failures = {}  # 失败原因 -> {'count': 行数, 'rows': [行号, ...]}
+
+    @property
+    def elapsed(self):
+        """已执行的时间（秒；还没有开始时为None）"""
+        if self.started is None:
+            return None
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        """
+        返回：
+            任务信息字典（JSON可序列化）
+        """
+        info = {
+            'id': self.id,
+            'file': self.file,
+            'service': self.service,
+            'jobs': [te.describe_job(job) if job.sheet else te.describe_job(job._replace(sheet='当前工作表'))
+                     for job in self.jobs],
+            'priority': self.priority,
+            'streaming': self.streaming,
+            'output': self.output_file,
+            'resume': self.resume,
+            'incremental': self.incremental,
+            'status': self.status,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'elapsed_seconds': self.elapsed,
+        }
+        if self.stats is not None:
+            processed = sum(self.stats[result] for result in te.ROW_RESULTS)
+            info['stats'] = self.stats
+            info['rows_per_second'] = processed / self.elapsed if self.elapsed else None
+        if self.error is not None:
+            info['error'] = self.error
+        if self.failures:
+            info['failures'] = self.failures
+        return info
+
+
+class TranslationService:
+    """
+    任务调度：HTTP请求处理线程提交和查询任务，主线程按优先级依次执行
+    """
+
+    def __init__(self):
+        self.jobs = {}  # 任务编号 -> ServiceJob（按提交顺序）
+        self.queue = queue.PriorityQueue()  # (优先级, 排队序号, 任务编号)
+        self.running = None  # 正在执行的任务
+        self.metrics = Metrics()  # 已结束任务的运行指标合计
+        self.started = time.time()
+        self.busy_seconds = 0.0  # 执行任务的累计时间
+        self._ids = itertools.count(1)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def submit(self, request):
+        """
+        提交任务（在HTTP请求处理线程中调用）
+
+        参数：
+            request: 请求内容字典：file、jobs（任务字符串如"A:B=en,C=ja"，或与配置文件相同的任务对象）、
+                     service、skip_header、streaming、output、resume、incremental、priority
+
+        返回：
+            ServiceJob
+
+        异常：
+            JobRequestError: 任务不正确
+        """
+        excel_file = request.get('file')
+        if not excel_file:
+            raise JobRequestError("缺少 file（要翻译的Excel文件路径）")
+        if not os.path.exists(excel_file):
+            raise JobRequestError(f"找不到文件：{excel_file}")
+        service = request.get('service', 'youdao')
+        if service not in te.TRANSLATION_BACKENDS:
+            raise JobRequestError(f"不支持的翻译服务：{service}（可选：{'、'.join(te.TRANSLATION_BACKENDS)}）")
+        try:
+            jobs = []
+            for item in request.get('jobs', []):
+                jobs += te.parse_job_spec(item) if isinstance(item, str) else te.parse_job_config([item])
+        except ValueError as e:
+            raise JobRequestError(str(e))
+        except (KeyError, TypeError) as e:
+            raise JobRequestError(f"任务格式错误：{e!r}")
+        if not jobs:
+            raise JobRequestError("缺少 jobs（翻译任务，如 [\"A:B\"]）")
+        if not te.check_api_key(service):
+            raise JobRequestError(f"翻译服务 {service} 没有配置API密钥")
+        if not te.check_job_languages(jobs, service):
+            raise JobRequestError(f"翻译服务 {service} 不支持任务中的语言")
+        priority = request.get('priority', 'normal')
+        if isinstance(priority, str) and priority in PRIORITIES:
+            priority = PRIORITIES[priority]
+        elif not isinstance(priority, int) or isinstance(priority, bool):
+            raise JobRequestError(f"优先级应为 {'、'.join(PRIORITIES)} 或整数：{priority}")
+
+        with self._lock:
+            # 同一个文件同时只能有一个未结束的任务（进度记录和保存的文件会互相覆盖）
+            path = os.path.abspath(excel_file)
+            for other in self.jobs.values():
+                if other.status not in FINISHED_STATUSES and os.path.abspath(other.file) == path:
+                    raise JobRequestError(f"文件 {excel_file} 已有未完成的任务 {other.id}")
+            job = ServiceJob(next(self._ids), excel_file, jobs, service, priority,
+                             start_row=2 if request.get('skip_header') else 1,
+                             streaming=bool(request.get('streaming')), output_file=request.get('output'),
+                             resume=bool(request.get('resume')), incremental=bool(request.get('incremental')))
+            self.jobs[job.id] = job
+            print(f"📥 任务 {job.id}：{excel_file}（{service}，优先级 {priority}，{len(jobs)} 个列任务）")
+            self.queue.put((priority, next(self._sequence), job.id))
+        return job
+
+    def cancel(self, job_id):
+        """
+        取消排队中的任务（执行中的任务不能取消）
+
+        参数：
+            job_id: 任务编号
+
+        返回：
+            True表示已取消
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != STATUS_QUEUED:
+                return False
+            job.status = STATUS_CANCELLED
+            job.finished = time.time()
+        print(f"🚫 任务 {job_id} 已取消")
+        return True
+
+    def queue_position(self, job):
+        """任务在队列中的位置（1表示下一个执行；不在排队中时为None）"""
+        if job.status != STATUS_QUEUED:
+            return None
+        with self._lock:
+            queued = sorted((other.priority, other.id) for other in self.jobs.values() if other.status == STATUS_QUEUED)
+        return queued.index((job.priority, job.id)) + 1
+
+    def describe(self, job):
+        """
+        任务信息（执行中的任务附带实时进度）
+
+        参数：
+            job: ServiceJob
+
+        返回：
+            字典
+        """
+        info = job.to_dict()
+        info['queue_position'] = self.queue_position(job)
+        if job is self.running:
+            progress = get_progress()
+            rate = progress.rate()
+            info['progress'] = {
+                'done': progress.done,
+                'total': progress.total,
+                'failed': progress.failed,
+                'rows_per_second': rate,
+                'remaining_seconds': (progress.total - progress.done) / rate
+                if progress.total and rate > 0 and progress.done < progress.total else None,
+            }
+        return info
+
+    def list_jobs(self):
+        """所有任务的信息（按提交顺序）"""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [self.describe(job) for job in jobs]
+
+    def get_stats(self):
+        """
+        服务的吞吐量和共享资源的状态
+
+        返回：
+            字典：运行时间、各状态的任务数、处理行数和每秒行数、计费字符数、缓存命中、HTTP连接复用、各账号的限速状态
+        """
+        with self._lock:
+            jobs = list(self.jobs.values())
+        running = self.running
+        metrics = Metrics()
+        metrics.merge(self.metrics.to_dict())
+        if running is not None:
+            metrics.merge(get_metrics().to_dict())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        rows = {result: sum(job.stats[result] for job in jobs if job.stats) for result in te.ROW_RESULTS}
+        processed = sum(rows.values())
+        busy_seconds = self.busy_seconds
+        if running is not None:
+            # 执行中的任务按当前进度计入已处理的行数
+            processed += get_progress().done
+            busy_seconds += running.elapsed or 0.0
+        cache = te.get_translation_cache()
+        limiters = []
+        for service, credentials in te._credential_pools.items():
+            for credential in credentials:
+                limiters.append({
+                    'service': service,
+                    'key': credential.name,
+                    'requests_per_second': credential.limiter.current_rate,
+                    'wait_seconds': credential.limiter.wait_time,
+                    'throttle_count': credential.limiter.throttle_count,
+                    'requests': credential.request_count,
+                    'chars': credential.used_chars,
+                    'status': credential.describe_status(),
+                })
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'busy_seconds': busy_seconds,
+            'jobs': counts,
+            'queued': counts.get(STATUS_QUEUED, 0),
+            'running': running.id if running is not None else None,
+            'rows': rows,
+            'rows_processed': processed,
+            'rows_per_second': processed / busy_seconds if busy_seconds else None,
+            'chars_billed': metrics.get('chars_billed'),
+            'requests': metrics.get('http_requests'),
+            'cache': {'hits': cache.hits, 'misses': cache.misses} if cache is not None else None,
+            'connections': te.get_connection_stats(),
+            'limiters': limiters,
+        }
+
+    def get_prometheus(self):
+        """已结束任务和执行中任务的运行指标合计（Prometheus textfile格式）"""
+        metrics = Metrics()
+        metrics.merge(self.metrics.to_dict())
+        if self.running is not None:
+            metrics.merge(get_metrics().to_dict())
+        return metrics.to_prometheus()
+
+    def run_job(self, job):
+        """
+        执行一个任务（在主线程中调用）；HTTP连接池、翻译缓存和频率限制器在任务之间保持不变
+
+        参数：
+            job: ServiceJob
+        """
+        print(f"\n▶ 开始任务 {job.id}：{job.file}")
+        get_metrics().reset()  # 每个任务单独统计（结束时合并到服务的合计中）
+        set_progress(ProgressReporter(enabled=False))  # 任务在加载工作簿前出错时不会沿用上一个任务的失败原因
+        job.started = time.time()
+        job.status = STATUS_RUNNING
+        self.running = job
+        try:
+            job.stats = te.run_translation_jobs(job.file, job.jobs, job.service, job.start_row,
+                                                streaming=job.streaming, output_file=job.output_file,
+                                                resume=job.resume, incremental=job.incremental)
+            job.status = STATUS_DONE
+        except KeyboardInterrupt:
+            job.status = STATUS_INTERRUPTED
+            job.error = "服务已停止，进度记录已保留（提交 resume 为 true 的任务可以继续）"
+            raise
+        except Exception as e:
+            job.status = STATUS_FAILED
+            job.error = str(e)
+            print(f"❌ 任务 {job.id} 出错：{e}")
+        finally:
+            job.finished = time.time()
+            job.failures = dict(get_progress().failures)
+            self.metrics.merge(get_metrics().to_dict())
+            self.busy_seconds += job.elapsed
+            self.running = None
+            self.forget_finished_jobs()
+        print(f"■ 任务 {job.id} 结束：{job.status}，用时 {format_duration(job.elapsed)}")
+
+    def forget_finished_jobs(self):
+        """只保留最近 MAX_FINISHED_JOBS 个已结束任务的记录"""
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job.status in FINISHED_STATUSES]
+            for job in sorted(finished, key=lambda job: job.finished)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job.id]
+
+    def run(self):
+        """
+        在主线程中依次执行排队的任务，直到 stop 被调用或收到 Ctrl-C
+        """
+        while not self._stop.is_set():
+            try:
+                _, _, job_id = self.queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.status != STATUS_QUEUED:
+                    continue  # 已取消
+            self.run_job(job)
+
+    def stop(self):
+        """让 run 在当前任务结束后返回"""
+        self._stop.set()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    处理服务请求：POST /jobs（提交任务）、GET /jobs、GET /jobs/编号（任务状态）、DELETE /jobs/编号（取消排队中的任务）、
+    GET /stats（吞吐量和共享资源状态）、GET /metrics（Prometheus格式的运行指标）
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # 不逐条打印请求日志
+        pass
+
+    def send_body(self, status, body, content_type):
+        """发送响应"""
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        """
+        发送JSON响应
+
+        参数：
+            status: HTTP状态码
+            payload: 响应内容
+        """
+        self.send_body(status, json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'),
+                       'application/json; charset=utf-8')
+
+    def get_job(self, path):
+        """根据 /jobs/编号 找到任务；找不到时返回None"""
+        job_id = path[len('/jobs/'):]
+        if not job_id.isdigit():
+            return None
+        return self.server.service.jobs.get(int(job_id))
+
+    def do_GET(self):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        if path in ('', '/jobs'):
+            self.send_json(200, service.list_jobs())
+        elif path.startswith('/jobs/'):
+            job = self.get_job(path)
+            if job is None:
+                self.send_json(404, {'error': "没有这个任务"})
+            else:
+                self.send_json(200, service.describe(job))
+        elif path == '/stats':
+            self.send_json(200, service.get_stats())
+        elif path == '/metrics':
+            self.send_body(200, service.get_prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            self.send_json(404, {'error': "Not found"})
+
+    def do_POST(self):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        if path != '/jobs':
+            self.send_json(404, {'error': "Not found"})
+            return
+        try:
+            request = json.loads(body or '{}')
+            if not isinstance(request, dict):
+                raise JobRequestError("请求内容应为JSON对象")
+            job = service.submit(request)
+        except ValueError as e:
+            # JobRequestError 和 JSON 格式错误
+            self.send_json(400, {'error': str(e)})
+            return
+        self.send_json(201, service.describe(job))
+
+    def do_DELETE(self):
+        service = self.server.service
+        path = self.path.split('?')[0].rstrip('/')
+        job = self.get_job(path) if path.startswith('/jobs/') else None
+        if job is None:
+            self.send_json(404, {'error': "没有这个任务"})
+        elif service.cancel(job.id):
+            self.send_json(200, service.describe(job))
+        else:
+            self.send_json(409, {'error': f"任务状态为 {job.status}，只能取消排队中的任务"})
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """
+    服务的HTTP接口（请求处理线程只提交和查询任务，任务由主线程执行）
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        """
+        参数：
+            address: (主机, 端口)，端口为0时自动分配
+            service: TranslationService
+        """
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+
+    @property
+    def url(self):
+        """服务的基础地址"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_service(host=DEFAULT_HOST, port=0):
+    """
+    创建翻译服务并在后台线程中启动HTTP接口（任务需要调用 service.run() 在当前线程中执行）
+
+    参数：
+        host: 监听地址
+        port: 端口（0表示自动分配）
+
+    返回：
+        (TranslationService, ServiceHTTPServer)
+    """
+    service = TranslationService()
+    server = ServiceHTTPServer((host, port), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return service, server
+
+
+def handle_sigterm(signum, frame):
+    """SIGTERM（如 systemd 或 kill 停止服务）与 Ctrl-C 相同处理：中断当前任务并退出"""
+    raise KeyboardInterrupt
+
+
+def parse_args(argv=None):
+    """
+    解析命令行参数
+
+    参数：
+        argv: 命令行参数列表（默认使用sys.argv）
+
+    返回：
+        解析后的参数对象
+    """
+    parser = argparse.ArgumentParser(description="Excel 翻译服务模式：常驻进程，按优先级执行提交的翻译任务")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"监听地址（默认{DEFAULT_HOST}，只允许本机访问）")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"端口（默认{DEFAULT_PORT}）")
+    parser.add_argument('--config', help="JSON格式的服务配置文件（与任务配置文件格式相同，使用其中的 credentials、"
+                                         "failover、delay、log_level；delay 对 service 指定的翻译服务生效）")
+    parser.add_argument('--concurrency', type=int, default=te.CONCURRENCY,
+                        help=f"每个任务同时进行中的翻译请求数（默认{te.CONCURRENCY}）")
+    parser.add_argument('--no-cache', action='store_true', help="不使用翻译缓存")
+    parser.add_argument('--no-memory', action='store_true', help="不套用相似文本的译文")
+    parser.add_argument('--cache-file', help=f"翻译缓存文件（默认{te.CACHE_FILE}；与 --mock-server 一起使用时启用单独的缓存）")
+    parser.add_argument('--mock-server', metavar='地址', help="使用本地模拟翻译服务（python mock_server.py 启动），不消耗API额度")
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument('--quiet', action='store_const', const='quiet', dest='log_level',
+                              help="不显示进度和过程信息，只显示每个任务的结果汇总")
+    output_group.add_argument('--verbose', action='store_const', const='verbose', dest='log_level',
+                              help="逐行显示原文、译文、重试等详情")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    config = {}
+    if args.config:
+        try:
+            config, _ = te.load_job_config(args.config)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ 服务配置错误：{e}")
+            raise SystemExit(2)
+    te.CONCURRENCY = args.concurrency
+    te.LOG_LEVEL = args.log_level or config.get('log_level', te.LOG_LEVEL)
+    te.FAILOVER_SERVICES = config.get('failover', te.FAILOVER_SERVICES)
+    credentials = config.get('credentials', {})
+    te.YOUDAO_CREDENTIALS = te.YOUDAO_CREDENTIALS + credentials.get('youdao', [])
+    te.DEEPL_CREDENTIALS = te.DEEPL_CREDENTIALS + credentials.get('deepl', [])
+    if args.no_memory:
+        te.TRANSLATION_MEMORY = False
+    if args.mock_server:
+        te.use_mock_server(args.mock_server)
+    if args.cache_file:
+        te.CACHE_ENABLED = True
+        te.CACHE_FILE = args.cache_file
+    if args.no_cache:
+        te.CACHE_ENABLED = False
+    if config.get('delay') is not None:
+        # 服务中的所有任务共用频率限制器，延时只能在服务配置中设置，不能由单个任务修改
+        te.set_translate_delay(config.get('service', 'youdao'), config['delay'])
+
+    service, server = start_service(args.host, args.port)
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    print(f"✓ 翻译服务已启动：{server.url}（翻译缓存：{te.CACHE_FILE if te.CACHE_ENABLED else '不使用'}）")
+    print(f"  提交任务：curl -X POST {server.url}/jobs -d '{{\"file\": \"产品表.xlsx\", \"jobs\": [\"A:B\"]}}'")
+    print(f"  任务状态：{server.url}/jobs、{server.url}/jobs/编号；吞吐量：{server.url}/stats；指标：{server.url}/metrics")
+    print("  按 Ctrl-C 停止")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\n⏹ 服务已停止")
+    finally:
+        server.shutdown()
+        server.server_close()
+        te.close_translation_cache()
+        te.close_http_sessions()
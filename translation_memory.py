@@ -0,0 +1,76 @@
+"""
+近似重复文本的翻译记忆
+功能：把文本归一化为"记忆键"——编号、数字、网址、占位符等片段替换为同一个标记，全角半角统一，连续空白合并为
+      一个空格并去掉首尾空白；记忆键相同的文本只是这些片段不同（如"订单1024已发货"和"订单1025已发货"），
+      可以直接套用已有译文，把其中的片段替换为新文本的片段，不再调用翻译API
+说明：标点、撇号、连字符和词间空格都保留在记忆键中（"a part"和"apart"、"I'll"和"Ill"、句末的"!"和"."
+      意思不同），只有片段不同时才复用，因此查找是一次字典（或数据库索引）查询，不需要相似度计算，
+      百万行的列也可以逐格查询；片段在译文中找不到或次数不符时放弃复用，仍然调用API
+"""
+
+import re
+import unicodedata
+
+from text_filter import TOKEN_PATTERN, PLACEHOLDER_PATTERN
+
+# 记忆键中代替片段的标记
+TOKEN_MARK = '\x00'
+
+# 编号、数字、网址等片段，以及已经替换好的占位符
+MEMORY_TOKEN_PATTERN = re.compile(f"{PLACEHOLDER_PATTERN.pattern}|{TOKEN_PATTERN.pattern}", re.VERBOSE)
+
+# 记忆键的计算方法改变时加1（缓存文件中按旧方法计算的记忆键需要重新计算）
+MEMORY_KEY_VERSION = 2
+
+
+def memory_key(text):
+    """
+    计算文本的记忆键
+
+    参数：
+        text: 原文（可以是已替换占位符的文本）
+
+    返回：
+        (记忆键, 片段列表)；记忆键相同的文本只有片段、全角半角或多余的空白不同
+    """
+    text = unicodedata.normalize('NFKC', text)
+    tokens = []
+
+    def replace(match):
+        tokens.append(match.group())
+        return TOKEN_MARK
+
+    masked = MEMORY_TOKEN_PATTERN.sub(replace, text)
+    return ' '.join(masked.split()), tokens
+
+
+def adapt_translation(translation, source_text, target_text):
+    """
+    把一条文本的译文套用到记忆键相同的另一条文本：译文中的片段替换为另一条文本对应位置的片段
+
+    参数：
+        translation: source_text 的译文
+        source_text: 已翻译的文本
+        target_text: 要套用译文的文本（与 source_text 的记忆键相同）
+
+    返回：
+        target_text 的译文；片段在译文中找不到或出现多次（无法确定替换哪一处）时返回None
+    """
+    source_key, source_tokens = memory_key(source_text)
+    target_key, target_tokens = memory_key(target_text)
+    if source_key != target_key:
+        return None
+    mapping = {}  # 原片段 -> 新片段
+    for old, new in zip(source_tokens, target_tokens):
+        if mapping.setdefault(old, new) != new:
+            return None  # 同一个片段对应不同的新片段，无法确定对应关系
+    replacements = {old: new for old, new in mapping.items() if old != new}
+    if not replacements:
+        return translation
+    # 要替换的片段在译文中出现的次数必须与原文相同（前后不能紧挨字母或数字），否则无法确定替换哪一处
+    pattern = re.compile('(?<![A-Za-z0-9])(?:' + '|'.join(
+        re.escape(old) for old in sorted(replacements, key=len, reverse=True)) + ')(?![A-Za-z0-9])')
+    found = pattern.findall(translation)
+    if sorted(found) != sorted(token for token in source_tokens if token in replacements):
+        return None
+    return pattern.sub(lambda match: replacements[match.group()], translation)